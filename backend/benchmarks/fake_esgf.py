@@ -0,0 +1,283 @@
+"""A local stand-in for the ESG-Search, wget and node status services.
+
+The server answers the same routes Metagrid proxies to, with generated,
+deterministic data:
+
+- ``.../search`` returns Solr-shaped JSON (``responseHeader``, ``response``
+  and ``facet_counts``, as in ``ESGSearchResponse``), honouring ``type``,
+  ``offset``, ``limit`` and ``facets``. File documents carry Globus URLs
+  spread over several data nodes.
+- ``.../wget`` returns a wget script listing the requested files.
+- ``.../status`` returns node status in the Prometheus format the frontend
+  reads.
+
+Latency, payload size and error rate are configurable, so the benchmarks can
+model a slow or flaky federation. Run it on its own with:
+
+    python -m benchmarks.fake_esgf --port 8100 --latency 0.05
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Optional
+from urllib.parse import parse_qs, urlsplit
+
+DATA_NODES = [
+    "esgf-node.ornl.gov",
+    "aims3.llnl.gov",
+    "esgf-data1.llnl.gov",
+    "eagle.alcf.anl.gov",
+]
+
+FACETS = [
+    "activity_id",
+    "experiment_id",
+    "source_id",
+    "variable_id",
+    "frequency",
+    "table_id",
+    "member_id",
+    "grid_label",
+]
+
+
+@dataclass
+class FakeESGFConfig:
+    latency: float = 0.0
+    """Seconds added to every response."""
+    jitter: float = 0.0
+    """Up to this many seconds are added at random on top of ``latency``."""
+    error_rate: float = 0.0
+    """The fraction of requests answered with a 503."""
+    num_found: int = 1000
+    """The number of documents matching any search."""
+    doc_bytes: int = 0
+    """Padding added to every document, to model larger payloads."""
+    facet_values: int = 20
+    """The number of values reported for each requested facet."""
+    seed: Optional[int] = None
+
+
+def dataset_id(index: int) -> str:
+    return f"CMIP6.Bench.Model.exp{index // 10}.r{index % 10}i1p1f1.Amon.tas.gn.v20200101"
+
+
+def dataset_doc(index: int, padding: str) -> dict[str, Any]:
+    node = DATA_NODES[index % len(DATA_NODES)]
+    return {
+        "id": f"{dataset_id(index)}|{node}",
+        "master_id": dataset_id(index),
+        "data_node": node,
+        "project": ["CMIP6"],
+        "number_of_files": 10,
+        "size": 10 * 2**20,
+        "score": 1.0,
+        "padding": padding,
+    }
+
+
+def file_doc(index: int, padding: str) -> dict[str, Any]:
+    node = DATA_NODES[index % len(DATA_NODES)]
+    path = f"/css03_data/CMIP6/bench/v20200101/tas_Amon_{index:06d}.nc"
+    return {
+        "id": f"{dataset_id(index // 10)}.tas_Amon_{index:06d}.nc|{node}",
+        "dataset_id": f"{dataset_id(index // 10)}|{node}",
+        "data_node": node,
+        "size": 2**20,
+        "url": [
+            f"https://{node}/thredds/fileServer{path}|application/netcdf|HTTPServer",
+            f"globus:dead-beef-{index % len(DATA_NODES):04d}{path}|Globus|Globus",
+        ],
+        "score": 1.0,
+        "padding": padding,
+    }
+
+
+class FakeESGFServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address=("127.0.0.1", 0), config=None):
+        super().__init__(address, FakeESGFHandler)
+        self.config = config or FakeESGFConfig()
+        self.random = random.Random(self.config.seed)
+        self.random_lock = threading.Lock()
+        self.requests: Counter[str] = Counter()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeESGFServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def draw(self) -> tuple[float, bool]:
+        """Pick the delay of a response and whether it fails."""
+        with self.random_lock:
+            jitter = self.random.uniform(0, self.config.jitter)
+            failed = self.random.random() < self.config.error_rate
+        return self.config.latency + jitter, failed
+
+
+class FakeESGFHandler(BaseHTTPRequestHandler):
+    server: FakeESGFServer
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = parse_qs(url.query)
+        self.respond(url.path, params)
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        length = int(self.headers.get("Content-Length", 0))
+        params = parse_qs(url.query)
+        for key, values in parse_qs(self.rfile.read(length).decode()).items():
+            params.setdefault(key, []).extend(values)
+        self.respond(url.path, params)
+
+    def respond(self, path: str, params: dict[str, list[str]]):
+        route = path.rstrip("/").rsplit("/", 1)[-1]
+        self.server.requests[route] += 1
+        delay, failed = self.server.draw()
+        time.sleep(delay)
+
+        if failed:
+            self.send_body(503, b"Service Unavailable", "text/plain")
+        elif route == "search":
+            self.send_body(200, self.search(params), "application/json")
+        elif route == "wget":
+            self.send_body(200, self.wget(params), "application/x-sh")
+        elif route == "status":
+            self.send_body(200, self.status(), "application/json")
+        else:
+            self.send_body(404, b"Not Found", "text/plain")
+
+    def send_body(self, status: int, body: bytes, content_type: str):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def page(self, params: dict[str, list[str]]) -> range:
+        config = self.server.config
+        offset = int(params.get("offset", ["0"])[0])
+        limit = int(params.get("limit", ["10"])[0])
+        return range(
+            min(offset, config.num_found),
+            min(offset + limit, config.num_found),
+        )
+
+    def search(self, params: dict[str, list[str]]) -> bytes:
+        config = self.server.config
+        padding = "x" * config.doc_bytes
+        make_doc = file_doc if params.get("type") == ["File"] else dataset_doc
+        page = self.page(params)
+
+        facet_fields = {}
+        for names in params.get("facets", []):
+            for name in filter(None, (n.strip() for n in names.split(","))):
+                facet_fields[name] = [
+                    item
+                    for i in range(config.facet_values)
+                    for item in (f"{name}_{i}", config.num_found // (i + 1))
+                ]
+
+        return json.dumps(
+            {
+                "responseHeader": {"status": 0, "QTime": 1, "params": params},
+                "response": {
+                    "numFound": config.num_found,
+                    "start": page.start,
+                    "maxScore": 1.0,
+                    "docs": [make_doc(i, padding) for i in page],
+                },
+                "facet_counts": {
+                    "facet_queries": {},
+                    "facet_fields": facet_fields,
+                    "facet_ranges": {},
+                    "facet_intervals": {},
+                    "facet_heatmaps": {},
+                },
+            }
+        ).encode()
+
+    def wget(self, params: dict[str, list[str]]) -> bytes:
+        lines = [
+            "#!/bin/bash",
+            'download_files="$(cat <<EOF--dataset.file.url.chksum_type.chksum',
+        ]
+        for i in self.page({"limit": ["1000"], **params}):
+            doc = file_doc(i, "")
+            url = doc["url"][0].split("|")[0]
+            lines.append(f"'tas_Amon_{i:06d}.nc' '{url}' 'SHA256' '{i:064x}'")
+        lines.append("EOF--dataset.file.url.chksum_type.chksum")
+        lines.append(')"')
+        return ("\n".join(lines) + "\n").encode()
+
+    def status(self) -> bytes:
+        now = time.time()
+        return json.dumps(
+            {
+                "status": "success",
+                "data": {
+                    "resultType": "vector",
+                    "result": [
+                        {
+                            "metric": {
+                                "__name__": "probe_success",
+                                "instance": f"https://{node}/thredds",
+                                "job": "http_2xx",
+                                "target": f"https://{node}/thredds",
+                            },
+                            "value": [now, "1"],
+                        }
+                        for node in DATA_NODES
+                    ],
+                },
+            }
+        ).encode()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    for name, field in FakeESGFConfig.__dataclass_fields__.items():
+        parser.add_argument(
+            f"--{name.replace('_', '-')}",
+            type=float if isinstance(field.default, float) else int,
+            default=field.default,
+        )
+    args = parser.parse_args()
+
+    config = FakeESGFConfig(
+        **{
+            name: getattr(args, name)
+            for name in FakeESGFConfig.__dataclass_fields__
+        }
+    )
+    server = FakeESGFServer((args.host, args.port), config)
+    print(f"Serving fake ESG-Search at {server.url}/esg-search/search")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
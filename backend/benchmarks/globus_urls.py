@@ -0,0 +1,99 @@
+"""Measure how fast the files of a Globus transfer are resolved from docs.
+
+Every file of a transfer is resolved to its Globus endpoint and path from the
+URLs of its ESG-Search doc. The benchmark compares resolving synthetic docs
+one at a time, with the inline pattern ``globus_info_from_doc`` used before,
+against resolving them a page at a time with ``globus_info_from_docs``.
+
+Run it from the ``backend`` directory:
+
+    python -m benchmarks.globus_urls --docs 100000
+"""
+
+import argparse
+import os
+import re
+import statistics
+import time
+from typing import Callable
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from benchmarks.fake_esgf import file_doc  # noqa: E402
+from metagrid.api_globus.views import (  # noqa: E402
+    DATANODE_MAP,
+    ENDPOINT_MAP,
+    globus_info_from_docs,
+)
+
+
+def per_doc_info(doc) -> tuple[str, str]:
+    """The resolution of a single doc, as done before."""
+    for entry in doc["url"]:
+        match = re.match(
+            r"globus:([a-f0-9-]+)(\/[^|]+)\|Globus\|Globus", entry
+        )
+        if match:
+            endpoint_id, path = match.groups()
+            endpoint_id = DATANODE_MAP.get(doc["data_node"], endpoint_id)
+            endpoint_id = ENDPOINT_MAP.get(endpoint_id, endpoint_id)
+            return (endpoint_id, path)
+    raise ValueError(f"Unable to find Globus info from doc urls: {doc['url']}")
+
+
+def time_runs(fn: Callable[[], object], repeat: int) -> list[float]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def report(label: str, timings: list[float], docs: int):
+    median = statistics.median(timings)
+    print(
+        f"{label:<10} median {median * 1000:8.2f} ms"
+        f"   {docs / median / 1e6:6.2f} M docs/s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=100_000)
+    parser.add_argument("--page-size", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    docs = [file_doc(i, "") for i in range(args.docs)]
+    pages = [
+        docs[start : start + args.page_size]
+        for start in range(0, len(docs), args.page_size)
+    ]
+    expected = [per_doc_info(doc) for doc in docs]
+    assert [
+        info for page in pages for info in globus_info_from_docs(page)
+    ] == (expected)
+
+    per_doc = time_runs(
+        lambda: [per_doc_info(doc) for doc in docs], args.repeat
+    )
+    batched = time_runs(
+        lambda: [globus_info_from_docs(page) for page in pages], args.repeat
+    )
+
+    print(
+        f"{args.docs} docs, pages of {args.page_size}, {args.repeat} runs each"
+    )
+    report("per doc", per_doc, args.docs)
+    report("batched", batched, args.docs)
+    speedup = statistics.median(per_doc) / statistics.median(batched)
+    print(f"speedup    {speedup:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
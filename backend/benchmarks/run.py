@@ -0,0 +1,343 @@
+"""Load-test Metagrid's endpoints against the local ESG-Search stand-in.
+
+By default the backend is served in-process, with a threaded WSGI server,
+against a ``FakeESGFServer`` started on a free port. Each scenario sends a
+fixed number of requests from a pool of concurrent clients and reports the
+throughput and the p50/p95/p99 latencies of its endpoint.
+
+Run it from the ``backend`` directory, with the database reachable:
+
+    python -m benchmarks.run --requests 500 --concurrency 32 --latency 0.05
+
+To load an already running backend instead, point it at a fake server
+started with ``python -m benchmarks.fake_esgf`` and pass ``--base-url``
+(plus ``--token`` and ``--user-pk`` for the cart scenario). ``--max-p95``
+makes the run fail when any scenario is slower than the given number of
+milliseconds, so it can gate a deploy.
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Optional
+
+import requests
+
+from benchmarks.fake_esgf import FACETS, FakeESGFConfig, FakeESGFServer
+
+
+@dataclass
+class Context:
+    base_url: str
+    token: Optional[str] = None
+    user_pk: Optional[int] = None
+    local = threading.local()
+
+    @property
+    def session(self) -> requests.Session:
+        if not hasattr(self.local, "session"):
+            self.local.session = requests.Session()
+            if self.token:
+                self.local.session.headers["Authorization"] = (
+                    f"Bearer {self.token}"
+                )
+        return self.local.session
+
+    def get(self, path: str, **kwargs) -> requests.Response:
+        return self.session.get(self.base_url + path, **kwargs)
+
+
+@dataclass
+class Scenario:
+    name: str
+    run: Callable[[Context, int], Optional[requests.Response]]
+    """Sends the i-th request. Returning None means an in-process call."""
+    needs_user: bool = False
+    in_process: bool = False
+
+
+@dataclass
+class Result:
+    name: str
+    requests: int
+    errors: int
+    seconds: float
+    latencies_ms: list[float] = field(repr=False)
+
+    @property
+    def throughput(self) -> float:
+        return self.requests / self.seconds
+
+    def percentile(self, p: float) -> float:
+        ordered = sorted(self.latencies_ms)
+        rank = max(0, min(len(ordered) - 1, round(p / 100 * len(ordered)) - 1))
+        return ordered[rank]
+
+    def summary(self) -> dict:
+        return {
+            "name": self.name,
+            "requests": self.requests,
+            "errors": self.errors,
+            "throughput": round(self.throughput, 1),
+            "p50_ms": round(self.percentile(50), 2),
+            "p95_ms": round(self.percentile(95), 2),
+            "p99_ms": round(self.percentile(99), 2),
+        }
+
+
+def project_listing(ctx: Context, i: int):
+    return ctx.get("/api/v1/projects/")
+
+
+def facet_search(ctx: Context, i: int):
+    # Cycle through a few distinct queries, as many users browsing the same
+    # projects would
+    return ctx.get(
+        "/proxy/search",
+        params={
+            "project": "CMIP6",
+            "offset": 0,
+            "limit": 0,
+            "type": "Dataset",
+            "format": "application/solr+json",
+            "facets": ",".join(FACETS[: 2 + i % 6]),
+        },
+    )
+
+
+def dataset_search(ctx: Context, i: int):
+    return ctx.get(
+        "/proxy/search",
+        params={
+            "project": "CMIP6",
+            "offset": 10 * (i % 50),
+            "limit": 10,
+            "type": "Dataset",
+            "format": "application/solr+json",
+        },
+    )
+
+
+def node_status(ctx: Context, i: int):
+    return ctx.get("/proxy/status")
+
+
+def wget_script(ctx: Context, i: int):
+    return ctx.get("/proxy/wget", params={"dataset_id": f"CMIP6.Bench.{i}"})
+
+
+def cart_update(ctx: Context, i: int):
+    items = [
+        {"id": f"CMIP6.Bench.{n}|esgf-node.ornl.gov", "number_of_files": 10}
+        for n in range(i % 50)
+    ]
+    return ctx.session.patch(
+        f"{ctx.base_url}/api/v1/carts/datasets/{ctx.user_pk}/",
+        json={"items": items},
+    )
+
+
+def globus_transfer_preparation(ctx: Context, i: int):
+    # The transfer view resolves every file to a Globus endpoint and path
+    # before submitting anything; submitting needs a real Globus account, so
+    # only the resolution is measured, in-process.
+    from metagrid.api_globus.views import GlobusMultiTransfer, search_files
+
+    transfer = GlobusMultiTransfer("token", "target", Path("/benchmark"))
+    for endpoint, path in search_files(
+        {"dataset_id": [f"CMIP6.Bench.{i}"], "limit": "500"}
+    ):
+        transfer.add_transfer(endpoint, path)
+    return None
+
+
+SCENARIOS = {
+    scenario.name: scenario
+    for scenario in [
+        Scenario("project-listing", project_listing),
+        Scenario("facet-search", facet_search),
+        Scenario("dataset-search", dataset_search),
+        Scenario("node-status", node_status),
+        Scenario("wget-script", wget_script),
+        Scenario("cart-update", cart_update, needs_user=True),
+        Scenario(
+            "globus-transfer-preparation",
+            globus_transfer_preparation,
+            in_process=True,
+        ),
+    ]
+}
+
+
+def run_scenario(
+    scenario: Scenario, ctx: Context, count: int, concurrency: int
+) -> Result:
+    latencies: list[float] = []
+    errors = 0
+    lock = threading.Lock()
+
+    def one(i: int):
+        nonlocal errors
+        start = time.perf_counter()
+        try:
+            response = scenario.run(ctx, i)
+            failed = response is not None and response.status_code >= 400
+        except Exception:
+            failed = True
+        elapsed = (time.perf_counter() - start) * 1000
+        with lock:
+            latencies.append(elapsed)
+            errors += failed
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(count)))
+    return Result(
+        scenario.name, count, errors, time.perf_counter() - start, latencies
+    )
+
+
+def serve_in_process() -> Context:
+    """Serve the backend on a free port and log in a benchmark user."""
+    import django
+    from django.core.servers.basehttp import (
+        ThreadedWSGIServer,
+        WSGIRequestHandler,
+    )
+
+    django.setup()
+
+    from django.core.wsgi import get_wsgi_application
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    from metagrid.users.models import User
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadedWSGIServer(("127.0.0.1", 0), QuietHandler)
+    server.daemon_threads = True
+    server.set_app(get_wsgi_application())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    user, _ = User.objects.get_or_create(email="benchmark@example.com")
+    return Context(
+        base_url=f"http://127.0.0.1:{server.server_address[1]}",
+        token=str(RefreshToken.for_user(user).access_token),
+        user_pk=user.pk,
+    )
+
+
+def print_table(results: list[Result]):
+    header = (
+        f"{'scenario':<28} {'reqs':>6} {'errors':>6} {'req/s':>8}"
+        f" {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+    )
+    print(header)
+    print("-" * len(header))
+    for result in results:
+        summary = result.summary()
+        print(
+            f"{summary['name']:<28} {summary['requests']:>6}"
+            f" {summary['errors']:>6} {summary['throughput']:>8}"
+            f" {summary['p50_ms']:>8} {summary['p95_ms']:>8}"
+            f" {summary['p99_ms']:>8}"
+        )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "scenarios",
+        nargs="*",
+        metavar="scenario",
+        help=f"Scenarios to run, among {', '.join(SCENARIOS)} (default: all)",
+    )
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--base-url")
+    parser.add_argument("--token")
+    parser.add_argument("--user-pk", type=int)
+    parser.add_argument("--json", help="Also write the results to this file")
+    parser.add_argument(
+        "--max-p95",
+        type=float,
+        help="Exit with an error if any scenario's p95 exceeds this, in ms",
+    )
+    fake = parser.add_argument_group("fake ESG-Search server")
+    fake.add_argument("--latency", type=float, default=0.0)
+    fake.add_argument("--jitter", type=float, default=0.0)
+    fake.add_argument("--error-rate", type=float, default=0.0)
+    fake.add_argument("--num-found", type=int, default=1000)
+    fake.add_argument("--doc-bytes", type=int, default=0)
+    fake.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    fake_server = FakeESGFServer(
+        config=FakeESGFConfig(
+            latency=args.latency,
+            jitter=args.jitter,
+            error_rate=args.error_rate,
+            num_found=args.num_found,
+            doc_bytes=args.doc_bytes,
+            seed=args.seed,
+        )
+    ).start()
+    # Must be set before the settings are first read
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+    for name, path in [
+        ("SEARCH_URL", "/esg-search/search"),
+        ("WGET_URL", "/esg-search/wget"),
+        ("STATUS_URL", "/status"),
+    ]:
+        os.environ[f"METAGRID_{name}"] = fake_server.url + path
+
+    if args.base_url:
+        import django
+
+        django.setup()
+        ctx = Context(args.base_url, args.token, args.user_pk)
+    else:
+        ctx = serve_in_process()
+
+    results = []
+    for name in args.scenarios or SCENARIOS:
+        scenario = SCENARIOS[name]
+        if scenario.needs_user and not (ctx.token and ctx.user_pk):
+            print(f"Skipping {name}: it needs --token and --user-pk")
+            continue
+        results.append(
+            run_scenario(scenario, ctx, args.requests, args.concurrency)
+        )
+
+    print_table(results)
+    print(f"upstream requests: {dict(fake_server.requests)}")
+    fake_server.stop()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump([result.summary() for result in results], f, indent=2)
+
+    slow = [
+        result.name
+        for result in results
+        if args.max_p95 is not None and result.percentile(95) > args.max_p95
+    ]
+    if slow:
+        print(f"p95 above {args.max_p95} ms: {', '.join(slow)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
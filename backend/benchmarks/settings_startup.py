@@ -0,0 +1,74 @@
+"""Measure how long Django takes to load the settings in ``config.settings``.
+
+Loading the settings is what every process start and ``manage.py`` command
+pays before doing any work. The benchmark builds a fresh
+``django.conf.Settings`` repeatedly, once with the memoized settings and once
+with the memoization bypassed, which is how ``config.settings`` behaved
+before the settings were computed once per process.
+
+Run it from the ``backend`` directory:
+
+    python -m benchmarks.settings_startup --repeat 20
+"""
+
+import argparse
+import os
+import statistics
+import time
+from typing import Callable
+from unittest.mock import patch
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+
+from django.conf import Settings  # noqa: E402
+
+import config.settings  # noqa: E402
+
+memoized_settings = config.settings._combined_settings
+
+
+def load_settings() -> Settings:
+    return Settings("config.settings")
+
+
+def time_runs(fn: Callable[[], object], repeat: int) -> list[float]:
+    timings = []
+    for _ in range(repeat):
+        # Every load starts from a cold cache, as in a fresh process
+        memoized_settings.cache_clear()
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def report(label: str, timings: list[float]):
+    print(
+        f"{label:<10} median {statistics.median(timings) * 1000:8.2f} ms"
+        f"   min {min(timings) * 1000:8.2f} ms"
+        f"   max {max(timings) * 1000:8.2f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    lookups = sum(1 for name in dir(config.settings) if name.isupper())
+    print(f"{lookups} settings looked up per load, {args.repeat} loads each")
+
+    memoized = time_runs(load_settings, args.repeat)
+    with patch.object(
+        config.settings, "_combined_settings", memoized_settings.__wrapped__
+    ):
+        uncached = time_runs(load_settings, args.repeat)
+
+    report("uncached", uncached)
+    report("memoized", memoized)
+    speedup = statistics.median(uncached) / statistics.median(memoized)
+    print(f"speedup    {speedup:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+"""
+ASGI config for MetaGrid project.
+
+This module exposes the same Django application as ``wsgi.py`` through the
+ASGI protocol, as a module-level variable named ``application``. It also
+turns on ``METAGRID_PROXY_ASYNC_VIEWS`` unless it is set explicitly, so the
+views that wait on ESG-Search, Globus, DKRZ and the node status API run on
+the event loop and a single worker can hold many upstream calls in flight.
+
+Serve it with an ASGI worker, for example:
+
+    GUNICORN_WORKER_CLASS=uvicorn_worker.UvicornWorker \
+        gunicorn -c gunicorn_conf.py config.asgi
+
+"""
+
+import os
+import sys
+
+from django.core.asgi import get_asgi_application
+
+app_path = os.path.abspath(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+)
+sys.path.append(os.path.join(app_path, ".."))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+os.environ.setdefault("METAGRID_PROXY_ASYNC_VIEWS", "true")
+
+application = get_asgi_application()
@@ -1,3 +1,4 @@
+import functools
 from typing import Any, Iterable
 
 from .site_specific import MetagridBackendSettings, MetagridFrontendSettings
@@ -15,10 +16,33 @@ def __dir__() -> Iterable[str]:
     )
 
 
+@functools.cache
+def _combined_settings() -> dict[str, Any]:
+    """Build the settings once, reading the environment a single time.
+
+    Django looks up every option on this module while configuring itself,
+    so rebuilding the settings on each lookup would re-validate all three
+    models hundreds of times per process.
+    """
+    combined = DjangoStaticSettings().model_dump()
+    combined |= MetagridBackendSettings().model_dump()
+    combined |= MetagridFrontendSettings().model_dump()
+    return combined
+
+
+def reload() -> None:
+    """Discard the computed settings so the next access re-reads the
+    environment. Only this module is affected; ``django.conf.settings`` keeps
+    the values it has already loaded.
+    """
+    _combined_settings.cache_clear()
+
+
 def __getattr__(name: str) -> Any:
     """Turn the module access into a DjangoSettings access"""
-    _combined_settings = DjangoStaticSettings().model_dump()
-    _combined_settings |= MetagridBackendSettings().model_dump()
-    _combined_settings |= MetagridFrontendSettings().model_dump()
-
-    return _combined_settings[name]
+    try:
+        return _combined_settings()[name]
+    except KeyError:
+        raise AttributeError(
+            f"module {__name__!r} has no attribute {name!r}"
+        ) from None
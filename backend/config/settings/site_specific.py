@@ -50,6 +50,163 @@ class MetagridBackendSettings(BaseSettings):
         examples=["6aWj3gBYsxUBO++cSXtPzbl4n/sGJdhAmtn70XRoUMA="],
         description="A `Client Secret` associated with the Client UUID created for `SOCIAL_AUTH_GLOBUS_KEY` at https://app.globus.org/settings/developers",
     )
+    HTTP_POOL_MAXSIZE: int = Field(
+        default=10,
+        description="The number of keep-alive connections each backend worker keeps open to a single upstream host (ESG-Search, wget, node status, citation and Globus Auth endpoints).",
+    )
+    HTTP_POOL_MAXSIZE_PER_HOST: dict[str, int] = Field(
+        default={},
+        examples=[{"esgf-node.llnl.gov": 32}],
+        description="Per-host overrides of `HTTP_POOL_MAXSIZE`, keyed by upstream hostname.",
+    )
+    HTTP_MAX_RETRIES: int = Field(
+        default=3,
+        description="How many times an idempotent upstream request is retried after a connection error or a 502, 503 or 504 response.",
+    )
+    HTTP_RETRY_BACKOFF_FACTOR: float = Field(
+        default=0.5,
+        description="Backoff factor, in seconds, applied between upstream retries. The n-th retry waits `factor * 2 ** (n - 1)` seconds.",
+    )
+    HTTP_CONNECT_TIMEOUT: float = Field(
+        default=5.0,
+        description="Seconds to wait when opening a connection to an upstream host.",
+    )
+    HTTP_READ_TIMEOUT: float = Field(
+        default=60.0,
+        description="Seconds to wait for an upstream host to send data before the request is abandoned.",
+    )
+    SEARCH_CACHE_BACKEND: Literal["disabled", "memory", "django"] = Field(
+        default="memory",
+        description="Where `/proxy/search` responses are cached. `memory` keeps a per-worker LRU cache, `django` uses the Django cache named by `SEARCH_CACHE_ALIAS` so that workers can share entries, and `disabled` forwards every search upstream.",
+    )
+    SEARCH_CACHE_TTL: int = Field(
+        default=300,
+        description="Seconds a cached `/proxy/search` response is served before it is fetched again.",
+    )
+    SEARCH_CACHE_MAX_BYTES: int = Field(
+        default=64 * 1024 * 1024,
+        description="Upper bound, in bytes, on the response bodies held by the `memory` search cache of each worker. The least recently used responses are evicted first.",
+    )
+    SEARCH_CACHE_ALIAS: str = Field(
+        default="default",
+        description="The Django cache alias used when `SEARCH_CACHE_BACKEND` is `django`.",
+    )
+    SEARCH_COALESCE_ACROSS_WORKERS: bool = Field(
+        default=False,
+        description="Identical `/proxy/search` requests that arrive concurrently in one worker always share a single upstream fetch. When enabled, workers also coordinate through a lock in the `django` search cache so that only one of them fetches a given query at a time.",
+    )
+    SEARCH_COALESCE_TIMEOUT: float = Field(
+        default=30.0,
+        description="Seconds a worker waits for another worker's in-flight search before fetching it itself. Also the lifetime of the shared lock.",
+    )
+    PROXY_STREAMING: bool = Field(
+        default=False,
+        description="Stream upstream responses to the client chunk by chunk instead of buffering them in the worker. The upstream status, `Content-Type` and `Content-Encoding` are preserved. Applies to `/proxy/wget`, and to `/proxy/search` when `SEARCH_CACHE_BACKEND` is `disabled` (cached searches must be buffered).",
+    )
+    PROXY_STREAM_CHUNK_SIZE: int = Field(
+        default=64 * 1024,
+        description="Size, in bytes, of the chunks read from upstream when `PROXY_STREAMING` is enabled.",
+    )
+    WGET_MAX_DATASETS_PER_REQUEST: int = Field(
+        default=100,
+        description="The most datasets requested from `WGET_URL` at once. `/proxy/wget` requests for more datasets are split across several upstream requests, and the scripts they return are merged into one.",
+    )
+    WGET_MAX_PARALLEL_REQUESTS: int = Field(
+        default=4,
+        description="The number of upstream requests sent concurrently for a `/proxy/wget` request split by `WGET_MAX_DATASETS_PER_REQUEST`.",
+    )
+    PROXY_ASYNC_VIEWS: bool = Field(
+        default=False,
+        description="Route the proxy and Globus views that wait on upstream services to their async versions. Enabled by default when the backend is served through `config/asgi.py`, where blocking views would hold up the event loop.",
+    )
+    ASYNC_HTTP_MAX_CONNECTIONS: int = Field(
+        default=200,
+        description="The number of upstream connections the async views of one worker may hold open at once, across all upstream hosts.",
+    )
+    PROJECT_CATALOGUE_CHECK_INTERVAL: float = Field(
+        default=30.0,
+        description="How often, in seconds, a worker checks the database for changes to the project catalogue made by other processes, such as the project data migration. Changes made through the worker itself are picked up immediately.",
+    )
+    PROJECT_CATALOGUE_MAX_AGE: int = Field(
+        default=300,
+        description="The `max-age`, in seconds, sent with `/api/v1/projects/` responses. Clients revalidate with the response's ETag afterwards.",
+    )
+    GLOBUS_SEARCH_PAGE_SIZE: int = Field(
+        default=10000,
+        description="The number of files requested from ESG-Search per page when resolving the files of a Globus transfer. Transfers include every matching file, fetched over as many pages as needed.",
+    )
+    GLOBUS_SEARCH_MAX_PARALLEL_PAGES: int = Field(
+        default=4,
+        description="The number of pages of files fetched concurrently when resolving the files of a Globus transfer.",
+    )
+    GLOBUS_SUBMIT_MAX_WORKERS: int = Field(
+        default=8,
+        description="The number of Globus transfer tasks, one per source endpoint, submitted concurrently for a single transfer request.",
+    )
+    GLOBUS_TASK_MAX_ITEMS: int = Field(
+        default=10000,
+        description="The most files in a single Globus transfer task. A source endpoint with more files is transferred in several tasks.",
+    )
+    GLOBUS_TASK_MAX_BYTES: int = Field(
+        default=4 * 2**20,
+        description="The most bytes of file items in the document submitted for a single Globus transfer task. A source endpoint with larger lists of files is transferred in several tasks.",
+    )
+    GLOBUS_SUBMIT_TIMEOUT: float = Field(
+        default=30.0,
+        description="Timeout, in seconds, of each request made to Globus while submitting a transfer task.",
+    )
+    GLOBUS_SUBMIT_MAX_RETRIES: int = Field(
+        default=3,
+        description="How many times the submission of a Globus transfer task is retried after a network error, a timeout, or a 429 or 5xx response. Retries back off exponentially by `HTTP_RETRY_BACKOFF_FACTOR`.",
+    )
+    GLOBUS_APP_TOKEN_REFRESH_MARGIN: float = Field(
+        default=600.0,
+        description="How many seconds before it expires the app's own Globus transfer token, used to search endpoints for anonymous users, is refreshed in the background.",
+    )
+    GLOBUS_ENDPOINT_SEARCH_CACHE_TTL: float = Field(
+        default=60.0,
+        description="Seconds the results of a Globus endpoint search, made from the collection picker, are cached by each worker. Set to 0 to disable the cache.",
+    )
+    GLOBUS_ENDPOINT_SEARCH_CACHE_MAX_ENTRIES: int = Field(
+        default=1000,
+        description="The most endpoint searches cached by each worker. The least recently used searches are evicted first.",
+    )
+    GLOBUS_TRANSFER_JOB_WORKERS: int = Field(
+        default=4,
+        description="The number of background transfer jobs, created through `globus/transfer-jobs`, each web worker process runs at once. Further jobs wait in the queue.",
+    )
+    GLOBUS_TRANSFER_JOB_STALE_AFTER: int = Field(
+        default=3600,
+        description="Seconds after which an unfinished transfer job that has not progressed is marked as failed. Jobs only run in the worker process that queued them, so a job interrupted by a restart is failed once this delay has passed.",
+    )
+    CITATION_CACHE_TTL: int = Field(
+        default=7 * 24 * 3600,
+        description="Seconds a citation stored in the database is served before it is revalidated with DKRZ. Citations are served from the database, however old, while DKRZ cannot be reached.",
+    )
+    CITATION_MAX_PARALLEL_FETCHES: int = Field(
+        default=8,
+        description="The number of citations fetched from DKRZ concurrently for a single `/proxy/citations` request.",
+    )
+    CITATION_BATCH_MAX_URLS: int = Field(
+        default=100,
+        description="The most citations that can be requested at once from `/proxy/citations`.",
+    )
+    NODE_STATUS_POLL_INTERVAL: float = Field(
+        default=30.0,
+        description="Seconds between two refreshes of the node status served at `/proxy/status`, which each worker polls from `STATUS_URL` in the background.",
+    )
+    NODE_STATUS_CACHE_ALIAS: str = Field(
+        default="default",
+        description="The Django cache holding the node status. When it is shared between workers, only one of them polls `STATUS_URL` per interval.",
+    )
+    NODE_STATUS_STREAM_CHECK_INTERVAL: float = Field(
+        default=5.0,
+        description="Seconds between two checks for a new node status by each client of the server-sent events stream at `/proxy/status/stream`, when served asynchronously.",
+    )
+    NODE_STATUS_STREAM_DURATION: float = Field(
+        default=300.0,
+        description="Seconds after which `/proxy/status/stream` ends a stream when served asynchronously (see `PROXY_ASYNC_VIEWS`). Browsers reconnect on their own, so this only bounds how long a client holds a connection. Sync workers send the current status and end the stream at once, asking browsers to reconnect after `NODE_STATUS_POLL_INTERVAL`.",
+    )
 
 
 class MetagridFrontendSettings(BaseSettings):
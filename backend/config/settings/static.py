@@ -52,6 +52,7 @@ class DjangoStaticSettings(BaseSettings):
         "gunicorn",
         # Your apps
         "metagrid.api_proxy",
+        "metagrid.api_globus",
         "metagrid.users",
         "metagrid.projects",
         "metagrid.cart",
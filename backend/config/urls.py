@@ -1,3 +1,5 @@
+from types import ModuleType
+
 from allauth.socialaccount.providers.keycloak.views import (
     KeycloakOAuth2Adapter,
 )
@@ -5,31 +7,62 @@ from dj_rest_auth.registration.views import SocialLoginView, VerifyEmailView
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import include, path, re_path, reverse_lazy
+from django.urls import URLPattern, include, path, re_path, reverse_lazy
 from django.views.generic.base import RedirectView
 from drf_yasg import openapi
 from drf_yasg.views import get_schema_view
 from rest_framework import permissions
 from rest_framework.routers import DefaultRouter
 
-from metagrid.api_globus.views import create_globus_transfer, get_access_token
+from metagrid.api_globus import async_views as globus_async_views
+from metagrid.api_globus import views as globus_views
+from metagrid.api_globus.views import (
+    create_globus_transfer_job,
+    get_globus_transfer_job,
+)
+from metagrid.api_proxy import async_views as proxy_async_views
+from metagrid.api_proxy import views as proxy_views
 from metagrid.api_proxy.views import (
-    do_citation,
     do_globus_auth,
     do_globus_logout,
-    do_globus_search_endpoints,
-    do_search,
-    do_status,
-    do_wget,
     get_frontend_config,
     get_temp_storage,
     set_temp_storage,
 )
 from metagrid.cart.views import CartViewSet, SearchViewSet
-from metagrid.observability.views import liveness, readiness
+from metagrid.observability.views import http_pool_stats, liveness, readiness
 from metagrid.projects.views import ProjectsViewSet
 from metagrid.users.views import UserCreateViewSet, UserViewSet
 
+
+def upstream_urlpatterns(
+    proxy: ModuleType, globus: ModuleType
+) -> list[URLPattern]:
+    """Routes for the views waiting on upstream services.
+
+    ``proxy`` and ``globus`` are either the sync views modules or their
+    async counterparts, which offer the same views.
+    """
+    return [
+        path(
+            "proxy/globus-search-endpoints/",
+            proxy.do_globus_search_endpoints,
+            name="globus-search-endpoints",
+        ),
+        path("proxy/search", proxy.do_search, name="do-search"),
+        path("proxy/citation", proxy.do_citation, name="do-citation"),
+        path("proxy/citations", proxy.do_citations, name="do-citations"),
+        path("proxy/wget", proxy.do_wget, name="do-wget"),
+        path("proxy/status", proxy.do_status, name="do-status"),
+        path(
+            "proxy/status/stream",
+            proxy.do_status_stream,
+            name="do-status-stream",
+        ),
+        path("globus/auth", globus.get_access_token, name="globus_auth"),
+    ]
+
+
 router = DefaultRouter()
 router.register(r"users", UserViewSet)
 router.register(r"users", UserCreateViewSet)
@@ -59,29 +92,29 @@ urlpatterns = [
     path("", include("social_django.urls", namespace="social")),
     path("proxy/globus-logout/", do_globus_logout, name="globus-logout"),
     path("proxy/globus-auth/", do_globus_auth, name="globus-auth"),
-    path(
-        "proxy/globus-search-endpoints/",
-        do_globus_search_endpoints,
-        name="globus-search-endpoints",
-    ),
     # all-auth
     path("accounts/", include("allauth.urls"), name="socialaccount_signup"),
     # dj-rest-auth
     re_path(r"^dj-rest-auth/", include("dj_rest_auth.urls")),
-    path("proxy/search", do_search, name="do-search"),
-    path("proxy/citation", do_citation, name="do-citation"),
-    path("proxy/wget", do_wget, name="do-wget"),
-    path("proxy/status", do_status, name="do-status"),
     path(
         "dj-rest-auth/keycloak", KeycloakLogin.as_view(), name="keycloak_login"
     ),
     path("tempStorage/get", get_temp_storage, name="temp_storage_get"),
     path("tempStorage/set", set_temp_storage, name="temp_storage_set"),
-    path("globus/auth", get_access_token, name="globus_auth"),
-    path("globus/transfer", create_globus_transfer, name="globus_transfer"),
+    path(
+        "globus/transfer-jobs",
+        create_globus_transfer_job,
+        name="globus_transfer_jobs",
+    ),
+    path(
+        "globus/transfer-jobs/<uuid:job_id>",
+        get_globus_transfer_job,
+        name="globus_transfer_job",
+    ),
     path("frontend-config.js", get_frontend_config, name="frontend_config"),
     path("liveness", liveness, name="liveness"),
     path("readiness", readiness, name="readiness"),
+    path("metrics/http-pools", http_pool_stats, name="http_pool_stats"),
     re_path(
         r"^account-confirm-email/",
         VerifyEmailView.as_view(),
@@ -94,6 +127,13 @@ urlpatterns = [
     ),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
 
+# Under ASGI the views waiting on upstream services are replaced by their
+# async versions so they do not block the event loop
+if settings.PROXY_ASYNC_VIEWS:
+    urlpatterns += upstream_urlpatterns(proxy_async_views, globus_async_views)
+else:
+    urlpatterns += upstream_urlpatterns(proxy_views, globus_views)
+
 # drf-yasg configuration
 # https://drf-yasg.readthedocs.io/en/stable/readme.html#quickstart
 schema_view = get_schema_view(
@@ -42,6 +42,8 @@ def get_binding_addr() -> str:
 
 # Actual Gunicorn config variables
 workers: int = calculate_workers()
+# Use "uvicorn_worker.UvicornWorker" together with config.asgi
+worker_class: str = environ.get("GUNICORN_WORKER_CLASS", "sync")
 worker_tmp_dir: str = mkdtemp(prefix="/dev/shm/")
 loglevel: str = "DEBUG"
 errorlog: str = "-"
@@ -0,0 +1,9 @@
+from django.contrib import admin
+
+from metagrid.api_globus.models import TransferJob
+
+
+@admin.register(TransferJob)
+class TransferJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "status", "files_found", "created", "updated")
+    list_filter = ("status",)
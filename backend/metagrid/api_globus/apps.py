@@ -0,0 +1,5 @@
+from django.apps import AppConfig
+
+
+class ApiGlobusConfig(AppConfig):
+    name = "metagrid.api_globus"
@@ -0,0 +1,18 @@
+"""Async versions of the Globus views, routed when ``PROXY_ASYNC_VIEWS`` is
+enabled (see :mod:`metagrid.api_proxy.async_views`).
+"""
+
+from django.db import transaction
+from django.http import HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+
+from metagrid.api_globus import views
+from metagrid.api_proxy.async_views import do_request
+
+
+@transaction.non_atomic_requests
+@require_http_methods(["POST"])
+@csrf_exempt
+async def get_access_token(request) -> HttpResponse:
+    return await do_request(request, views.GLOBUS_TOKEN_URL)
@@ -0,0 +1,185 @@
+"""Run Globus transfers in the background.
+
+Resolving the files of a large transfer and submitting its tasks can take
+longer than a request should, so ``create_globus_transfer_job`` only records
+a ``TransferJob`` and hands it to a pool of worker threads. The work is
+waiting on ESG-Search and Globus, so threads in the web process are enough;
+the pool is created lazily, and again after a fork, so each worker process
+gets its own.
+
+The tokens of a transfer are never stored, so a job can only run in the
+process that queued it. A reaper thread in each process fails the jobs left
+unfinished by a restart once they have not progressed for
+``GLOBUS_TRANSFER_JOB_STALE_AFTER`` seconds.
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import TYPE_CHECKING, Callable, Optional
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from metagrid.api_globus.models import TransferJob
+
+if TYPE_CHECKING:  # pragma: no cover
+    from metagrid.api_globus.views import GlobusMultiTransfer, TransferRequest
+
+logger = logging.getLogger(__name__)
+
+# Seconds between two saves of a running job's progress
+HEARTBEAT_INTERVAL = 30
+
+# Seconds between two passes of the reaper over the unfinished jobs
+REAP_INTERVAL = 60
+
+_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_pid: Optional[int] = None
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor, _executor_pid
+    with _lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.GLOBUS_TRANSFER_JOB_WORKERS,
+                thread_name_prefix="globus-transfer-job",
+            )
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def enqueue(job: TransferJob, transfer: "TransferRequest"):
+    """Run the job once the transaction that created it commits."""
+    reaper.ensure_started()
+    transaction.on_commit(
+        lambda: get_executor().submit(_run_in_worker, job.pk, transfer)
+    )
+
+
+def _run_in_worker(job_id, transfer: "TransferRequest"):
+    try:
+        run_job(TransferJob.objects.get(pk=job_id), transfer)
+    except Exception:
+        logger.exception("Transfer job %s crashed", job_id)
+    finally:
+        close_old_connections()
+
+
+def run_job(job: TransferJob, transfer: "TransferRequest"):
+    # Imported here, as the views import this module
+    from metagrid.api_globus import views
+
+    # Claim the job, unless the reaper failed it while it waited in the queue
+    if not TransferJob.objects.filter(
+        pk=job.pk, status=TransferJob.QUEUED
+    ).update(status=TransferJob.RESOLVING, updated=timezone.now()):
+        return
+
+    try:
+        job.status = TransferJob.RESOLVING
+        client = views.prepare_transfer(transfer, heartbeat(job))
+
+        job.status = TransferJob.SUBMITTING
+        job.files_found = client.file_count
+        job.save(update_fields=["status", "files_found", "updated"])
+        result = client.submit_transfers()
+    except Exception as e:
+        job.status = TransferJob.FAILED
+        job.error = repr(e)
+        job.save(update_fields=["status", "error", "updated"])
+        return
+
+    job.tasks = result["tasks"]
+    job.failures = result["failures"]
+    if not result["failures"]:
+        job.status = TransferJob.SUCCEEDED
+    elif result["successes"]:
+        job.status = TransferJob.PARTIAL
+    else:
+        job.status = TransferJob.FAILED
+    job.save(update_fields=["status", "tasks", "failures", "updated"])
+
+
+def heartbeat(job: TransferJob) -> Callable[["GlobusMultiTransfer"], None]:
+    """Save the number of files found every ``HEARTBEAT_INTERVAL`` seconds
+    while the job's files are resolved, which can take long enough for
+    fail_stale_jobs() to take the job for an interrupted one otherwise.
+    """
+    last_beat = time.monotonic()
+
+    def beat(client: "GlobusMultiTransfer"):
+        nonlocal last_beat
+        if time.monotonic() - last_beat >= HEARTBEAT_INTERVAL:
+            job.files_found = client.file_count
+            job.save(update_fields=["files_found", "updated"])
+            last_beat = time.monotonic()
+
+    return beat
+
+
+def fail_stale_jobs(older_than: timedelta) -> int:
+    """Fail the unfinished jobs that have not progressed for a while.
+
+    Jobs only live in the memory of the process running them, so a job
+    whose process was restarted would otherwise never finish. The jobs are
+    claimed with SKIP LOCKED, so the reapers of several processes never
+    wait on each other.
+    """
+    with transaction.atomic():
+        stale = list(
+            TransferJob.objects.select_for_update(skip_locked=True)
+            .exclude(status__in=TransferJob.FINISHED)
+            .filter(updated__lt=timezone.now() - older_than)
+            .values_list("pk", flat=True)
+        )
+        return TransferJob.objects.filter(pk__in=stale).update(
+            status=TransferJob.FAILED,
+            error="The job was interrupted before it finished.",
+            updated=timezone.now(),
+        )
+
+
+class Reaper:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid: Optional[int] = None
+        self.stopped = threading.Event()
+
+    def ensure_started(self):
+        """Start the reaper of this process, unless it is running."""
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self.stopped.clear()
+            threading.Thread(
+                target=self.run, name="globus-transfer-reaper", daemon=True
+            ).start()
+
+    def run(self):
+        while not self.stopped.is_set():
+            try:
+                older_than = settings.GLOBUS_TRANSFER_JOB_STALE_AFTER
+                failed = fail_stale_jobs(timedelta(seconds=older_than))
+                if failed:
+                    logger.warning("Failed %d stale transfer job(s)", failed)
+            except Exception:
+                logger.exception("Failed to reap the stale transfer jobs")
+            finally:
+                close_old_connections()
+            self.stopped.wait(REAP_INTERVAL)
+
+    def stop(self):
+        with self._lock:
+            self.stopped.set()
+            self._pid = None
+
+
+reaper = Reaper()
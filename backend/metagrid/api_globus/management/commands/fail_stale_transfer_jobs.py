@@ -0,0 +1,21 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from metagrid.api_globus.jobs import fail_stale_jobs
+
+
+class Command(BaseCommand):
+    help = "Mark transfer jobs interrupted by a restart as failed"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--older-than",
+            type=int,
+            default=60,
+            help="Minutes since the job last made progress",
+        )
+
+    def handle(self, *args, **options):
+        failed = fail_stale_jobs(timedelta(minutes=options["older_than"]))
+        self.stdout.write(f"Marked {failed} stale transfer job(s) as failed.")
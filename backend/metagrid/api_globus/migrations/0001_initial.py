@@ -0,0 +1,67 @@
+# Generated by Django 5.0.7 on 2026-10-18 08:43
+
+import uuid
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="TransferJob",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("queued", "queued"),
+                            ("resolving", "resolving"),
+                            ("submitting", "submitting"),
+                            ("succeeded", "succeeded"),
+                            ("partial", "partial"),
+                            ("failed", "failed"),
+                        ],
+                        default="queued",
+                        max_length=16,
+                    ),
+                ),
+                (
+                    "session_key",
+                    models.CharField(editable=False, max_length=40),
+                ),
+                ("target_endpoint", models.CharField(max_length=255)),
+                ("target_path", models.CharField(max_length=1024)),
+                ("search_params", models.JSONField(default=dict)),
+                ("files_found", models.PositiveIntegerField(default=0)),
+                ("tasks", models.JSONField(default=list)),
+                ("failures", models.JSONField(default=list)),
+                ("error", models.TextField(blank=True, default="")),
+                ("created", models.DateTimeField(auto_now_add=True)),
+                ("updated", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Transfer Job",
+                "verbose_name_plural": "Transfer Jobs",
+                "indexes": [
+                    models.Index(
+                        fields=["status", "updated"],
+                        name="api_globus__status_509763_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,72 @@
+import uuid
+from typing import Any
+
+from django.db import models
+from django.db.models import JSONField as JSONBField  # type: ignore
+
+
+class TransferJob(models.Model):
+    """A Globus transfer resolved and submitted in the background.
+
+    The user's tokens are only held in memory by the worker running the job,
+    never stored.
+    """
+
+    QUEUED = "queued"
+    RESOLVING = "resolving"
+    SUBMITTING = "submitting"
+    SUCCEEDED = "succeeded"
+    PARTIAL = "partial"  # Some of the tasks failed to submit
+    FAILED = "failed"
+
+    STATUS_CHOICES = (
+        (QUEUED, QUEUED),
+        (RESOLVING, RESOLVING),
+        (SUBMITTING, SUBMITTING),
+        (SUCCEEDED, SUCCEEDED),
+        (PARTIAL, PARTIAL),
+        (FAILED, FAILED),
+    )
+    FINISHED = (SUCCEEDED, PARTIAL, FAILED)
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    status = models.CharField(
+        max_length=16, default=QUEUED, choices=STATUS_CHOICES
+    )
+    # The session that created the job, the only one allowed to read it
+    session_key = models.CharField(max_length=40, editable=False)
+    target_endpoint = models.CharField(max_length=255)
+    target_path = models.CharField(max_length=1024)
+    search_params = JSONBField(default=dict)
+    files_found = models.PositiveIntegerField(default=0)
+    # One entry per submitted task, as in GlobusSubmissionResult["tasks"]
+    tasks = JSONBField(default=list)
+    failures = JSONBField(default=list)
+    error = models.TextField(blank=True, default="")
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        """Meta definition for TransferJob."""
+
+        verbose_name = "Transfer Job"
+        verbose_name_plural = "Transfer Jobs"
+        indexes = [models.Index(fields=["status", "updated"])]
+
+    def __str__(self):
+        """Unicode representation of TransferJob."""
+        return f"{self.id} ({self.status})"
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "id": str(self.id),
+            "status": self.status,
+            "target_endpoint": self.target_endpoint,
+            "target_path": self.target_path,
+            "files_found": self.files_found,
+            "tasks": self.tasks,
+            "failures": self.failures,
+            "error": self.error,
+            "created": self.created.isoformat(),
+            "updated": self.updated.isoformat(),
+        }
@@ -1,5 +1,6 @@
 import json
 import pathlib
+from unittest.mock import patch
 
 import pytest
 
@@ -10,3 +11,9 @@ def json_fixture(request: pytest.FixtureRequest) -> dict:
     with open(test_dir / "fixtures" / request.param) as f:
         data = json.load(f)
     return data
+
+
+@pytest.fixture(autouse=True)
+def no_reaper():
+    with patch("metagrid.api_globus.jobs.reaper") as reaper:
+        yield reaper
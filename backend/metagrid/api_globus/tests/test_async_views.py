@@ -0,0 +1,21 @@
+from unittest.mock import AsyncMock, patch
+
+from asgiref.sync import async_to_sync
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory
+
+from metagrid.api_globus import async_views
+from metagrid.api_globus.views import GLOBUS_TOKEN_URL
+
+factory = AsyncRequestFactory()
+
+
+@patch("metagrid.api_globus.async_views.do_request", new_callable=AsyncMock)
+def test_get_access_token(do_request_mock):
+    do_request_mock.return_value = HttpResponse("{}")
+    request = factory.post("/api/v1/globus/auth", {})
+
+    response = async_to_sync(async_views.get_access_token)(request)
+
+    assert response.content == b"{}"
+    do_request_mock.assert_awaited_once_with(request, GLOBUS_TOKEN_URL)
@@ -0,0 +1,254 @@
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+import pytest
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from metagrid.api_globus import jobs
+from metagrid.api_globus.models import TransferJob
+from metagrid.api_globus.views import TransferRequest
+
+pytestmark = pytest.mark.django_db
+
+TRANSFER = TransferRequest("token", "target", Path("/target"), {})
+
+
+def submission_result(successes, failures):
+    return {
+        "status": status.HTTP_207_MULTI_STATUS,
+        "successes": successes,
+        "failures": failures,
+        "tasks": [{"source_endpoint": "a", "chunk": 0, "task_id": "1"}],
+    }
+
+
+def run_with_result(result) -> TransferJob:
+    job = TransferJob.objects.create(target_endpoint="target")
+    with patch("metagrid.api_globus.views.prepare_transfer") as prepare:
+        prepare.return_value.file_count = 3
+        prepare.return_value.submit_transfers.return_value = result
+        jobs.run_job(job, TRANSFER)
+    job.refresh_from_db()
+    return job
+
+
+def test_create_transfer_job_queues_job_after_commit(
+    api_client, django_capture_on_commit_callbacks
+):
+    with patch("metagrid.api_globus.jobs.get_executor") as get_executor:
+        with django_capture_on_commit_callbacks(execute=True):
+            response = api_client.post(
+                reverse("globus_transfer_jobs"),
+                data={
+                    "access_token": "access",
+                    "refresh_token": "refresh",
+                    "endpointId": "target",
+                    "path": "/target",
+                    "project": "CMIP6",
+                },
+                format="json",
+            )
+
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    job = TransferJob.objects.get(pk=response.json()["id"])
+    assert job.status == TransferJob.QUEUED
+    assert job.search_params == {"project": "CMIP6"}
+    # The tokens are handed to the worker, not stored
+    get_executor.return_value.submit.assert_called_once_with(
+        jobs._run_in_worker,
+        job.pk,
+        TransferRequest("access", "target", "/target", {"project": "CMIP6"}),
+    )
+
+
+def test_create_transfer_job_missing_parameter_returns_400(api_client):
+    response = api_client.post(
+        reverse("globus_transfer_jobs"), data={}, format="json"
+    )
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert not TransferJob.objects.exists()
+
+
+def create_job(client) -> str:
+    with patch("metagrid.api_globus.jobs.get_executor"):
+        response = client.post(
+            reverse("globus_transfer_jobs"),
+            data={
+                "access_token": "access",
+                "refresh_token": "refresh",
+                "endpointId": "target",
+                "path": "/target",
+            },
+            format="json",
+        )
+    return response.json()["id"]
+
+
+def test_get_transfer_job(api_client, no_reaper):
+    job_id = create_job(api_client)
+
+    response = api_client.get(
+        reverse("globus_transfer_job", kwargs={"job_id": job_id})
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    no_reaper.ensure_started.assert_called()
+    assert response.json()["status"] == TransferJob.QUEUED
+    assert response.json()["target_path"] == "/target"
+    assert str(TransferJob.objects.get()) == f"{job_id} (queued)"
+
+
+def test_get_transfer_job_of_another_session_returns_404(api_client):
+    job_id = create_job(APIClient())
+
+    response = api_client.get(
+        reverse("globus_transfer_job", kwargs={"job_id": job_id})
+    )
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_get_unknown_transfer_job_returns_404(api_client):
+    response = api_client.get(
+        reverse(
+            "globus_transfer_job",
+            kwargs={"job_id": "00000000-0000-0000-0000-000000000000"},
+        )
+    )
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.parametrize(
+    "successes, failures, expected",
+    [
+        ([{"task_id": "1"}], [], TransferJob.SUCCEEDED),
+        ([{"task_id": "1"}], ["error"], TransferJob.PARTIAL),
+        ([], ["error"], TransferJob.FAILED),
+    ],
+)
+def test_run_job_records_submission_result(successes, failures, expected):
+    job = run_with_result(submission_result(successes, failures))
+
+    assert job.status == expected
+    assert job.files_found == 3
+    assert job.failures == failures
+    assert job.tasks == [{"source_endpoint": "a", "chunk": 0, "task_id": "1"}]
+
+
+def test_run_job_skips_a_job_already_failed():
+    job = TransferJob.objects.create(status=TransferJob.FAILED)
+    with patch("metagrid.api_globus.views.prepare_transfer") as prepare:
+        jobs.run_job(job, TRANSFER)
+
+    prepare.assert_not_called()
+    assert TransferJob.objects.get().status == TransferJob.FAILED
+
+
+def test_run_job_saves_progress_while_resolving():
+    job = TransferJob.objects.create(target_endpoint="target")
+    progress = []
+
+    def prepare(transfer, beat):
+        client = Mock(file_count=0)
+        for count, interval in ((1, 60), (2, 0), (3, 60)):
+            client.file_count = count
+            with patch(
+                "metagrid.api_globus.jobs.HEARTBEAT_INTERVAL", interval
+            ):
+                beat(client)
+            progress.append(
+                TransferJob.objects.values_list("files_found", "updated").get()
+            )
+        raise ValueError("stop")
+
+    with patch("metagrid.api_globus.views.prepare_transfer", prepare):
+        jobs.run_job(job, TRANSFER)
+
+    (_, resolving), (found, beat), unchanged = progress
+    assert found == 2 and beat > resolving
+    assert unchanged == (found, beat)
+
+
+def test_run_job_records_resolution_error():
+    job = TransferJob.objects.create(target_endpoint="target")
+    with patch(
+        "metagrid.api_globus.views.prepare_transfer",
+        side_effect=ValueError("no files"),
+    ):
+        jobs.run_job(job, TRANSFER)
+
+    job.refresh_from_db()
+    assert job.status == TransferJob.FAILED
+    assert job.error == "ValueError('no files')"
+
+
+def test_run_in_worker_logs_crashes(caplog):
+    with patch("metagrid.api_globus.jobs.close_old_connections") as close:
+        jobs._run_in_worker("00000000-0000-0000-0000-000000000000", TRANSFER)
+
+    assert "crashed" in caplog.text
+    close.assert_called_once()
+
+
+def test_get_executor_is_recreated_after_fork():
+    executor = jobs.get_executor()
+    assert jobs.get_executor() is executor
+
+    with patch("metagrid.api_globus.jobs.os.getpid", return_value=-1):
+        assert jobs.get_executor() is not executor
+
+
+def test_fail_stale_transfer_jobs_command():
+    stale, recent, finished = TransferJob.objects.bulk_create(
+        [
+            TransferJob(status=TransferJob.SUBMITTING),
+            TransferJob(status=TransferJob.RESOLVING),
+            TransferJob(status=TransferJob.SUCCEEDED),
+        ]
+    )
+    TransferJob.objects.filter(pk__in=[stale.pk, finished.pk]).update(
+        updated=timezone.now() - timedelta(hours=2)
+    )
+    out = StringIO()
+
+    call_command("fail_stale_transfer_jobs", "--older-than=60", stdout=out)
+
+    assert "Marked 1 stale transfer job(s) as failed." in out.getvalue()
+    statuses = dict(TransferJob.objects.values_list("pk", "status"))
+    assert statuses == {
+        stale.pk: TransferJob.FAILED,
+        recent.pk: TransferJob.RESOLVING,
+        finished.pk: TransferJob.SUCCEEDED,
+    }
+
+
+@override_settings(GLOBUS_TRANSFER_JOB_STALE_AFTER=60)
+@patch("metagrid.api_globus.jobs.REAP_INTERVAL", 0.01)
+def test_reaper_keeps_failing_stale_jobs_after_errors(caplog):
+    reaper = jobs.Reaper()
+    with patch(
+        "metagrid.api_globus.jobs.fail_stale_jobs",
+        side_effect=[ValueError(), 2, 0, 0, 0],
+    ) as fail_stale_jobs, patch(
+        "metagrid.api_globus.jobs.close_old_connections"
+    ):
+        reaper.ensure_started()
+        reaper.ensure_started()
+        for _ in range(500):
+            if fail_stale_jobs.call_count >= 3:
+                break
+            reaper.stopped.wait(0.01)
+        reaper.stop()
+
+    fail_stale_jobs.assert_called_with(timedelta(seconds=60))
+    assert "Failed to reap the stale transfer jobs" in caplog.text
+    assert "Failed 2 stale transfer job(s)" in caplog.text
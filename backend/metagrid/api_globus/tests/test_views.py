@@ -1,14 +1,44 @@
 import json
-from unittest.mock import patch
+import threading
+from pathlib import Path
+from unittest.mock import MagicMock, patch
 
 import pytest
+import requests
 import responses
 from django.conf import settings
+from django.test import override_settings
 from django.urls import reverse
+from globus_sdk import GlobusAPIError, GlobusHTTPResponse, NetworkError
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from metagrid.api_globus.views import globus_info_from_doc, search_files
+from metagrid.api_globus import jobs
+from metagrid.api_globus.models import TransferJob
+from metagrid.api_globus.views import (
+    TRANSFER_ITEM_OVERHEAD,
+    GlobusMultiTransfer,
+    TransferRequest,
+    globus_info_from_doc,
+    globus_info_from_docs,
+    prepare_transfer,
+    search_files,
+)
+
+
+def run_transfer_job() -> TransferJob:
+    job = TransferJob.objects.create(target_endpoint="test_endpoint_id")
+    jobs.run_job(
+        job,
+        TransferRequest(
+            "test_access_token",
+            "test_endpoint_id",
+            Path("test_path"),
+            {"project": "CMIP6"},
+        ),
+    )
+    job.refresh_from_db()
+    return job
 
 
 @responses.activate
@@ -28,7 +58,7 @@ def test_get_access_token(api_client: APIClient):
 def test_globus_transfer_missing_required_parameter_returns_400(
     missing_param, api_client
 ):
-    url = reverse("globus_transfer")
+    url = reverse("globus_transfer_jobs")
 
     postdata = {
         "access_token": "",
@@ -47,27 +77,17 @@ def test_globus_transfer_missing_required_parameter_returns_400(
 @pytest.mark.parametrize(
     "json_fixture", ["esgsearch_multiple_results.json"], indirect=True
 )
-def test_globus_multi_transfer_submits_tasks(
-    submit_mock, json_fixture, api_client
-):
+def test_globus_multi_transfer_submits_tasks(submit_mock, json_fixture):
     responses.add(responses.GET, settings.SEARCH_URL, json=json_fixture)
     responses.add(
         responses.GET,
         "https://transfer.api.globus.org/v0.10/submission_id",
         json={"value": "someid"},
     )
+    submit_mock.return_value.data = {"task_id": "1"}
+    submit_mock.return_value.get.return_value = "1"
 
-    api_client.post(
-        reverse("globus_transfer"),
-        data={
-            "access_token": "test_access_token",
-            "refresh_token": "test_refresh_token",
-            "endpointId": "test_endpoint_id",
-            "path": "test_path",
-            "project": "CMIP6",
-        },
-        format="json",
-    )
+    run_transfer_job()
 
     assert submit_mock.called_with(
         {
@@ -110,8 +130,8 @@ def test_globus_multi_transfer_submits_tasks(
 @pytest.mark.parametrize(
     "json_fixture", ["esgsearch_multiple_results.json"], indirect=True
 )
-def test_globus_transfer_returns_207_when_submission_errors(
-    submit_mock, json_fixture, api_client
+def test_globus_transfer_job_fails_when_submissions_all_error(
+    submit_mock, json_fixture
 ):
     responses.add(responses.GET, settings.SEARCH_URL, json=json_fixture)
     responses.add(
@@ -120,19 +140,10 @@ def test_globus_transfer_returns_207_when_submission_errors(
         json={"value": "someid"},
     )
 
-    response = api_client.post(
-        reverse("globus_transfer"),
-        data={
-            "access_token": "test_access_token",
-            "refresh_token": "test_refresh_token",
-            "endpointId": "test_endpoint_id",
-            "path": "test_path",
-            "project": "CMIP6",
-        },
-        format="json",
-    )
+    job = run_transfer_job()
 
-    assert response.status_code == status.HTTP_207_MULTI_STATUS
+    assert job.status == TransferJob.FAILED
+    assert job.failures == ["ValueError()"]
 
 
 @responses.activate
@@ -140,8 +151,8 @@ def test_globus_transfer_returns_207_when_submission_errors(
 @pytest.mark.parametrize(
     "json_fixture", ["esgsearch_multiple_results.json"], indirect=True
 )
-def test_globus_transfer_returns_200_when_submissions_all_succeed(
-    json_fixture, api_client
+def test_globus_transfer_job_succeeds_when_submissions_all_succeed(
+    json_fixture,
 ):
     responses.add(responses.GET, settings.SEARCH_URL, json=json_fixture)
     responses.add(
@@ -156,19 +167,9 @@ def test_globus_transfer_returns_200_when_submissions_all_succeed(
         responses.POST, "https://transfer.api.globus.org/v0.10/transfer"
     )
 
-    response = api_client.post(
-        reverse("globus_transfer"),
-        data={
-            "access_token": "test_access_token",
-            "refresh_token": "test_refresh_token",
-            "endpointId": "test_endpoint_id",
-            "path": "test_path",
-            "project": "CMIP6",
-        },
-        format="json",
-    )
+    job = run_transfer_job()
 
-    assert response.status_code == status.HTTP_200_OK
+    assert job.status == TransferJob.SUCCEEDED
 
 
 @responses.activate
@@ -176,24 +177,13 @@ def test_globus_transfer_returns_200_when_submissions_all_succeed(
 @pytest.mark.parametrize(
     "json_fixture", ["esgsearch_invalid_globus_url.json"], indirect=True
 )
-def test_globus_transfer_returns_502_for_invalid_endpoint_id(
-    json_fixture, api_client
-):
+def test_globus_transfer_job_fails_for_invalid_endpoint_id(json_fixture):
     responses.add(responses.GET, settings.SEARCH_URL, json=json_fixture)
 
-    response = api_client.post(
-        reverse("globus_transfer"),
-        data={
-            "access_token": "test_access_token",
-            "refresh_token": "test_refresh_token",
-            "endpointId": "test_endpoint_id",
-            "path": "test_path",
-            "project": "CMIP6",
-        },
-        format="json",
-    )
+    job = run_transfer_job()
 
-    assert response.status_code == status.HTTP_502_BAD_GATEWAY
+    assert job.status == TransferJob.FAILED
+    assert job.error.startswith("ValueError(")
 
 
 @pytest.mark.parametrize(
@@ -331,7 +321,45 @@ def test_globus_info_from_doc_raises_value_error():
         globus_info_from_doc(doc)
 
 
-@patch("requests.get")
+@patch(
+    "metagrid.api_globus.views.DATANODE_MAP",
+    {"remapped.node": "dead-beef-0001"},
+)
+@patch(
+    "metagrid.api_globus.views.ENDPOINT_MAP",
+    {"dead-beef-0001": "something-new"},
+)
+def test_globus_info_from_docs_resolves_page_in_order():
+    docs = [
+        {
+            "data_node": node,
+            "url": [
+                f"https://{node}/thredds/fileServer/data/{i}.nc|application/netcdf|HTTPServer",
+                f"globus:dead-beef-000{i % 2}/data/{i}.nc|Globus|Globus",
+                "globus:ignored/second/url|Globus|Globus",
+            ],
+        }
+        for i, node in enumerate(["a.node", "b.node", "remapped.node"] * 2)
+    ]
+
+    assert globus_info_from_docs(docs) == [
+        ("dead-beef-0000", "/data/0.nc"),
+        ("something-new", "/data/1.nc"),
+        ("something-new", "/data/2.nc"),
+        ("something-new", "/data/3.nc"),
+        ("dead-beef-0000", "/data/4.nc"),
+        ("something-new", "/data/5.nc"),
+    ]
+
+
+def test_globus_info_from_docs_rejects_malformed_globus_url():
+    doc = {"url": ["globus:NOT-HEX/path|Globus|Globus"], "data_node": "n"}
+
+    with pytest.raises(ValueError):
+        globus_info_from_docs([doc])
+
+
+@patch("metagrid.api_proxy.upstream.get")
 def test_search_files_raises_value_error_when_no_response_or_docs(mock_get):
     # Simulate a response with missing 'response' and 'docs'
     mock_get.return_value.text = '{"unexpected": "structure"}'
@@ -342,7 +370,7 @@ def test_search_files_raises_value_error_when_no_response_or_docs(mock_get):
         list(search_files({"project": "CMIP6"}))
 
 
-@patch("requests.get")
+@patch("metagrid.api_proxy.upstream.get")
 def test_search_files_json_decode_error(mock_get):
     # Simulate a response that raises a JSONDecodeError
     mock_get.return_value.text = "not a json string"
@@ -356,3 +384,263 @@ def test_search_files_json_decode_error(mock_get):
         match="ESGF search did not return results: not a json string",
     ):
         list(search_files({"project": "CMIP6"}))
+
+
+def paged_search(num_found, shrink_to=None):
+    """A responses callback paging through generated file docs."""
+
+    def callback(request):
+        offset = int(request.params["offset"])
+        limit = int(request.params["limit"])
+        end = min(offset + limit, shrink_to or num_found)
+        docs = [
+            {
+                "data_node": "esgf-node.llnl.gov",
+                "url": [f"globus:dead-beef/file{i}.nc|Globus|Globus"],
+            }
+            for i in range(offset, end)
+        ]
+        body = {"response": {"numFound": num_found, "docs": docs}}
+        return 200, {}, json.dumps(body)
+
+    return callback
+
+
+@responses.activate
+@override_settings(
+    GLOBUS_SEARCH_PAGE_SIZE=10, GLOBUS_SEARCH_MAX_PARALLEL_PAGES=2
+)
+def test_search_files_pages_through_every_result():
+    responses.add_callback(
+        responses.GET, settings.SEARCH_URL, callback=paged_search(45)
+    )
+
+    globus_info = list(search_files({"dataset_id": ["CMIP6.a"]}))
+
+    assert globus_info == [("dead-beef", f"/file{i}.nc") for i in range(45)]
+    pages = sorted(
+        (int(call.request.params["offset"]), int(call.request.params["limit"]))
+        for call in responses.calls
+    )
+    assert pages == [(0, 10), (10, 10), (20, 10), (30, 10), (40, 5)]
+
+
+@responses.activate
+@override_settings(
+    GLOBUS_SEARCH_PAGE_SIZE=10, GLOBUS_SEARCH_MAX_PARALLEL_PAGES=2
+)
+def test_search_files_stops_at_explicit_limit():
+    responses.add_callback(
+        responses.GET, settings.SEARCH_URL, callback=paged_search(45)
+    )
+
+    globus_info = list(search_files({"project": "CMIP6", "limit": "15"}))
+
+    assert len(globus_info) == 15
+    assert len(responses.calls) == 2
+
+
+@responses.activate
+@override_settings(
+    GLOBUS_SEARCH_PAGE_SIZE=10, GLOBUS_SEARCH_MAX_PARALLEL_PAGES=1
+)
+def test_search_files_stops_when_results_shrink():
+    responses.add_callback(
+        responses.GET,
+        settings.SEARCH_URL,
+        callback=paged_search(45, shrink_to=15),
+    )
+
+    globus_info = list(search_files({"project": "CMIP6"}))
+
+    assert len(globus_info) == 15
+    assert len(responses.calls) == 2
+
+
+def test_prepare_transfer_reports_progress_after_each_file():
+    transfer = TransferRequest("token", "target", Path("/target"), {})
+    counts = []
+    with patch(
+        "metagrid.api_globus.views.search_files",
+        return_value=[("a", "/a.nc"), ("b", "/b.nc")],
+    ):
+        client = prepare_transfer(
+            transfer, lambda client: counts.append(client.file_count)
+        )
+
+    assert counts == [1, 2]
+    assert client.file_count == 2
+
+
+def transfer_response(status_code, data):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = json.dumps(data).encode()
+    response.request = requests.Request(
+        "POST", "https://transfer.api.globus.org/v0.10/transfer"
+    ).prepare()
+    return response
+
+
+def globus_api_error(status_code):
+    return GlobusAPIError(transfer_response(status_code, {}))
+
+
+def submitted_task(task_id):
+    return GlobusHTTPResponse(
+        transfer_response(202, {"task_id": task_id}), client=MagicMock()
+    )
+
+
+def multi_transfer(*endpoints):
+    transfer = GlobusMultiTransfer("token", "target", Path("/target"))
+    for endpoint in endpoints:
+        transfer.add_transfer(endpoint, f"/data/{endpoint}.nc")
+    return transfer
+
+
+@patch("globus_sdk.TransferClient.submit_transfer", autospec=True)
+def test_submit_transfers_submits_endpoints_concurrently(submit_mock):
+    barrier = threading.Barrier(3, timeout=5)
+
+    def submit(client, task):
+        # Fails with BrokenBarrierError unless all three run at once
+        barrier.wait()
+        return submitted_task(task["source_endpoint"])
+
+    submit_mock.side_effect = submit
+
+    transfer = multi_transfer("a", "b", "c")
+    assert transfer.file_count == 3
+    result = transfer.submit_transfers()
+
+    assert result["status"] == status.HTTP_200_OK
+    assert result["successes"] == [
+        {"task_id": "a"},
+        {"task_id": "b"},
+        {"task_id": "c"},
+    ]
+    assert result["tasks"] == [
+        {
+            "source_endpoint": e,
+            "chunk": 0,
+            "files": 1,
+            "task_id": e,
+            "error": None,
+        }
+        for e in "abc"
+    ]
+
+
+@patch("metagrid.api_globus.views.time.sleep")
+@patch("globus_sdk.TransferClient.submit_transfer")
+def test_submit_task_retries_transient_failures(submit_mock, sleep_mock):
+    submit_mock.side_effect = [
+        NetworkError("timed out", Exception()),
+        globus_api_error(503),
+        submitted_task("a"),
+    ]
+
+    result = multi_transfer("a").submit_transfers()
+
+    assert result["successes"] == [{"task_id": "a"}]
+    assert [call.args[0] for call in sleep_mock.call_args_list] == [0.5, 1.0]
+
+
+@patch("metagrid.api_globus.views.time.sleep")
+@patch("globus_sdk.TransferClient.submit_transfer")
+def test_submit_task_gives_up_after_max_retries(submit_mock, sleep_mock):
+    submit_mock.side_effect = globus_api_error(502)
+
+    with override_settings(GLOBUS_SUBMIT_MAX_RETRIES=2):
+        result = multi_transfer("a").submit_transfers()
+
+    assert result["status"] == status.HTTP_207_MULTI_STATUS
+    assert len(result["failures"]) == 1
+    assert submit_mock.call_count == 3
+
+
+@patch("metagrid.api_globus.views.time.sleep")
+@patch("globus_sdk.TransferClient.submit_transfer")
+def test_submit_task_does_not_retry_client_errors(submit_mock, sleep_mock):
+    submit_mock.side_effect = globus_api_error(400)
+
+    result = multi_transfer("a").submit_transfers()
+
+    assert len(result["failures"]) == 1
+    assert submit_mock.call_count == 1
+    sleep_mock.assert_not_called()
+
+
+@override_settings(GLOBUS_TASK_MAX_ITEMS=2)
+@patch("globus_sdk.TransferClient.submit_transfer", autospec=True)
+def test_submit_transfers_splits_endpoints_by_item_count(submit_mock):
+    submit_mock.side_effect = lambda client, task: submitted_task(
+        ",".join(item["source_path"] for item in task["DATA"])
+    )
+    transfer = GlobusMultiTransfer("token", "target", Path("/target"))
+    for path in ["/a1", "/a2", "/a3", "/a4", "/a5"]:
+        transfer.add_transfer("a", path)
+    transfer.add_transfer("b", "/b1")
+
+    result = transfer.submit_transfers()
+
+    assert result["status"] == status.HTTP_200_OK
+    assert [
+        (
+            task["source_endpoint"],
+            task["chunk"],
+            task["files"],
+            task["task_id"],
+        )
+        for task in result["tasks"]
+    ] == [
+        ("a", 0, 2, "/a1,/a2"),
+        ("a", 1, 2, "/a3,/a4"),
+        ("a", 2, 1, "/a5"),
+        ("b", 0, 1, "/b1"),
+    ]
+    destinations = [
+        item["destination_path"]
+        for call in submit_mock.call_args_list
+        for item in call.args[1]["DATA"]
+    ]
+    assert destinations == [
+        "/target/a1",
+        "/target/a2",
+        "/target/a3",
+        "/target/a4",
+        "/target/a5",
+        "/target/b1",
+    ]
+
+
+def test_transfer_chunks_are_bounded_by_document_size():
+    transfer = GlobusMultiTransfer("token", "target", Path("/target"))
+    for i in range(10):
+        transfer.add_transfer("a", f"/data/file_{i}.nc")
+    item_size = (
+        len(
+            json.dumps(
+                {
+                    "source_path": "/data/file_0.nc",
+                    "destination_path": "/target/file_0.nc",
+                }
+            )
+        )
+        + TRANSFER_ITEM_OVERHEAD
+    )
+
+    with override_settings(GLOBUS_TASK_MAX_BYTES=3 * item_size):
+        chunks = list(transfer.transfer_chunks())
+
+    assert [(chunk, len(items)) for _, chunk, items in chunks] == [
+        (0, 3),
+        (1, 3),
+        (2, 3),
+        (3, 1),
+    ]
+
+    # A file larger than the limit still gets a task of its own
+    with override_settings(GLOBUS_TASK_MAX_BYTES=1):
+        assert len(list(transfer.transfer_chunks())) == 10
@@ -1,26 +1,46 @@
+import itertools
 import json
 import os
 import re
-from collections import defaultdict
+import time
+from collections import defaultdict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Any, Generator, Sequence, TypedDict
+from typing import (
+    Any,
+    Callable,
+    Generator,
+    NamedTuple,
+    Optional,
+    Sequence,
+    TypedDict,
+)
 
-import requests
 from django.conf import settings
 from django.http import HttpResponse, HttpResponseBadRequest, JsonResponse
+from django.shortcuts import get_object_or_404
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from globus_sdk import (
     AccessTokenAuthorizer,
+    GlobusAPIError,
     GlobusHTTPResponse,
+    NetworkError,
     TransferClient,
     TransferData,
 )
 from rest_framework import status
 
+from metagrid.api_globus import jobs
+from metagrid.api_globus.models import TransferJob
+from metagrid.api_proxy import upstream
 from metagrid.api_proxy.views import do_request
 
+GLOBUS_TOKEN_URL = "https://auth.globus.org/v2/oauth2/token"
+
+TRANSIENT_GLOBUS_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
 ENDPOINT_MAP: dict[str, str] = {
     "415a6320-e49c-11e5-9798-22000b9da45e": "1889ea03-25ad-4f9f-8110-1ce8833a9d7e",
 }
@@ -30,10 +50,29 @@ DATANODE_MAP: dict[str, str] = {
 }
 
 
+class TransferItem(TypedDict):
+    source_path: str
+    destination_path: str
+
+
+# What TransferData adds to the JSON of each item: '"DATA_TYPE":
+# "transfer_item", ' and the separator from the next item
+TRANSFER_ITEM_OVERHEAD = 32
+
+
+class SubmittedTask(TypedDict):
+    source_endpoint: str
+    chunk: int  # Index of the task among its source endpoint's tasks
+    files: int
+    task_id: Optional[str]  # None if the submission failed
+    error: Optional[str]
+
+
 class GlobusSubmissionResult(TypedDict):
     status: int  # HTTP status code
     successes: list[GlobusHTTPResponse]
     failures: list[str]
+    tasks: list[SubmittedTask]  # One per submitted task, in order
 
 
 class SolrResultDoc(TypedDict):
@@ -55,6 +94,55 @@ class ESGSearchResponse(TypedDict):
     facet_counts: dict
 
 
+# ex: globus:dead-beef-cafe/path/to/file|Globus|Globus
+GLOBUS_URL_PATTERN = re.compile(
+    r"globus:([a-f0-9-]+)(\/[^|]+)\|Globus\|Globus"
+)
+
+
+def globus_info_from_docs(
+    docs: Sequence[SolrResultDoc],
+) -> list[tuple[str, str]]:
+    """
+    Extract the Globus endpoint_id and file path of every doc of a page of ESGSearch results.
+
+    Parameters:
+    - docs (Sequence[SolrResultDoc]): The result documents from the ESGSearch API.
+
+    Returns:
+    - list[tuple[str, str]]: The Globus endpoint_id and file path of each doc, in order.
+
+    Raises:
+    - ValueError: If the Globus info of any doc cannot be found from its URLs.
+
+    Only the URLs starting with "globus:" are matched against GLOBUS_URL_PATTERN, and the overrides from DATANODE_MAP and ENDPOINT_MAP are looked up once per data node and endpoint of the page rather than once per doc.
+    """
+    match_url = GLOBUS_URL_PATTERN.match
+    endpoints: dict[tuple[str, str], str] = {}
+    results = []
+    for doc in docs:
+        for entry in doc["url"]:
+            if not entry.startswith("globus:"):
+                continue
+            match = match_url(entry)
+            if match:
+                endpoint_id, path = match.groups()
+                key = (doc["data_node"], endpoint_id)
+                endpoint = endpoints.get(key)
+                if endpoint is None:
+                    # Apply overrides
+                    endpoint = DATANODE_MAP.get(doc["data_node"], endpoint_id)
+                    endpoint = ENDPOINT_MAP.get(endpoint, endpoint)
+                    endpoints[key] = endpoint
+                results.append((endpoint, path))
+                break
+        else:
+            raise ValueError(
+                f"Unable to find Globus info from doc urls: {doc['url']}"
+            )
+    return results
+
+
 def globus_info_from_doc(doc: SolrResultDoc) -> tuple[str, str]:
     """
     Extract Globus endpoint_id and file path from an ESGSearch result doc.
@@ -68,7 +156,7 @@ def globus_info_from_doc(doc: SolrResultDoc) -> tuple[str, str]:
     Raises:
     - ValueError: If the function is unable to find the Globus info from the doc's URLs.
 
-    The function iterates through the URLs in the doc and uses a regular expression to match the pattern "globus:<endpoint_id>/<file_path>|Globus|Globus". If a match is found, the function extracts the endpoint_id and file_path and applies any necessary overrides using the DATANODE_MAP and ENDPOINT_MAP dictionaries. If no match is found, the function raises a ValueError.
+    The first URL matching the pattern "globus:<endpoint_id>/<file_path>|Globus|Globus" is used, with any overrides from the DATANODE_MAP and ENDPOINT_MAP dictionaries applied. See globus_info_from_docs() to resolve a whole page of docs at once.
 
     Example:
     >>> doc = {"url": ["globus:dead-beef-cafe/path/to/file|Globus|Globus"]}
@@ -76,25 +164,38 @@ def globus_info_from_doc(doc: SolrResultDoc) -> tuple[str, str]:
     >>> print(endpoint_id, file_path)
     dead-beef-cafe path/to/file
     """
+    return globus_info_from_docs([doc])[0]
 
-    for entry in doc["url"]:
-        # ex: globus:dead-beef-cafe/path/to/file|Globus|Globus
-        match = re.match(
-            r"globus:([a-f0-9-]+)(\/[^|]+)\|Globus\|Globus", entry
-        )
-        if match:
-            endpoint_id, path = match.groups()
 
-            # Apply overrides
-            endpoint_id = DATANODE_MAP.get(doc["data_node"], endpoint_id)
-            endpoint_id = ENDPOINT_MAP.get(endpoint_id, endpoint_id)
+def _search_page(
+    params: dict[str, Any], offset: int, limit: int
+) -> SolrResult:
+    """Fetch one page of an ESG-Search file query."""
+    results = upstream.get(
+        url=settings.SEARCH_URL,
+        params=params | {"offset": str(offset), "limit": str(limit)},
+    )
+    resultsText = results.text
 
-            return (endpoint_id, path)
-    raise ValueError(f"Unable to find Globus info from doc urls: {doc['url']}")
+    try:
+        resultsJson = results.json()
+    except json.JSONDecodeError:
+        print("ESGF search did not return JSON")
+        print("Results Text:", resultsText)
+        resultsJson = {}
+
+    if "response" not in resultsJson or "docs" not in resultsJson.get(
+        "response", {}
+    ):
+        print("ESGF search did not return expected values!")
+        print("Results Text:", resultsText)
+        raise ValueError(f"ESGF search did not return results: {resultsText}")
+
+    return resultsJson["response"]
 
 
 def search_files(
-    url_params: dict[str, str],
+    url_params: dict[str, Any],
 ) -> Generator[tuple[str, str], Any, None]:
     """
     This function searches for files in the Earth System Grid Federation (ESGF) repository using the ESGF search API.
@@ -105,7 +206,9 @@ def search_files(
     Returns:
     - Generator[tuple[str, str], Any, None]: A generator that yields tuples containing the Globus endpoint_id and file path extracted from the search results.
 
-    The function first constructs a set of default query parameters for the ESGF search API. If no parameters are provided in `url_params`, it defaults to searching for a single file with a limit of 1 and disabling distribution. It then sends a GET request to the ESGF search API with the combined query parameters and processes the JSON response to extract the necessary information.
+    The function first constructs a set of default query parameters for the ESGF search API. If no parameters are provided in `url_params`, it defaults to searching for a single file and disabling distribution. Otherwise every matching file is returned, or at most `limit` files if `url_params` has one.
+
+    Results are fetched in pages of at most `GLOBUS_SEARCH_PAGE_SIZE` files. After the first page, up to `GLOBUS_SEARCH_MAX_PARALLEL_PAGES` pages are fetched concurrently, and each page is yielded, in order, as soon as it arrives and then released, so memory use does not grow with the number of files.
 
     Example:
     >>> url_params = {"type": "File", "format": "application/solr+json", "fields": "url,data_node", "limit": "10000"}
@@ -117,43 +220,62 @@ def search_files(
         "type": "File",
         "format": "application/solr+json",
         # "fields": "url,data_node",
-        "limit": "10000",
     }
+    max_files: Optional[int] = None
 
     # If no parameters were passed to the API, then assume they want a single
     # file and default to limit=1 and distrib=false
     if not url_params:
-        query_defaults |= {"limit": "1", "distrib": "false"}
+        query_defaults |= {"distrib": "false"}
+        max_files = 1
+
+    if url_params.get("limit") is not None:
+        max_files = int(url_params.pop("limit"))
 
     if url_params.get("dataset_id") is not None:
         url_params["dataset_id"] = ",".join(url_params["dataset_id"])
 
-    results = requests.get(
-        url=settings.SEARCH_URL,
-        params=query_defaults | url_params,
-    )
-    resultsText = results.text
+    params = query_defaults | url_params
+    page_size = settings.GLOBUS_SEARCH_PAGE_SIZE
+    if max_files is not None:
+        page_size = min(page_size, max_files)
 
-    try:
-        resultsJson = results.json()
-    except json.JSONDecodeError:
-        print("ESGF search did not return JSON")
-        print("Results Text:", resultsText)
-        resultsJson = {}
+    first_page = _search_page(params, 0, page_size)
+    yield from globus_info_from_docs(first_page["docs"])
+    if len(first_page["docs"]) < page_size:
+        return
 
-    # Warning message about the number of files retrieved
-    # being smaller than the total number found for the query
-    #    values = {"files": results["response"]["docs"], "wget_info": [wget_empty_path, url_params_list],            "file_info": [num_files_found, file_limit]}
+    total = first_page["numFound"]
+    if max_files is not None:
+        total = min(total, max_files)
+    offsets = iter(range(page_size, total, page_size))
 
-    if "response" not in resultsJson or "docs" not in resultsJson.get(
-        "response", {}
-    ):
-        print("ESGF search did not return expected values!")
-        print("Results Text:", resultsText)
-        raise ValueError(f"ESGF search did not return results: {resultsText}")
+    pool = ThreadPoolExecutor(
+        max_workers=settings.GLOBUS_SEARCH_MAX_PARALLEL_PAGES
+    )
+    pending: deque[tuple[int, Future[SolrResult]]] = deque()
+
+    def fetch_next():
+        offset = next(offsets, None)
+        if offset is not None:
+            limit = min(page_size, total - offset)
+            pending.append(
+                (limit, pool.submit(_search_page, params, offset, limit))
+            )
 
-    for doc in resultsJson["response"]["docs"]:
-        yield globus_info_from_doc(doc)
+    try:
+        for _ in range(settings.GLOBUS_SEARCH_MAX_PARALLEL_PAGES):
+            fetch_next()
+        while pending:
+            limit, future = pending.popleft()
+            page = future.result()
+            fetch_next()
+            yield from globus_info_from_docs(page["docs"])
+            if len(page["docs"]) < limit:
+                # The results shrank since the first page was fetched
+                return
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
 
 
 class GlobusMultiTransfer:
@@ -164,7 +286,12 @@ class GlobusMultiTransfer:
         self.target_endpoint: str = target_endpoint
         self.target_directory: Path = target_directory
         self.client = TransferClient(
-            authorizer=AccessTokenAuthorizer(access_token)
+            authorizer=AccessTokenAuthorizer(access_token),
+            # Retries are handled by submit_task()
+            transport_params={
+                "http_timeout": settings.GLOBUS_SUBMIT_TIMEOUT,
+                "max_retries": 0,
+            },
         )
 
     def add_transfer(self, endpoint, path):
@@ -177,62 +304,151 @@ class GlobusMultiTransfer:
         """
         self.transfer_map[endpoint].append(path)
 
+    @property
+    def file_count(self) -> int:
+        return sum(map(len, self.transfer_map.values()))
+
     def submit_transfers(self) -> GlobusSubmissionResult:
         """
-        Submits the previously stored transfers, one per source endpoint, to the specified target_endpoint.
+        Submits the previously stored transfers, in one or more tasks per source endpoint (see transfer_chunks()), to the specified target_endpoint.
 
 
         Returns:
         - GlobusSubmissionResult: A dictionary containing the status code, successes, and failures of the transfer submission process.
 
         The status code is set to HTTP_207_MULTI_STATUS by default, indicating that there may be multiple status codes due to potential failures. The successes list contains the successful transfer submissions, while the failures list contains any exceptions that occurred during the submission process. If there are no failures, the status code is updated to HTTP_200_OK.
+
+        The tasks are submitted concurrently, by up to `GLOBUS_SUBMIT_MAX_WORKERS` threads, and the results keep the order of the source endpoints and of their chunks.
         """
 
         # TODO: Let user specify deadline in their request
-        endpoint_tasks = []
-        for endpoint, source_files in self.transfer_map.items():
-            task = TransferData(
-                self.client,
-                endpoint,
-                self.target_endpoint,
-                deadline=datetime.now(timezone.utc) + timedelta(days=10),
-            )
-            endpoint_tasks.append(task)
-            for source_file in source_files:
-                task.add_item(
-                    source_path=source_file,
-                    destination_path=os.path.join(
-                        self.target_directory, os.path.basename(source_file)
-                    ),
-                )
+        deadline = datetime.now(timezone.utc) + timedelta(days=10)
+        chunks = list(self.transfer_chunks())
 
         # Container for the final jsonable response
         results: GlobusSubmissionResult = {
             "status": status.HTTP_207_MULTI_STATUS,  # Multiple status codes in case of failures
             "successes": [],
             "failures": [],
+            "tasks": [],
         }
 
         # Submit the transfers and fill the container with results.
-        for task in endpoint_tasks:
-            try:
-                submission: GlobusHTTPResponse = self.client.submit_transfer(
-                    task
-                )
-                results["successes"].append(submission.data)
-            except Exception as e:
-                results["failures"].append(repr(e))
+        with ThreadPoolExecutor(
+            max_workers=settings.GLOBUS_SUBMIT_MAX_WORKERS
+        ) as pool:
+            submissions = [
+                pool.submit(self.submit_chunk, endpoint, items, deadline)
+                for endpoint, _, items in chunks
+            ]
+            for (endpoint, chunk, items), future in zip(chunks, submissions):
+                submitted: SubmittedTask = {
+                    "source_endpoint": endpoint,
+                    "chunk": chunk,
+                    "files": len(items),
+                    "task_id": None,
+                    "error": None,
+                }
+                try:
+                    response = future.result()
+                    results["successes"].append(response.data)
+                    submitted["task_id"] = response.get("task_id")
+                except Exception as e:
+                    results["failures"].append(repr(e))
+                    submitted["error"] = repr(e)
+                results["tasks"].append(submitted)
 
         if not results["failures"]:
             # No failures, give it the happy code
             results["status"] = status.HTTP_200_OK
         return results
 
+    def transfer_chunks(
+        self,
+    ) -> Generator[tuple[str, int, list[TransferItem]], None, None]:
+        """
+        Split the stored transfers into the items of each task to submit.
 
-@require_http_methods(["POST"])
-@csrf_exempt
-def create_globus_transfer(request) -> HttpResponse:
+        Yields:
+        - tuple[str, int, list[TransferItem]]: The source endpoint, the index of the chunk among that endpoint's chunks, and the chunk's items.
+
+        Each endpoint's files are split into tasks of at most `GLOBUS_TASK_MAX_ITEMS` items, whose items add up to at most `GLOBUS_TASK_MAX_BYTES` of JSON, so no single submission grows with the size of the transfer.
+        """
+        max_items = settings.GLOBUS_TASK_MAX_ITEMS
+        max_bytes = settings.GLOBUS_TASK_MAX_BYTES
+        for endpoint, source_files in self.transfer_map.items():
+            index = 0
+            items: list[TransferItem] = []
+            size = 0
+            for source_file in source_files:
+                item: TransferItem = {
+                    "source_path": source_file,
+                    "destination_path": os.path.join(
+                        self.target_directory, os.path.basename(source_file)
+                    ),
+                }
+                item_size = len(json.dumps(item)) + TRANSFER_ITEM_OVERHEAD
+                if items and (
+                    len(items) >= max_items or size + item_size > max_bytes
+                ):
+                    yield endpoint, index, items
+                    index += 1
+                    items, size = [], 0
+                items.append(item)
+                size += item_size
+            if items:
+                yield endpoint, index, items
+
+    def submit_chunk(
+        self, endpoint: str, items: list[TransferItem], deadline: datetime
+    ) -> GlobusHTTPResponse:
+        # The task is built in the submitting thread, so only the tasks being
+        # submitted are held in memory as TransferData
+        task = TransferData(
+            source_endpoint=endpoint,
+            destination_endpoint=self.target_endpoint,
+            deadline=deadline,
+        )
+        for item in items:
+            task.add_item(**item)
+        return self.submit_task(task)
+
+    def submit_task(self, task: TransferData) -> GlobusHTTPResponse:
+        """
+        Submit one task, retrying transient failures with exponential backoff.
+
+        Parameters:
+        - task (TransferData): The task to submit.
+
+        Network errors, timeouts and 429 or 5xx responses from Globus are retried up to `GLOBUS_SUBMIT_MAX_RETRIES` times. The task's submission_id is fetched by the first attempt and reused by the retries, so Globus never starts the same transfer twice.
+        """
+        for attempt in itertools.count():
+            try:
+                return self.client.submit_transfer(task)
+            except (NetworkError, GlobusAPIError) as e:
+                transient = isinstance(e, NetworkError) or (
+                    e.http_status in TRANSIENT_GLOBUS_STATUS_CODES
+                )
+                if (
+                    not transient
+                    or attempt >= settings.GLOBUS_SUBMIT_MAX_RETRIES
+                ):
+                    raise
+            time.sleep(settings.HTTP_RETRY_BACKOFF_FACTOR * 2**attempt)
+        raise AssertionError("unreachable")
+
+
+class TransferRequest(NamedTuple):
+    access_token: str
+    target_endpoint: str
+    target_folder: Path
+    url_params: dict[str, Any]  # The search for the files to transfer
 
+
+def parse_transfer_request(request) -> Optional[TransferRequest]:
+    """
+    Read a transfer request's body, or return None if it is incomplete.
+    """
     url_params: dict[str, Any] = json.loads(request.body)
 
     access_token: str = url_params.pop("access_token", None)
@@ -248,26 +464,71 @@ def create_globus_transfer(request) -> HttpResponse:
             target_folder,
         )
     ):
-        return HttpResponseBadRequest(
-            "Request is missing one or more of the following: target_endpoint, target_folder, access_token, or refresh_token."
-        )
+        return None
+    return TransferRequest(
+        access_token, target_endpoint, target_folder, url_params
+    )
 
-    try:
-        client = GlobusMultiTransfer(
-            access_token, target_endpoint, target_folder
-        )
-        for endpoint, path in search_files(url_params):
-            client.add_transfer(endpoint, path)
 
-        result = client.submit_transfers()
-        return JsonResponse(result, status=result["status"])
-    except Exception as e:
-        return HttpResponse(repr(e), status=status.HTTP_502_BAD_GATEWAY)
+def prepare_transfer(
+    transfer: TransferRequest,
+    progress: Optional[Callable[[GlobusMultiTransfer], None]] = None,
+) -> GlobusMultiTransfer:
+    """
+    Resolve the files of a transfer request to their Globus endpoints.
+
+    `progress`, if given, is called with the client after each file.
+    """
+    client = GlobusMultiTransfer(
+        transfer.access_token, transfer.target_endpoint, transfer.target_folder
+    )
+    for endpoint, path in search_files(transfer.url_params):
+        client.add_transfer(endpoint, path)
+        if progress is not None:
+            progress(client)
+    return client
+
+
+MISSING_TRANSFER_PARAMETERS = "Request is missing one or more of the following: target_endpoint, target_folder, access_token, or refresh_token."
 
 
 @require_http_methods(["POST"])
 @csrf_exempt
-def get_access_token(request) -> HttpResponseBadRequest | HttpResponse:
-    url = "https://auth.globus.org/v2/oauth2/token"
+def create_globus_transfer_job(request) -> HttpResponse:
+    """
+    Queue a transfer to be resolved and submitted in the background.
+
+    Responds at once with the job, whose progress can then be polled from
+    get_globus_transfer_job() by the same session.
+    """
+    transfer = parse_transfer_request(request)
+    if transfer is None:
+        return HttpResponseBadRequest(MISSING_TRANSFER_PARAMETERS)
+
+    if request.session.session_key is None:
+        request.session.create()
+    job = TransferJob.objects.create(
+        session_key=request.session.session_key or "",
+        target_endpoint=transfer.target_endpoint,
+        target_path=str(transfer.target_folder),
+        search_params=transfer.url_params,
+    )
+    jobs.enqueue(job, transfer)
+    return JsonResponse(job.as_dict(), status=status.HTTP_202_ACCEPTED)
 
-    return do_request(request, url)
+
+@require_http_methods(["GET"])
+def get_globus_transfer_job(request, job_id) -> JsonResponse:
+    jobs.reaper.ensure_started()
+    # The jobs of other sessions are not found, rather than forbidden, so
+    # their ids cannot be probed
+    job = get_object_or_404(
+        TransferJob, pk=job_id, session_key=request.session.session_key
+    )
+    return JsonResponse(job.as_dict())
+
+
+@require_http_methods(["POST"])
+@csrf_exempt
+def get_access_token(request) -> HttpResponseBadRequest | HttpResponse:
+    return do_request(request, GLOBUS_TOKEN_URL)
@@ -0,0 +1,96 @@
+"""Pooled async HTTP clients for calls to upstream services.
+
+The async counterpart of :mod:`metagrid.api_proxy.upstream`, used by the
+views in :mod:`metagrid.api_proxy.async_views`. One ``httpx.AsyncClient`` is
+kept per event loop (and per TLS verification mode), so a single ASGI worker
+multiplexes all of its in-flight upstream calls over one connection pool.
+"""
+
+import asyncio
+import weakref
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+
+import httpx
+from django.conf import settings
+
+from metagrid.api_proxy.upstream import RETRY_STATUS_CODES
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+_clients: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, dict[bool, httpx.AsyncClient]
+] = weakref.WeakKeyDictionary()
+
+
+def build_transport(verify: bool) -> httpx.AsyncBaseTransport:
+    return httpx.AsyncHTTPTransport(
+        verify=verify,
+        retries=settings.HTTP_MAX_RETRIES,
+        limits=httpx.Limits(
+            max_connections=settings.ASYNC_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.ASYNC_HTTP_MAX_CONNECTIONS,
+        ),
+    )
+
+
+def get_client(verify: bool = True) -> httpx.AsyncClient:
+    """Return the client for the running event loop, creating it once."""
+    clients = _clients.setdefault(asyncio.get_running_loop(), {})
+    if verify not in clients:
+        # Upstream cookies must never leak from one proxied user to another
+        jar = CookieJar(policy=DefaultCookiePolicy(allowed_domains=[]))
+        clients[verify] = httpx.AsyncClient(
+            transport=build_transport(verify),
+            timeout=httpx.Timeout(
+                settings.HTTP_READ_TIMEOUT,
+                connect=settings.HTTP_CONNECT_TIMEOUT,
+            ),
+            cookies=jar,
+        )
+    return clients[verify]
+
+
+async def request(
+    method: str,
+    url: str,
+    verify: bool = True,
+    stream: bool = False,
+    **kwargs,
+) -> httpx.Response:
+    """Send a request upstream, retrying idempotent ones on 502/503/504.
+
+    Connection failures are retried by the transport. With ``stream=True``
+    the body is left unread and the caller must ``aclose()`` the response.
+    """
+    client = get_client(verify)
+    attempts = 1
+    if method in IDEMPOTENT_METHODS:
+        attempts += settings.HTTP_MAX_RETRIES
+
+    for attempt in range(attempts):
+        resp = await client.send(
+            client.build_request(method, url, **kwargs), stream=stream
+        )
+        if (
+            resp.status_code not in RETRY_STATUS_CODES
+            or attempt == attempts - 1
+        ):
+            break
+        await resp.aclose()
+        await asyncio.sleep(settings.HTTP_RETRY_BACKOFF_FACTOR * 2**attempt)
+    return resp
+
+
+async def get(url: str, **kwargs) -> httpx.Response:
+    return await request("GET", url, **kwargs)
+
+
+async def post(url: str, **kwargs) -> httpx.Response:
+    return await request("POST", url, **kwargs)
+
+
+async def aclose():
+    """Close the clients of the running event loop."""
+    clients = _clients.pop(asyncio.get_running_loop(), {})
+    for client in clients.values():
+        await client.aclose()
@@ -0,0 +1,278 @@
+"""Async versions of the proxy views that wait on upstream services.
+
+These are routed instead of their counterparts in
+:mod:`metagrid.api_proxy.views` when ``PROXY_ASYNC_VIEWS`` is enabled, which
+``config/asgi.py`` does by default. Request parsing, caching and coalescing
+follow the sync views exactly; only the waiting is done on the event loop.
+
+Django cannot wrap async views in the request-wide transaction that
+``ATOMIC_REQUESTS`` asks for, so every view here is marked
+``non_atomic_requests``, including the sync views they delegate to.
+Those sync views use the database, so they run thread-sensitive, the
+``sync_to_async`` default: they share the request's connection, which
+Django closes when the request finishes, instead of leaving one open in
+each thread of a pool.
+"""
+
+import asyncio
+import functools
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.http import (
+    HttpResponse,
+    HttpResponseBadRequest,
+    StreamingHttpResponse,
+)
+from django.http.response import HttpResponseBase
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_http_methods
+
+from metagrid.api_proxy import async_upstream, node_status, views, wget
+from metagrid.api_proxy.cache import (
+    CachedResponse,
+    cache_key,
+    get_search_cache,
+)
+from metagrid.api_proxy.singleflight import (
+    afetch_with_shared_lock,
+    async_search_flights,
+)
+from metagrid.cart import documents
+
+
+@transaction.non_atomic_requests
+async def do_globus_search_endpoints(request):
+    # globus_sdk only offers a blocking client, so the search runs in a
+    # worker thread rather than on the event loop.
+    return await sync_to_async(views.do_globus_search_endpoints)(request)
+
+
+@transaction.non_atomic_requests
+@require_http_methods(["GET", "POST"])
+@csrf_exempt
+async def do_search(request):
+    cache = get_search_cache()
+    if cache is None and settings.PROXY_STREAMING:
+        return await do_request(request, settings.SEARCH_URL, stream=True)
+    return await do_request(
+        request,
+        settings.SEARCH_URL,
+        cache=cache,
+        coalesce=True,
+        record=documents.record_in_background,
+    )
+
+
+@transaction.non_atomic_requests
+@require_http_methods(["POST"])
+@csrf_exempt
+async def do_citation(request):
+    # Citations are served from the database, so the sync view runs in a
+    # thread; the batch view fetches from DKRZ concurrently on its own
+    return await sync_to_async(views.do_citation)(request)
+
+
+@transaction.non_atomic_requests
+@require_http_methods(["POST"])
+@csrf_exempt
+async def do_citations(request):
+    return await sync_to_async(views.do_citations)(request)
+
+
+@transaction.non_atomic_requests
+@require_http_methods(["GET", "POST"])
+@csrf_exempt
+async def do_status(request):
+    # The snapshot is read from the cache, and only fetched upstream before
+    # the poller's first run, so the sync view is cheap to run in a thread
+    return await sync_to_async(views.do_status)(request)
+
+
+@transaction.non_atomic_requests
+@require_http_methods(["GET"])
+async def do_status_stream(request):
+    return views.event_stream_response(
+        aevent_stream(request.headers.get("Last-Event-ID"))
+    )
+
+
+async def aevent_stream(last_event_id):
+    """Server-sent events for each new snapshot, for a limited time.
+
+    Unlike :func:`node_status.event_stream`, an open stream waits on the
+    event loop rather than holding a worker, so it is kept open for
+    ``NODE_STATUS_STREAM_DURATION`` seconds. Browsers then reconnect and
+    send the id of the last event they received.
+    """
+    interval = settings.NODE_STATUS_STREAM_CHECK_INTERVAL
+    deadline = time.monotonic() + settings.NODE_STATUS_STREAM_DURATION
+    get_snapshot = sync_to_async(node_status.get_snapshot)
+    yield f"retry: {int(interval * 1000)}\n\n"
+    while True:
+        snapshot = await get_snapshot()
+        yield node_status.format_event(snapshot, last_event_id)
+        last_event_id = snapshot.etag
+        if time.monotonic() + interval >= deadline:
+            return
+        await asyncio.sleep(interval)
+
+
+@transaction.non_atomic_requests
+@gzip_page
+@require_http_methods(["GET", "POST"])
+@csrf_exempt
+async def do_wget(request):
+    upstream_request = views.build_upstream_request(request, True)
+    if upstream_request is not None:
+        method, params, _ = upstream_request
+        chunks = wget.split_request(method, params)
+        if chunks is not None:
+            return await _wget_in_chunks(method, chunks)
+    return await do_request(
+        request, settings.WGET_URL, True, stream=settings.PROXY_STREAMING
+    )
+
+
+async def _wget_in_chunks(method, chunks) -> HttpResponseBase:
+    semaphore = asyncio.Semaphore(settings.WGET_MAX_PARALLEL_REQUESTS)
+
+    async def fetch(kwargs):
+        async with semaphore:
+            return await async_upstream.request(
+                method, settings.WGET_URL, **kwargs
+            )
+
+    tasks = [asyncio.ensure_future(fetch(kwargs)) for kwargs in chunks]
+
+    def cancel():
+        for task in tasks:
+            task.cancel()
+
+    try:
+        first = await tasks[0]
+    except BaseException:
+        cancel()
+        raise
+    if first.status_code != 200:
+        cancel()
+        return HttpResponse(
+            first.content,
+            status=first.status_code,
+            content_type=first.headers.get("Content-Type"),
+        )
+    try:
+        parts = wget.split_script(first.text)
+    except ValueError:
+        cancel()
+        return HttpResponse("Unexpected wget script from upstream", status=502)
+
+    async def merged():
+        yield parts.head
+        yield parts.files
+        for task in tasks[1:]:
+            resp = await task
+            if resp.status_code != 200:
+                raise wget.WgetChunkError(
+                    f"wget returned {resp.status_code}: {resp.text}"
+                )
+            yield wget.split_script(resp.text).files
+        yield parts.tail
+
+    # The tasks are cancelled once the response is closed, even if the
+    # client disconnects before the script is read
+    response = StreamingHttpResponse(
+        views.ClosingContent(merged(), cancel),
+        content_type=first.headers.get("Content-Type", "text/x-sh"),
+    )
+    if "Content-Disposition" in first.headers:
+        response["Content-Disposition"] = first.headers["Content-Disposition"]
+    return response
+
+
+async def do_request(
+    request,
+    urlbase,
+    useBody=False,
+    cache=None,
+    coalesce=False,
+    stream=False,
+    record=None,
+):
+    upstream_request = views.build_upstream_request(request, useBody)
+    if upstream_request is None:  # pragma: no cover
+        return HttpResponseBadRequest("Request method must be POST or GET.")
+
+    method, params, kwargs = upstream_request
+    send = functools.partial(async_upstream.request, method, urlbase, **kwargs)
+
+    if stream:
+        return await _stream_upstream(request, send)
+
+    key = cache_key(urlbase, params)
+    cached = await cache.aget(key) if cache is not None else None
+    if cached is None:
+        cached = await _fetch_missing(send, cache, key, coalesce, record)
+
+    return HttpResponse(
+        cached.content, content_type=cached.content_type, status=cached.status
+    )
+
+
+async def _fetch_missing(send, cache, key, coalesce, record) -> CachedResponse:
+    fetch = functools.partial(_fetch_upstream, send, cache, key, record)
+    if not coalesce:
+        return await fetch()
+    if cache is not None and settings.SEARCH_COALESCE_ACROSS_WORKERS:
+        fetch = functools.partial(
+            afetch_with_shared_lock,
+            cache,
+            key,
+            fetch,
+            settings.SEARCH_COALESCE_TIMEOUT,
+        )
+    return await async_search_flights.do(key, fetch)
+
+
+async def _fetch_upstream(send, cache, key, record=None) -> CachedResponse:
+    if cache is not None and (cached := await cache.aget(key)) is not None:
+        return cached
+
+    resp = await send()
+    result = CachedResponse(resp.status_code, resp.content, "text/json")
+    if cache is not None and resp.status_code == 200:
+        await cache.aset(key, result)
+    if record is not None and resp.status_code == 200:
+        record(resp.content)
+    return result
+
+
+async def _stream_upstream(request, send) -> StreamingHttpResponse:
+    resp = await send(
+        stream=True,
+        headers={
+            "Accept-Encoding": request.headers.get(
+                "Accept-Encoding", "identity"
+            )
+        },
+    )
+    httpresp = StreamingHttpResponse(
+        _aiter_raw(resp),
+        status=resp.status_code,
+        content_type=resp.headers.get("Content-Type", "text/json"),
+    )
+    for header in ("Content-Encoding", "Content-Length"):
+        if header in resp.headers:
+            httpresp[header] = resp.headers[header]
+    return httpresp
+
+
+async def _aiter_raw(resp):
+    try:
+        async for chunk in resp.aiter_raw(settings.PROXY_STREAM_CHUNK_SIZE):
+            yield chunk
+    finally:
+        await resp.aclose()
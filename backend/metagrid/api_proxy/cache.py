@@ -0,0 +1,218 @@
+"""Server-side caching of upstream ESG-Search responses.
+
+Responses are keyed on the normalized query parameters of a request, so
+``?limit=0&project=CMIP6`` and ``?project=CMIP6&limit=0&limit=0`` share an
+entry. Only the key is normalized: requests are forwarded upstream with the
+parameters they were sent with. Two backends are available: an in-process
+LRU bounded by the total size of the cached bodies, and one backed by
+Django's cache framework so that several workers can share entries.
+"""
+
+import abc
+import functools
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Mapping, NamedTuple, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import QueryDict
+
+CACHE_KEY_PREFIX = "metagrid:proxy"
+
+
+class CachedResponse(NamedTuple):
+    status: int
+    content: bytes
+    content_type: str
+
+
+def normalize_params(params: Mapping[str, Any]) -> dict[str, list[str]]:
+    """Normalize request parameters into a canonical, sorted form.
+
+    Keys are sorted and the values of each key are de-duplicated and sorted.
+
+    Example:
+    >>> normalize_params({"project": ["CMIP6", "CMIP6"], "limit": 0})
+    {'limit': ['0'], 'project': ['CMIP6']}
+    """
+    if isinstance(params, QueryDict):
+        pairs = list(params.lists())
+    else:
+        pairs = [
+            (key, value if isinstance(value, list) else [value])
+            for key, value in params.items()
+        ]
+
+    normalized = {}
+    for key, values in sorted(pairs):
+        normalized[key] = sorted({str(value) for value in values})
+    return normalized
+
+
+def cache_key(urlbase: str, params: Mapping[str, Any]) -> str:
+    """Build a fixed-length cache key for a request to ``urlbase``."""
+    canonical = json.dumps([urlbase, normalize_params(params)])
+    digest = hashlib.sha256(canonical.encode()).hexdigest()
+    return f"{CACHE_KEY_PREFIX}:{digest}"
+
+
+class ResponseCache(abc.ABC):
+    """Interface shared by the response cache backends."""
+
+    @abc.abstractmethod
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """The cached response for ``key``, or None."""
+
+    @abc.abstractmethod
+    def set(self, key: str, response: CachedResponse):
+        """Cache ``response`` under ``key``."""
+
+    @abc.abstractmethod
+    def clear(self):
+        """Drop every cached response."""
+
+    @abc.abstractmethod
+    def acquire_lock(self, key: str, timeout: float) -> bool:
+        """Try to take a lock shared by every worker using this cache."""
+
+    @abc.abstractmethod
+    def release_lock(self, key: str):
+        """Release a lock taken with acquire_lock()."""
+
+    # Async variants used by the async views. The defaults call the sync
+    # methods directly, which is only appropriate for in-process backends.
+
+    async def aget(self, key: str) -> Optional[CachedResponse]:
+        return self.get(key)
+
+    async def aset(self, key: str, response: CachedResponse):
+        self.set(key, response)
+
+    async def aacquire_lock(self, key: str, timeout: float) -> bool:
+        return self.acquire_lock(key, timeout)
+
+    async def arelease_lock(self, key: str):
+        self.release_lock(key)
+
+
+class LocMemResponseCache(ResponseCache):
+    """A thread-safe, in-process LRU cache with a TTL and a byte bound."""
+
+    def __init__(self, ttl: int, max_bytes: int):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[float, CachedResponse]] = (
+            OrderedDict()
+        )
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, response = entry
+            if expires <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return response
+
+    def set(self, key: str, response: CachedResponse):
+        if len(response.content) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, response)
+            self.size += len(response.content)
+            while self.size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def acquire_lock(self, key: str, timeout: float) -> bool:
+        # Entries are private to this process, where SingleFlight already
+        # coalesces identical requests, so there is nobody to wait for.
+        return True
+
+    def release_lock(self, key: str):
+        pass
+
+    def _remove(self, key: str):
+        _, response = self._entries.pop(key)
+        self.size -= len(response.content)
+
+
+class DjangoResponseCache(ResponseCache):
+    """A response cache stored in one of the configured Django ``CACHES``."""
+
+    def __init__(self, ttl: int, alias: str):
+        self.ttl = ttl
+        self.alias = alias
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        entry = self.cache.get(key)
+        if entry is None:
+            return None
+        return CachedResponse(*entry)
+
+    def set(self, key: str, response: CachedResponse):
+        self.cache.set(key, tuple(response), timeout=self.ttl)
+
+    def clear(self):
+        self.cache.clear()
+
+    def acquire_lock(self, key: str, timeout: float) -> bool:
+        return self.cache.add(key, True, timeout=timeout)
+
+    def release_lock(self, key: str):
+        self.cache.delete(key)
+
+    async def aget(self, key: str) -> Optional[CachedResponse]:
+        entry = await self.cache.aget(key)
+        if entry is None:
+            return None
+        return CachedResponse(*entry)
+
+    async def aset(self, key: str, response: CachedResponse):
+        await self.cache.aset(key, tuple(response), timeout=self.ttl)
+
+    async def aacquire_lock(self, key: str, timeout: float) -> bool:
+        return await self.cache.aadd(key, True, timeout=timeout)
+
+    async def arelease_lock(self, key: str):
+        await self.cache.adelete(key)
+
+
+@functools.cache
+def _build_cache(
+    backend: str, ttl: int, max_bytes: int, alias: str
+) -> Optional[ResponseCache]:
+    if backend == "memory":
+        return LocMemResponseCache(ttl=ttl, max_bytes=max_bytes)
+    if backend == "django":
+        return DjangoResponseCache(ttl=ttl, alias=alias)
+    return None
+
+
+def get_search_cache() -> Optional[ResponseCache]:
+    """Return the cache configured for ``/proxy/search``, if any."""
+    return _build_cache(
+        settings.SEARCH_CACHE_BACKEND,
+        settings.SEARCH_CACHE_TTL,
+        settings.SEARCH_CACHE_MAX_BYTES,
+        settings.SEARCH_CACHE_ALIAS,
+    )
@@ -0,0 +1,124 @@
+"""A persistent cache of the DKRZ citation documents.
+
+Citations practically never change, so each one is stored in the
+``Citation`` table the first time it is fetched and served from there for
+``CITATION_CACHE_TTL`` seconds. After that it is revalidated with the ETag
+and Last-Modified DKRZ sent with it, which usually costs DKRZ a 304 and no
+body. If DKRZ cannot be reached, a stored citation is served however old it
+is.
+
+Database access stays in the calling thread; only the requests to DKRZ run
+in the pool, ``CITATION_MAX_PARALLEL_FETCHES`` at a time.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import NamedTuple, Optional, Sequence
+
+import requests
+from django.conf import settings
+from django.utils import timezone
+
+from metagrid.api_proxy import upstream
+from metagrid.api_proxy.models import Citation
+
+logger = logging.getLogger(__name__)
+
+
+class CitationResult(NamedTuple):
+    status: int
+    text: str
+
+
+def _fetch(url: str, cached: Optional[Citation]) -> requests.Response:
+    headers = {}
+    if cached is not None:
+        if cached.etag:
+            headers["If-None-Match"] = cached.etag
+        if cached.last_modified:
+            headers["If-Modified-Since"] = cached.last_modified
+    return upstream.get(url, verify=False, headers=headers)
+
+
+def _store(
+    url: str, cached: Optional[Citation], resp: requests.Response
+) -> Optional[Citation]:
+    """Record a response from DKRZ, returning the citation to serve."""
+    now = timezone.now()
+    if resp.status_code == 304 and cached is not None:
+        cached.validated_at = now
+        cached.save(update_fields=["validated_at"])
+        return cached
+    if resp.status_code == 200:
+        citation = Citation(
+            url=url,
+            content=resp.text,
+            etag=resp.headers.get("ETag", ""),
+            last_modified=resp.headers.get("Last-Modified", ""),
+            validated_at=now,
+        )
+        # A single upsert, so concurrent requests storing the same new
+        # citation do not race to insert it
+        Citation.objects.bulk_create(
+            [citation],
+            update_conflicts=True,
+            unique_fields=["url"],
+            update_fields=["content", "etag", "last_modified", "validated_at"],
+        )
+        return citation
+    return None
+
+
+def get_citations(urls: Sequence[str]) -> list[CitationResult]:
+    """Return the citation at each URL, in order."""
+    cached = Citation.objects.in_bulk(set(urls), field_name="url")
+    fresh_after = timezone.now() - timedelta(
+        seconds=settings.CITATION_CACHE_TTL
+    )
+    stale = list(
+        dict.fromkeys(
+            url
+            for url in urls
+            if url not in cached or cached[url].validated_at < fresh_after
+        )
+    )
+
+    responses: dict[str, Optional[requests.Response]] = {}
+    if stale:
+        with ThreadPoolExecutor(
+            max_workers=min(len(stale), settings.CITATION_MAX_PARALLEL_FETCHES)
+        ) as pool:
+            futures = {
+                url: pool.submit(_fetch, url, cached.get(url)) for url in stale
+            }
+            for url, future in futures.items():
+                try:
+                    responses[url] = future.result()
+                except requests.RequestException:
+                    logger.warning("Failed to fetch citation %s", url)
+                    responses[url] = None
+
+    results: dict[str, CitationResult] = {}
+    for url in stale:
+        resp = responses[url]
+        citation = None if resp is None else _store(url, cached.get(url), resp)
+        if citation is not None:
+            cached[url] = citation
+        elif url not in cached:
+            results[url] = (
+                CitationResult(502, "")
+                if resp is None
+                else CitationResult(resp.status_code, resp.text)
+            )
+        # Otherwise DKRZ is down or erroring, and the stored citation,
+        # however old, is served
+
+    return [
+        results.get(url) or CitationResult(200, cached[url].content)
+        for url in urls
+    ]
+
+
+def get_citation(url: str) -> CitationResult:
+    return get_citations([url])[0]
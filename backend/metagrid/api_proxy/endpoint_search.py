@@ -0,0 +1,156 @@
+"""Caching of Globus endpoint searches.
+
+The collection picker searches endpoints as the user types, so consecutive
+searches mostly differ by a character or two. Results are cached per worker
+for ``GLOBUS_ENDPOINT_SEARCH_CACHE_TTL`` seconds, keyed on the normalized
+search text and on who searched (the app's anonymous token sees different
+endpoints than each user's). When Globus returned every match for a search,
+that is fewer endpoints than ``SEARCH_LIMIT``, a later search extending its
+text is answered by filtering those results locally instead of asking
+Globus again. The filter matches the words of the text against the start of
+the words of the fields Globus searches, as Globus does.
+"""
+
+import functools
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, NamedTuple, Optional
+
+from django.conf import settings
+from globus_sdk import TransferClient
+
+# The most endpoints Globus returns for a search
+SEARCH_LIMIT = 25
+
+# The fields of an endpoint Globus matches a full text search against
+SEARCHED_FIELDS = (
+    "display_name",
+    "canonical_name",
+    "owner_string",
+    "description",
+    "keywords",
+    "organization",
+    "department",
+)
+
+
+class EndpointSearchResult(NamedTuple):
+    endpoints: list[dict[str, Any]]
+    complete: bool  # Whether Globus returned every matching endpoint
+
+
+def words(text: str) -> list[str]:
+    return re.findall(r"[^\W_]+", text.lower())
+
+
+def normalize_search_text(text: Optional[str]) -> str:
+    return " ".join((text or "").lower().split())
+
+
+def matches(endpoint: dict[str, Any], text: str) -> bool:
+    """Whether every word of the search text starts a word of the endpoint."""
+    endpoint_words = words(
+        " ".join(str(endpoint.get(field) or "") for field in SEARCHED_FIELDS)
+    )
+    return all(
+        any(word.startswith(searched) for word in endpoint_words)
+        for searched in words(text)
+    )
+
+
+class EndpointSearchCache:
+    """A thread-safe, in-process LRU cache of endpoint search results."""
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[
+            tuple[str, str], tuple[float, EndpointSearchResult]
+        ] = OrderedDict()
+
+    def get(self, identity: str, text: str) -> Optional[list[dict[str, Any]]]:
+        """Return the endpoints matching text, if they can be found locally.
+
+        Tried in turn are the results cached for text itself, then the
+        complete results cached for the longest prefix of text.
+        """
+        with self._lock:
+            result = self._get((identity, text))
+            if result is not None:
+                return result.endpoints
+            for end in range(len(text) - 1, 0, -1):
+                result = self._get((identity, text[:end]))
+                if result is not None and result.complete:
+                    return [
+                        endpoint
+                        for endpoint in result.endpoints
+                        if matches(endpoint, text)
+                    ]
+        return None
+
+    def set(self, identity: str, text: str, result: EndpointSearchResult):
+        with self._lock:
+            self._entries.pop((identity, text), None)
+            self._entries[(identity, text)] = (
+                time.monotonic() + self.ttl,
+                result,
+            )
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _get(self, key: tuple[str, str]) -> Optional[EndpointSearchResult]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires, result = entry
+        if expires <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return result
+
+
+@functools.cache
+def _build_cache(
+    ttl: float, max_entries: int
+) -> Optional[EndpointSearchCache]:
+    if ttl <= 0:
+        return None
+    return EndpointSearchCache(ttl=ttl, max_entries=max_entries)
+
+
+def get_endpoint_search_cache() -> Optional[EndpointSearchCache]:
+    return _build_cache(
+        settings.GLOBUS_ENDPOINT_SEARCH_CACHE_TTL,
+        settings.GLOBUS_ENDPOINT_SEARCH_CACHE_MAX_ENTRIES,
+    )
+
+
+def search_endpoints(
+    client: TransferClient, identity: str, search_text: Optional[str]
+) -> list[dict[str, Any]]:
+    """Search Globus endpoints, from the cache when possible."""
+    cache = get_endpoint_search_cache()
+    text = normalize_search_text(search_text)
+    if cache is not None:
+        endpoints = cache.get(identity, text)
+        if endpoints is not None:
+            return endpoints
+
+    response = client.endpoint_search(
+        filter_fulltext=search_text, limit=SEARCH_LIMIT
+    )
+    result = EndpointSearchResult(
+        endpoints=response["DATA"],
+        complete=len(response["DATA"]) < SEARCH_LIMIT,
+    )
+    if cache is not None:
+        cache.set(identity, text, result)
+    return result.endpoints
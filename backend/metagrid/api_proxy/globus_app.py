@@ -0,0 +1,102 @@
+"""The Globus transfer client of the Metagrid app itself.
+
+Anonymous users search Globus endpoints with a transfer token obtained
+through the app's client credentials. Rather than fetching a token from
+Globus Auth on every search, each worker keeps one token and client until
+shortly before the token expires. Once the token is within
+``GLOBUS_APP_TOKEN_REFRESH_MARGIN`` seconds of expiring, the search that
+notices it starts a refresh in a background thread and carries on with the
+current token, so searches only wait on Globus Auth for the very first token
+or if the token actually ran out.
+"""
+
+import logging
+import threading
+import time
+from typing import Optional
+
+import globus_sdk
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+TRANSFER_RESOURCE_SERVER = "transfer.api.globus.org"
+
+# Seconds before its expiry from which the token is no longer used at all
+EXPIRY_LEEWAY = 10
+
+
+class AppTransferClient:
+    """A thread-safe, self-refreshing TransferClient for the app."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._client: Optional[globus_sdk.TransferClient] = None
+        self._expires_at = 0.0
+        self._refreshing = False
+
+    def get(self) -> globus_sdk.TransferClient:
+        """The app's client, fetching a token first if there is no usable
+        one. Errors from Globus Auth are raised rather than returning no
+        client.
+        """
+        with self._lock:
+            now = time.time()
+            client = self._client
+            if client is None or now >= self._expires_at - EXPIRY_LEEWAY:
+                # Held under the lock so concurrent searches wait for the
+                # same token rather than each fetching one
+                client, expires_at = self._fetch()
+                self._store(client, expires_at)
+            elif (
+                now
+                >= self._expires_at - settings.GLOBUS_APP_TOKEN_REFRESH_MARGIN
+                and not self._refreshing
+            ):
+                self._refreshing = True
+                threading.Thread(
+                    target=self._refresh_in_background,
+                    name="globus-app-token-refresh",
+                    daemon=True,
+                ).start()
+            return client
+
+    def reset(self):
+        with self._lock:
+            self._client = None
+            self._expires_at = 0.0
+
+    def _fetch(self) -> tuple[globus_sdk.TransferClient, float]:
+        auth_client = globus_sdk.ConfidentialAppAuthClient(
+            settings.SOCIAL_AUTH_GLOBUS_KEY,
+            settings.SOCIAL_AUTH_GLOBUS_SECRET,
+        )
+        tokens = (
+            auth_client.oauth2_client_credentials_tokens().by_resource_server[
+                TRANSFER_RESOURCE_SERVER
+            ]
+        )
+        client = globus_sdk.TransferClient(
+            authorizer=globus_sdk.AccessTokenAuthorizer(tokens["access_token"])
+        )
+        return client, tokens["expires_at_seconds"]
+
+    def _store(self, client: globus_sdk.TransferClient, expires_at: float):
+        self._client = client
+        self._expires_at = expires_at
+
+    def _refresh_in_background(self):
+        try:
+            fetched = self._fetch()
+        except Exception:
+            # The current token is used until it expires, then the next
+            # search fetches one itself
+            logger.exception("Failed to refresh the Globus app token")
+            fetched = None
+        with self._lock:
+            if fetched is not None:
+                self._store(*fetched)
+            self._refreshing = False
+
+
+app_transfer_client = AppTransferClient()
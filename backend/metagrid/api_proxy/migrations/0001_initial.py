@@ -0,0 +1,42 @@
+# Generated by Django 5.0.7 on 2026-10-18 08:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="Citation",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("url", models.CharField(max_length=2048, unique=True)),
+                ("content", models.TextField()),
+                (
+                    "etag",
+                    models.CharField(blank=True, default="", max_length=255),
+                ),
+                (
+                    "last_modified",
+                    models.CharField(blank=True, default="", max_length=64),
+                ),
+                ("validated_at", models.DateTimeField()),
+            ],
+            options={
+                "verbose_name": "Citation",
+                "verbose_name_plural": "Citations",
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+from django.db import models
+
+
+class Citation(models.Model):
+    """A citation document fetched from DKRZ, cached by its URL."""
+
+    URL_MAX_LENGTH = 2048
+
+    url = models.CharField(max_length=URL_MAX_LENGTH, unique=True)
+    content = models.TextField()
+    etag = models.CharField(max_length=255, blank=True, default="")
+    last_modified = models.CharField(max_length=64, blank=True, default="")
+    # When DKRZ last confirmed the content, by sending or revalidating it
+    validated_at = models.DateTimeField()
+
+    class Meta:
+        """Meta definition for Citation."""
+
+        verbose_name = "Citation"
+        verbose_name_plural = "Citations"
+
+    def __str__(self):
+        """Unicode representation of Citation."""
+        return self.url
@@ -0,0 +1,156 @@
+"""A snapshot of the node status, refreshed in the background.
+
+Every open page shows the status of the data nodes, so rather than asking
+the Node Status API on each request, a poller thread in each worker
+refreshes a snapshot every ``NODE_STATUS_POLL_INTERVAL`` seconds and stores
+it in the Django cache named by ``NODE_STATUS_CACHE_ALIAS``. When that cache
+is shared, the pollers take turns through a lock in it, so the API is asked
+once per interval whatever the number of workers.
+
+``/proxy/status`` serves the snapshot with an ETag, and
+``/proxy/status/stream`` sends it as a server-sent event.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from typing import Iterator, NamedTuple, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+
+from metagrid.api_proxy import upstream
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_KEY = "metagrid:node-status"
+POLL_LOCK_KEY = "metagrid:node-status:poll"
+
+
+class StatusSnapshot(NamedTuple):
+    status: int  # The status code of the Node Status API
+    text: str
+    etag: str
+
+
+def _cache():
+    return caches[settings.NODE_STATUS_CACHE_ALIAS]
+
+
+def fetch_snapshot() -> StatusSnapshot:
+    """Ask the Node Status API and store its answer as the snapshot.
+
+    A failed answer does not replace a good snapshot, which is served until
+    it expires.
+    """
+    resp = upstream.get(settings.STATUS_URL)
+    snapshot = StatusSnapshot(
+        status=resp.status_code,
+        text=resp.text,
+        etag=hashlib.sha256(resp.content).hexdigest()[:32],
+    )
+    if snapshot.status != 200:
+        previous = _cache().get(SNAPSHOT_KEY)
+        if previous is not None and StatusSnapshot(*previous).status == 200:
+            logger.warning(
+                "The Node Status API returned %s, keeping the last snapshot",
+                snapshot.status,
+            )
+            return StatusSnapshot(*previous)
+    # Kept long enough to outlive a few failed polls
+    _cache().set(
+        SNAPSHOT_KEY,
+        tuple(snapshot),
+        timeout=10 * settings.NODE_STATUS_POLL_INTERVAL,
+    )
+    return snapshot
+
+
+def get_snapshot() -> StatusSnapshot:
+    """The current snapshot, fetched now if there is none yet."""
+    ensure_poller()
+    entry = _cache().get(SNAPSHOT_KEY)
+    if entry is None:
+        return fetch_snapshot()
+    return StatusSnapshot(*entry)
+
+
+def clear():
+    _cache().delete_many([SNAPSHOT_KEY, POLL_LOCK_KEY])
+
+
+def poll_once():
+    # The lock expires on its own, which is what spaces the polls out. It
+    # expires a little before the next poll is due, so a poller waking up on
+    # time does not find it held and skip a whole interval.
+    interval = settings.NODE_STATUS_POLL_INTERVAL
+    if _cache().add(
+        POLL_LOCK_KEY, True, timeout=max(interval - 1, interval / 2)
+    ):
+        fetch_snapshot()
+
+
+class Poller:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid: Optional[int] = None
+        self.stopped = threading.Event()
+
+    def ensure_started(self):
+        """Start the poller of this process, unless it is running."""
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self.stopped.clear()
+            threading.Thread(
+                target=self.run, name="node-status-poller", daemon=True
+            ).start()
+
+    def run(self):
+        while not self.stopped.is_set():
+            try:
+                poll_once()
+            except Exception:
+                logger.exception("Failed to poll the node status")
+            self.stopped.wait(settings.NODE_STATUS_POLL_INTERVAL)
+
+    def stop(self):
+        with self._lock:
+            self.stopped.set()
+            self._pid = None
+
+
+poller = Poller()
+
+
+def ensure_poller():
+    if settings.STATUS_URL is not None:
+        poller.ensure_started()
+
+
+def format_event(
+    snapshot: StatusSnapshot, last_event_id: Optional[str]
+) -> str:
+    """The event for a snapshot, or a comment if it was already sent."""
+    if snapshot.etag == last_event_id:
+        return ": keep-alive\n\n"
+    lines = snapshot.text.splitlines() or [""]
+    data = "".join(f"data: {line}\n" for line in lines)
+    return f"id: {snapshot.etag}\nevent: status\n{data}\n"
+
+
+def event_stream(last_event_id: Optional[str]) -> Iterator[str]:
+    """Server-sent events for the current snapshot, as a stream that ends
+    at once.
+
+    A sync worker is held for as long as a stream is open, so rather than
+    waiting for new snapshots, the stream sends the current one and asks
+    the browser to reconnect once the next poll is due. The browser sends
+    the id of the last event it received, so an unchanged snapshot is not
+    sent again. Under ASGI, :func:`metagrid.api_proxy.async_views.aevent_stream`
+    keeps the stream open instead.
+    """
+    yield f"retry: {int(settings.NODE_STATUS_POLL_INTERVAL * 1000)}\n\n"
+    yield format_event(get_snapshot(), last_event_id)
@@ -0,0 +1,161 @@
+"""Coalescing of concurrent, identical upstream requests.
+
+When many identical searches arrive at once (e.g. right after a cached facet
+query expires), only the first one is sent upstream; the others wait for it
+and share its response.
+"""
+
+import asyncio
+import threading
+import time
+import weakref
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+
+from metagrid.api_proxy.cache import CachedResponse, ResponseCache
+
+T = TypeVar("T")
+
+LOCK_POLL_INTERVAL = 0.05
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Run at most one call per key at a time within this process.
+
+    Callers that arrive while a call for the same key is in flight block
+    until it finishes and receive its result, or its exception.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict[str, _Call] = {}
+
+    def do(self, key: str, fn: Callable[[], T]) -> T:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if call is None:
+                call = self._calls[key] = _Call()
+            else:
+                call.waiters += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def waiting(self, key: str) -> int:
+        """The number of callers waiting on the in-flight call for ``key``.
+
+        Returns -1 when no call for ``key`` is in flight.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            return -1 if call is None else call.waiters
+
+
+def fetch_with_shared_lock(
+    cache: ResponseCache,
+    key: str,
+    fetch: Callable[[], CachedResponse],
+    timeout: float,
+) -> CachedResponse:
+    """Coalesce a fetch across workers through a lock held in ``cache``.
+
+    The worker holding the lock fetches and fills the cache. Other workers
+    poll the cache until the response appears, the lock is released, or
+    ``timeout`` seconds pass, after which they fetch on their own.
+    """
+    lock_key = f"{key}:lock"
+    deadline = time.monotonic() + timeout
+
+    acquired = cache.acquire_lock(lock_key, timeout)
+    while not acquired:
+        time.sleep(LOCK_POLL_INTERVAL)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+        if time.monotonic() >= deadline:
+            break
+        acquired = cache.acquire_lock(lock_key, timeout)
+
+    try:
+        return fetch()
+    finally:
+        if acquired:
+            cache.release_lock(lock_key)
+
+
+class AsyncSingleFlight:
+    """The asyncio counterpart of SingleFlight.
+
+    The shared call runs as its own task, so it completes for the remaining
+    waiters even if the request that started it is cancelled.
+    """
+
+    def __init__(self):
+        self._calls: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, dict[str, asyncio.Future]
+        ] = weakref.WeakKeyDictionary()
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        calls = self._calls.setdefault(asyncio.get_running_loop(), {})
+        task = calls.get(key)
+        if task is None:
+            task = calls[key] = asyncio.ensure_future(fn())
+            task.add_done_callback(lambda _: calls.pop(key, None))
+        return await asyncio.shield(task)
+
+    def in_flight(self) -> int:
+        """The number of calls in flight on the running event loop."""
+        return len(self._calls.get(asyncio.get_running_loop(), {}))
+
+
+async def afetch_with_shared_lock(
+    cache: ResponseCache,
+    key: str,
+    fetch: Callable[[], Awaitable[CachedResponse]],
+    timeout: float,
+) -> CachedResponse:
+    """The async counterpart of fetch_with_shared_lock."""
+    lock_key = f"{key}:lock"
+    deadline = time.monotonic() + timeout
+
+    acquired = await cache.aacquire_lock(lock_key, timeout)
+    while not acquired:
+        await asyncio.sleep(LOCK_POLL_INTERVAL)
+        cached = await cache.aget(key)
+        if cached is not None:
+            return cached
+        if time.monotonic() >= deadline:
+            break
+        acquired = await cache.aacquire_lock(lock_key, timeout)
+
+    try:
+        return await fetch()
+    finally:
+        if acquired:
+            await cache.arelease_lock(lock_key)
+
+
+search_flights = SingleFlight()
+async_search_flights = AsyncSingleFlight()
@@ -0,0 +1,14 @@
+from typing import Any, Generator
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def record_in_background() -> Generator[MagicMock, Any, Any]:
+    """
+    Fixture to keep search responses from being recorded by a background
+    thread, which would outlive the test's database access
+    """
+    with patch("metagrid.cart.documents.record_in_background") as record:
+        yield record
@@ -0,0 +1,576 @@
+import asyncio
+import gzip
+from unittest.mock import patch
+
+import httpx
+import pytest
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.http import HttpResponse
+from django.test import AsyncClient, AsyncRequestFactory, override_settings
+from django.urls import reverse
+
+from config.urls import upstream_urlpatterns
+from metagrid.api_globus import async_views as globus_async_views
+from metagrid.api_proxy import async_upstream, async_views, node_status, wget
+from metagrid.api_proxy.cache import (
+    CachedResponse,
+    DjangoResponseCache,
+    LocMemResponseCache,
+)
+from metagrid.api_proxy.singleflight import (
+    AsyncSingleFlight,
+    afetch_with_shared_lock,
+)
+
+factory = AsyncRequestFactory()
+
+# The routes config.urls serves under ASGI
+urlpatterns = upstream_urlpatterns(async_views, globus_async_views)
+
+
+class MockUpstream:
+    """Records upstream calls and answers them through an httpx handler."""
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.requests: list[httpx.Request] = []
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        response = self.handler(request)
+        if asyncio.iscoroutine(response):
+            response = await response
+        return response
+
+
+@pytest.fixture
+def mock_upstream():
+    def install(handler):
+        mock = MockUpstream(handler)
+        patcher = patch.object(
+            async_upstream,
+            "build_transport",
+            lambda verify: httpx.MockTransport(mock),
+        )
+        patcher.start()
+        mocks.append(patcher)
+        return mock
+
+    mocks: list = []
+    yield install
+    for patcher in mocks:
+        patcher.stop()
+
+
+def run(coroutine_fn, *args):
+    """Run an async view to completion, reading any streamed body."""
+
+    async def call():
+        try:
+            response = await coroutine_fn(*args)
+            if getattr(response, "streaming", False):
+                response.body = b"".join(
+                    [chunk async for chunk in response.streaming_content]
+                )
+            return response
+        finally:
+            await async_upstream.aclose()
+
+    return async_to_sync(call)()
+
+
+def test_identical_searches_share_one_upstream_call(mock_upstream):
+    async def slow(request):
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, content=b'{"response": {}}')
+
+    upstream = mock_upstream(slow)
+
+    async def searches():
+        requests = [
+            factory.get("/proxy/search", {"project": "CMIP6", "limit": 0})
+            for _ in range(5)
+        ]
+        first = await asyncio.gather(
+            *(async_views.do_search(request) for request in requests)
+        )
+        again = await async_views.do_search(requests[0])
+        return first + [again]
+
+    results = run(searches)
+
+    assert len(upstream.requests) == 1
+    assert upstream.requests[0].url.params.get_list("limit") == ["0"]
+    assert {response.content for response in results} == {b'{"response": {}}'}
+
+
+def test_search_records_fresh_responses(mock_upstream, record_in_background):
+    mock_upstream(lambda request: httpx.Response(200, content=b"1"))
+    request = factory.get("/proxy/search", {"a": "b"})
+
+    run(async_views.do_search, request)
+    run(async_views.do_search, request)
+
+    record_in_background.assert_called_once_with(b"1")
+
+
+@override_settings(
+    SEARCH_CACHE_BACKEND="django", SEARCH_COALESCE_ACROSS_WORKERS=True
+)
+def test_search_coalesces_through_shared_lock(mock_upstream):
+    upstream = mock_upstream(lambda request: httpx.Response(200, content=b"1"))
+
+    response = run(
+        async_views.do_search, factory.get("/proxy/search", {"a": "b"})
+    )
+
+    assert response.content == b"1"
+    assert len(upstream.requests) == 1
+
+
+@override_settings(SEARCH_CACHE_BACKEND="disabled", PROXY_STREAMING=True)
+def test_search_streams_when_cache_disabled(mock_upstream):
+    body = gzip.compress(b'{"response": {}}')
+    upstream = mock_upstream(
+        lambda request: httpx.Response(
+            200,
+            stream=httpx.ByteStream(body),
+            headers={
+                "Content-Length": str(len(body)),
+                "Content-Type": "application/solr+json",
+                "Content-Encoding": "gzip",
+            },
+        )
+    )
+
+    response = run(
+        async_views.do_search,
+        factory.get(
+            "/proxy/search", {"a": "b"}, headers={"Accept-Encoding": "gzip"}
+        ),
+    )
+
+    assert response.status_code == 200
+    assert response.body == body
+    assert response["Content-Type"] == "application/solr+json"
+    assert response["Content-Encoding"] == "gzip"
+    assert response["Content-Length"] == str(len(body))
+    assert upstream.requests[0].headers["Accept-Encoding"] == "gzip"
+
+
+def test_wget_is_buffered_by_default(mock_upstream):
+    upstream = mock_upstream(
+        lambda request: httpx.Response(200, content=b"#!/bin/bash")
+    )
+
+    response = run(
+        async_views.do_wget,
+        factory.get("/proxy/wget", {"dataset_id": "CMIP6.abc"}),
+    )
+
+    assert response.content == b"#!/bin/bash"
+    assert str(upstream.requests[0].url).startswith(settings.WGET_URL)
+
+
+def wget_script(*names):
+    files = "".join(
+        f"'{name}.nc' 'https://node/{name}.nc'\n" for name in names
+    )
+    return (
+        f'#!/bin/bash\ndownload_files="$(cat <<{wget.FILES_MARKER}\n'
+        f'{files}{wget.FILES_MARKER}\n)"\n'
+    )
+
+
+@override_settings(WGET_MAX_DATASETS_PER_REQUEST=2)
+def test_large_wget_is_split_and_merged(mock_upstream):
+    def handler(request):
+        ids = request.url.params.get_list("dataset_id")
+        return httpx.Response(
+            200,
+            text=wget_script(*ids),
+            headers={"Content-Disposition": "attachment; filename=wget.sh"},
+        )
+
+    upstream = mock_upstream(handler)
+
+    response = run(
+        async_views.do_wget,
+        factory.get("/proxy/wget", {"dataset_id": ["a", "b", "c"]}),
+    )
+
+    assert response.body.decode() == wget_script("a", "b", "c")
+    assert response["Content-Disposition"] == "attachment; filename=wget.sh"
+    assert len(upstream.requests) == 2
+
+
+@override_settings(WGET_MAX_DATASETS_PER_REQUEST=1)
+@pytest.mark.parametrize(
+    "first, status",
+    [
+        (httpx.Response(404, text="missing"), 404),
+        (httpx.Response(200, text="not a script"), 502),
+    ],
+)
+def test_large_wget_first_part_failure(mock_upstream, first, status):
+    mock_upstream(lambda request: first)
+
+    response = run(
+        async_views.do_wget,
+        factory.get("/proxy/wget", {"dataset_id": ["a", "b"]}),
+    )
+
+    assert response.status_code == status
+
+
+@override_settings(WGET_MAX_DATASETS_PER_REQUEST=1)
+def test_large_wget_parts_are_cancelled_when_unread_script_is_closed(
+    mock_upstream,
+):
+    cancelled = []
+
+    async def handler(request):
+        if request.url.params["dataset_id"] == "a":
+            return httpx.Response(200, text=wget_script("a"))
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(request.url.params["dataset_id"])
+            raise
+
+    mock_upstream(handler)
+
+    async def close_unread(request):
+        response = await async_views.do_wget(request)
+        await asyncio.sleep(0)
+        response.close()
+        for _ in range(5):
+            await asyncio.sleep(0)
+
+    run(close_unread, factory.get("/proxy/wget", {"dataset_id": ["a", "b"]}))
+
+    assert cancelled == ["b"]
+
+
+@override_settings(WGET_MAX_DATASETS_PER_REQUEST=1)
+def test_large_wget_parts_are_cancelled_when_first_part_raises(mock_upstream):
+    cancelled = []
+
+    async def handler(request):
+        if request.url.params["dataset_id"] == "a":
+            raise httpx.ConnectError("unreachable")
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(request.url.params["dataset_id"])
+            raise
+
+    mock_upstream(handler)
+
+    async def wget_and_wait(request):
+        try:
+            await async_views.do_wget(request)
+        finally:
+            for _ in range(5):
+                await asyncio.sleep(0)
+
+    with pytest.raises(httpx.ConnectError):
+        run(
+            wget_and_wait,
+            factory.get("/proxy/wget", {"dataset_id": ["a", "b"]}),
+        )
+
+    assert cancelled == ["b"]
+
+
+@override_settings(WGET_MAX_DATASETS_PER_REQUEST=1)
+def test_large_wget_later_part_failure_aborts_stream(mock_upstream):
+    def handler(request):
+        if request.url.params["dataset_id"] == "a":
+            return httpx.Response(200, text=wget_script("a"))
+        return httpx.Response(500, text="error")
+
+    mock_upstream(handler)
+
+    with pytest.raises(wget.WgetChunkError):
+        run(
+            async_views.do_wget,
+            factory.get("/proxy/wget", {"dataset_id": ["a", "b"]}),
+        )
+
+
+@pytest.mark.parametrize("view", ["do_citation", "do_citations"])
+def test_citation_runs_sync_view(view):
+    with patch(
+        f"metagrid.api_proxy.views.{view}", return_value="citation"
+    ) as view_mock:
+        request = factory.post("/proxy/citation", {})
+        assert run(getattr(async_views, view), request) == "citation"
+
+    view_mock.assert_called_once_with(request)
+
+
+def test_status_runs_sync_view():
+    with patch(
+        "metagrid.api_proxy.views.do_status", return_value="status"
+    ) as view_mock:
+        request = factory.get("/proxy/status")
+        assert run(async_views.do_status, request) == "status"
+
+    view_mock.assert_called_once_with(request)
+
+
+@override_settings(
+    NODE_STATUS_STREAM_CHECK_INTERVAL=0.01,
+    NODE_STATUS_STREAM_DURATION=0.025,
+)
+def test_status_stream():
+    snapshot = node_status.StatusSnapshot(200, "{}", "etag-1")
+
+    async def read(request):
+        response = await async_views.do_status_stream(request)
+        return [event async for event in response.streaming_content]
+
+    with patch(
+        "metagrid.api_proxy.node_status.get_snapshot", return_value=snapshot
+    ):
+        events = run(read, factory.get("/proxy/status/stream"))
+
+    assert events[:3] == [
+        b"retry: 10\n\n",
+        b"id: etag-1\nevent: status\ndata: {}\n\n",
+        b": keep-alive\n\n",
+    ]
+
+
+def test_globus_search_endpoints_runs_sync_view():
+    with patch(
+        "metagrid.api_proxy.views.do_globus_search_endpoints",
+        return_value="endpoints",
+    ) as view_mock:
+        request = factory.get("/proxy/globus-search-endpoints/")
+        assert run(async_views.do_globus_search_endpoints, request) == (
+            "endpoints"
+        )
+
+    view_mock.assert_called_once_with(request)
+
+
+class TestAsyncUpstream:
+    @patch("metagrid.api_proxy.async_upstream.asyncio.sleep")
+    def test_idempotent_requests_are_retried(self, sleep_mock, mock_upstream):
+        statuses = iter([503, 502, 200])
+        upstream = mock_upstream(
+            lambda request: httpx.Response(next(statuses))
+        )
+
+        response = run(async_upstream.get, "https://esgf-node.llnl.gov/")
+
+        assert response.status_code == 200
+        assert len(upstream.requests) == 3
+        assert [call.args[0] for call in sleep_mock.call_args_list] == [
+            0.5,
+            1.0,
+        ]
+
+    @override_settings(HTTP_MAX_RETRIES=1)
+    @patch("metagrid.api_proxy.async_upstream.asyncio.sleep")
+    def test_retries_are_bounded(self, sleep_mock, mock_upstream):
+        upstream = mock_upstream(lambda request: httpx.Response(503))
+
+        response = run(async_upstream.get, "https://esgf-node.llnl.gov/")
+
+        assert response.status_code == 503
+        assert len(upstream.requests) == 2
+
+    def test_posts_are_not_retried(self, mock_upstream):
+        upstream = mock_upstream(lambda request: httpx.Response(503))
+
+        response = run(async_upstream.post, "https://auth.globus.org/")
+
+        assert response.status_code == 503
+        assert len(upstream.requests) == 1
+
+    def test_clients_are_reused_and_store_no_cookies(self, mock_upstream):
+        mock_upstream(
+            lambda request: httpx.Response(
+                200, headers={"Set-Cookie": "session=secret; Path=/"}
+            )
+        )
+
+        async def calls():
+            await async_upstream.get("https://auth.globus.org/")
+            client = async_upstream.get_client()
+            await async_upstream.get("https://auth.globus.org/")
+            return client, async_upstream.get_client()
+
+        first, second = run(calls)
+
+        assert first is second
+        assert len(first.cookies) == 0
+
+    def test_transport_uses_configured_limits(self):
+        transport = async_upstream.build_transport(verify=True)
+        assert transport._pool._max_connections == 200
+
+
+class TestAsyncSingleFlight:
+    def test_leader_cancellation_does_not_cancel_waiters(self):
+        flights = AsyncSingleFlight()
+
+        async def fetch():
+            await asyncio.sleep(0.05)
+            return "result"
+
+        async def scenario():
+            leader = asyncio.ensure_future(flights.do("key", fetch))
+            await asyncio.sleep(0)
+            waiter = asyncio.ensure_future(flights.do("key", fetch))
+            await asyncio.sleep(0)
+            assert flights.in_flight() == 1
+            leader.cancel()
+            result = await waiter
+            await asyncio.sleep(0)
+            return leader.cancelled(), result, flights.in_flight()
+
+        assert async_to_sync(scenario)() == (True, "result", 0)
+
+
+class TestAsyncFetchWithSharedLock:
+    response = CachedResponse(200, b"{}", "text/json")
+
+    def fetch_counter(self):
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            return self.response
+
+        return fetch, calls
+
+    def test_lock_holder_fetches_and_releases(self):
+        cache = DjangoResponseCache(ttl=10, alias="default")
+        fetch, calls = self.fetch_counter()
+
+        result = async_to_sync(afetch_with_shared_lock)(cache, "k", fetch, 1)
+
+        assert result == self.response
+        assert calls == [1]
+        assert cache.acquire_lock("k:lock", 1)
+        cache.clear()
+
+    @patch("metagrid.api_proxy.singleflight.asyncio.sleep")
+    def test_waiter_uses_response_cached_by_lock_holder(self, sleep_mock):
+        cache = DjangoResponseCache(ttl=10, alias="default")
+        cache.acquire_lock("k:lock", 10)
+        sleep_mock.side_effect = lambda _: cache.set("k", self.response)
+        fetch, calls = self.fetch_counter()
+
+        result = async_to_sync(afetch_with_shared_lock)(cache, "k", fetch, 1)
+
+        assert result == self.response
+        assert calls == []
+        cache.clear()
+
+    @patch("metagrid.api_proxy.singleflight.asyncio.sleep")
+    def test_waiter_takes_lock_released_without_response(self, sleep_mock):
+        cache = DjangoResponseCache(ttl=10, alias="default")
+        cache.acquire_lock("k:lock", 10)
+        sleep_mock.side_effect = lambda _: cache.release_lock("k:lock")
+        fetch, calls = self.fetch_counter()
+
+        result = async_to_sync(afetch_with_shared_lock)(cache, "k", fetch, 1)
+
+        assert result == self.response
+        assert calls == [1]
+        cache.clear()
+
+    @patch("metagrid.api_proxy.singleflight.asyncio.sleep")
+    def test_waiter_fetches_after_timeout(self, sleep_mock):
+        cache = DjangoResponseCache(ttl=10, alias="default")
+        cache.acquire_lock("k:lock", 10)
+        fetch, calls = self.fetch_counter()
+
+        result = async_to_sync(afetch_with_shared_lock)(cache, "k", fetch, 0)
+
+        assert result == self.response
+        assert calls == [1]
+        cache.clear()
+
+
+def test_in_process_cache_async_methods():
+    cache = LocMemResponseCache(ttl=10, max_bytes=100)
+    response = CachedResponse(200, b"{}", "text/json")
+
+    async def scenario():
+        await cache.aset("key", response)
+        assert await cache.aacquire_lock("lock", 1)
+        await cache.arelease_lock("lock")
+        return await cache.aget("key")
+
+    assert async_to_sync(scenario)() == response
+
+
+def test_fetch_rechecks_cache_before_sending():
+    cache = LocMemResponseCache(ttl=10, max_bytes=100)
+    response = CachedResponse(200, b"{}", "text/json")
+    cache.set("key", response)
+
+    async def send():
+        raise AssertionError("upstream should not be called")
+
+    result = async_to_sync(async_views._fetch_upstream)(send, cache, "key")
+
+    assert result == response
+
+
+@pytest.mark.urls(__name__)
+@pytest.mark.django_db
+@override_settings(
+    NODE_STATUS_STREAM_CHECK_INTERVAL=0.01,
+    NODE_STATUS_STREAM_DURATION=0.015,
+)
+@pytest.mark.parametrize(
+    "name, method",
+    [
+        ("globus-search-endpoints", "get"),
+        ("do-search", "get"),
+        ("do-citation", "post"),
+        ("do-citations", "post"),
+        ("do-wget", "get"),
+        ("do-status", "get"),
+        ("do-status-stream", "get"),
+        ("globus_auth", "post"),
+    ],
+)
+def test_async_views_are_served_by_the_asgi_handler(
+    mock_upstream, name, method
+):
+    # Django refuses to run async views that are not exempt from
+    # ATOMIC_REQUESTS, which only shows when going through the handler
+    mock_upstream(lambda request: httpx.Response(200, content=b"{}"))
+    sync_views = [
+        "metagrid.api_proxy.views.do_globus_search_endpoints",
+        "metagrid.api_proxy.views.do_citation",
+        "metagrid.api_proxy.views.do_citations",
+        "metagrid.api_proxy.views.do_status",
+    ]
+    patchers = [
+        patch(view, return_value=HttpResponse("{}")) for view in sync_views
+    ]
+    patchers.append(
+        patch(
+            "metagrid.api_proxy.node_status.get_snapshot",
+            return_value=node_status.StatusSnapshot(200, "{}", "etag-1"),
+        )
+    )
+    for patcher in patchers:
+        patcher.start()
+    try:
+        response = run(getattr(AsyncClient(), method), reverse(name))
+    finally:
+        for patcher in patchers:
+            patcher.stop()
+
+    assert response.status_code == 200
@@ -0,0 +1,174 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+import responses
+from django.conf import settings
+from django.http import QueryDict
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+
+from metagrid.api_proxy.cache import (
+    CachedResponse,
+    DjangoResponseCache,
+    LocMemResponseCache,
+    cache_key,
+    get_search_cache,
+    normalize_params,
+)
+from metagrid.api_proxy.views import _fetch_upstream
+
+
+def test_normalize_params_sorts_and_deduplicates_querydict():
+    params = QueryDict("project=CMIP6&limit=0&facets=b&facets=a&facets=b")
+    assert normalize_params(params) == {
+        "facets": ["a", "b"],
+        "limit": ["0"],
+        "project": ["CMIP6"],
+    }
+
+
+def test_normalize_params_keeps_every_query():
+    params = {"query": ["tas", "pr"], "limit": 10}
+    assert normalize_params(params) == {
+        "limit": ["10"],
+        "query": ["pr", "tas"],
+    }
+
+
+def test_cache_key_ignores_parameter_order():
+    first = QueryDict("project=CMIP6&limit=0")
+    second = QueryDict("limit=0&project=CMIP6&limit=0")
+    assert cache_key("https://a", first) == cache_key("https://a", second)
+    assert cache_key("https://a", first) != cache_key("https://b", first)
+
+
+class TestLocMemResponseCache:
+    def test_entries_expire_after_ttl(self):
+        cache = LocMemResponseCache(ttl=10, max_bytes=100)
+        response = CachedResponse(200, b"{}", "text/json")
+
+        with patch("time.monotonic", return_value=0):
+            cache.set("key", response)
+        with patch("time.monotonic", return_value=5):
+            assert cache.get("key") == response
+        with patch("time.monotonic", return_value=10):
+            assert cache.get("key") is None
+        assert cache.size == 0
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = LocMemResponseCache(ttl=10, max_bytes=10)
+        cache.set("a", CachedResponse(200, b"aaaa", "text/json"))
+        cache.set("b", CachedResponse(200, b"bbbb", "text/json"))
+        cache.get("a")
+        cache.set("c", CachedResponse(200, b"cccc", "text/json"))
+
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+        assert cache.get("c") is not None
+        assert cache.size == 8
+
+    def test_replacing_and_oversized_entries(self):
+        cache = LocMemResponseCache(ttl=10, max_bytes=4)
+        cache.set("a", CachedResponse(200, b"aa", "text/json"))
+        cache.set("a", CachedResponse(200, b"aaa", "text/json"))
+        cache.set("b", CachedResponse(200, b"bbbbb", "text/json"))
+
+        assert cache.size == 3
+        assert cache.get("b") is None
+
+        cache.clear()
+        assert cache.get("a") is None
+        assert cache.size == 0
+
+    def test_shared_lock_is_always_granted(self):
+        cache = LocMemResponseCache(ttl=10, max_bytes=4)
+        assert cache.acquire_lock("lock", 1)
+        assert cache.acquire_lock("lock", 1)
+        cache.release_lock("lock")
+
+
+def test_django_response_cache_round_trip():
+    cache = DjangoResponseCache(ttl=10, alias="default")
+    response = CachedResponse(200, b"{}", "text/json")
+
+    assert cache.get("key") is None
+    cache.set("key", response)
+    assert cache.get("key") == response
+
+    cache.clear()
+    assert cache.get("key") is None
+
+
+def test_fetch_upstream_rechecks_cache_before_sending():
+    cache = LocMemResponseCache(ttl=10, max_bytes=100)
+    response = CachedResponse(200, b"{}", "text/json")
+    cache.set("key", response)
+    send = MagicMock()
+
+    assert _fetch_upstream(send, cache, "key") == response
+    send.assert_not_called()
+
+
+@override_settings(SEARCH_CACHE_BACKEND="django")
+def test_get_search_cache_uses_configured_backend():
+    assert isinstance(get_search_cache(), DjangoResponseCache)
+    assert get_search_cache() is get_search_cache()
+
+    with override_settings(SEARCH_CACHE_BACKEND="memory"):
+        assert isinstance(get_search_cache(), LocMemResponseCache)
+
+    with override_settings(SEARCH_CACHE_BACKEND="disabled"):
+        assert get_search_cache() is None
+
+
+@responses.activate
+@pytest.mark.django_db
+def test_identical_searches_are_served_from_cache(api_client):
+    responses.get(settings.SEARCH_URL, body='{"response": {}}')
+    url = reverse("do-search")
+
+    first = api_client.get(url, {"project": "CMIP6", "limit": 0})
+    second = api_client.get(f"{url}?limit=0&project=CMIP6&project=CMIP6")
+
+    assert first.status_code == status.HTTP_200_OK
+    assert second.content == first.content
+    assert len(responses.calls) == 1
+
+
+@responses.activate
+@pytest.mark.django_db
+def test_searches_are_forwarded_with_their_parameters(api_client):
+    responses.get(settings.SEARCH_URL)
+    url = reverse("do-search")
+
+    api_client.get(f"{url}?query=tas&project=CMIP6&query=pr&query=tas")
+
+    sent = responses.calls[0].request.url
+    assert sent.endswith("?query=tas&query=pr&query=tas&project=CMIP6")
+
+
+@responses.activate
+@pytest.mark.django_db
+def test_failed_searches_are_not_cached(api_client):
+    responses.get(settings.SEARCH_URL, status=500)
+    url = reverse("do-search")
+
+    api_client.get(url, {"project": "CMIP6"})
+    response = api_client.get(url, {"project": "CMIP6"})
+
+    assert response.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
+    assert len(responses.calls) == 2
+
+
+@responses.activate
+@pytest.mark.django_db
+@override_settings(SEARCH_CACHE_BACKEND="disabled")
+def test_searches_are_forwarded_when_cache_is_disabled(api_client):
+    responses.get(settings.SEARCH_URL)
+    url = reverse("do-search")
+
+    api_client.get(url, {"project": "CMIP6"})
+    api_client.get(url, {"project": "CMIP6"})
+
+    assert len(responses.calls) == 2
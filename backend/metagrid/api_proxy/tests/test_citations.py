@@ -0,0 +1,179 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+import requests
+import responses
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from metagrid.api_proxy.citations import CitationResult, get_citations
+from metagrid.api_proxy.models import Citation
+
+pytestmark = pytest.mark.django_db
+
+CITATION_URL = "https://cera-www.dkrz.de/WDCC/meta/CMIP6/{}.json"
+
+
+def citation_url(name="x"):
+    return CITATION_URL.format(name)
+
+
+def store(url, content="{}", age=timedelta(0), etag="", last_modified=""):
+    return Citation.objects.create(
+        url=url,
+        content=content,
+        etag=etag,
+        last_modified=last_modified,
+        validated_at=timezone.now() - age,
+    )
+
+
+@responses.activate
+def test_citation_is_fetched_once_then_served_from_database(client):
+    responses.get(
+        citation_url(),
+        body='{"title": "t"}',
+        headers={"ETag": '"v1"', "Last-Modified": "Wed, 01 Jan 2020"},
+    )
+
+    for _ in range(2):
+        response = client.post(
+            reverse("do-citation"),
+            {"citurl": citation_url()},
+            content_type="application/json",
+        )
+        assert response.content == b'{"title": "t"}'
+
+    assert len(responses.calls) == 1
+    citation = Citation.objects.get(url=citation_url())
+    assert str(citation) == citation_url()
+    assert (citation.etag, citation.last_modified) == (
+        '"v1"',
+        "Wed, 01 Jan 2020",
+    )
+
+
+@responses.activate
+@override_settings(CITATION_CACHE_TTL=60)
+def test_stale_citation_is_revalidated():
+    citation = store(
+        citation_url(),
+        content="old",
+        age=timedelta(minutes=5),
+        etag='"v1"',
+        last_modified="Wed, 01 Jan 2020",
+    )
+    responses.get(citation_url(), status=304)
+
+    assert get_citations([citation_url()]) == [CitationResult(200, "old")]
+
+    headers = responses.calls[0].request.headers
+    assert headers["If-None-Match"] == '"v1"'
+    assert headers["If-Modified-Since"] == "Wed, 01 Jan 2020"
+    citation.refresh_from_db()
+    assert timezone.now() - citation.validated_at < timedelta(minutes=1)
+
+
+@responses.activate
+@override_settings(CITATION_CACHE_TTL=60)
+def test_changed_citation_replaces_stored_one():
+    store(citation_url(), content="old", age=timedelta(minutes=5))
+    responses.get(citation_url(), body="new")
+
+    assert get_citations([citation_url()]) == [CitationResult(200, "new")]
+    assert Citation.objects.get().content == "new"
+
+
+@responses.activate
+def test_citation_stored_meanwhile_is_replaced():
+    responses.get(citation_url(), body="new")
+    # Another request stored the citation after this one looked it up
+    store(citation_url(), content="other")
+
+    with patch.object(Citation.objects, "in_bulk", return_value={}):
+        assert get_citations([citation_url()]) == [CitationResult(200, "new")]
+    assert Citation.objects.get().content == "new"
+
+
+@responses.activate
+@override_settings(CITATION_CACHE_TTL=60)
+def test_stored_citation_is_served_when_dkrz_fails():
+    store(citation_url("a"), content="old a", age=timedelta(minutes=5))
+    store(citation_url("b"), content="old b", age=timedelta(minutes=5))
+    responses.get(citation_url("a"), status=500)
+    responses.get(
+        citation_url("b"), body=requests.ConnectionError("unreachable")
+    )
+
+    assert get_citations([citation_url("a"), citation_url("b")]) == [
+        CitationResult(200, "old a"),
+        CitationResult(200, "old b"),
+    ]
+
+
+@responses.activate
+def test_uncached_failures_are_not_stored():
+    responses.get(citation_url("a"), body="missing", status=404)
+    responses.get(
+        citation_url("b"), body=requests.ConnectionError("unreachable")
+    )
+
+    assert get_citations([citation_url("a"), citation_url("b")]) == [
+        CitationResult(404, "missing"),
+        CitationResult(502, ""),
+    ]
+    assert not Citation.objects.exists()
+
+
+@responses.activate
+def test_batch_returns_citations_in_order(client):
+    store(citation_url("cached"), content='{"title": "cached"}')
+    responses.get(citation_url("a"), body='{"title": "a"}')
+    responses.get(citation_url("b"), body="missing", status=404)
+    responses.get(citation_url("c"), body="not json")
+    urls = [
+        citation_url("a"),
+        citation_url("cached"),
+        citation_url("b"),
+        citation_url("a"),
+        citation_url("c"),
+    ]
+
+    response = client.post(
+        reverse("do-citations"),
+        {"citurls": urls},
+        content_type="application/json",
+    )
+
+    assert response.json()["results"] == [
+        {"citurl": urls[0], "status": 200, "citation": {"title": "a"}},
+        {"citurl": urls[1], "status": 200, "citation": {"title": "cached"}},
+        {"citurl": urls[2], "status": 404, "citation": None},
+        {"citurl": urls[3], "status": 200, "citation": {"title": "a"}},
+        {"citurl": urls[4], "status": 200, "citation": None},
+    ]
+    # Each URL is only fetched once
+    assert len(responses.calls) == 3
+
+
+@override_settings(CITATION_BATCH_MAX_URLS=2)
+@pytest.mark.parametrize(
+    "body",
+    [
+        "not json",
+        {"citurl": citation_url()},
+        {"citurls": citation_url()},
+        {"citurls": [citation_url("a"), citation_url("b"), citation_url()]},
+        {"citurls": ["https://aims4.llnl.gov/WDCC/meta/CMIP6/x.json"]},
+        {"citurls": [citation_url("x" * Citation.URL_MAX_LENGTH)]},
+        {"citurls": [None]},
+    ],
+)
+def test_batch_rejects_invalid_requests(client, body):
+    response = client.post(
+        reverse("do-citations"), body, content_type="application/json"
+    )
+
+    assert response.status_code == 400
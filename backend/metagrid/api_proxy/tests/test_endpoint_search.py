@@ -0,0 +1,114 @@
+from unittest.mock import MagicMock, patch
+
+from django.test import override_settings
+
+from metagrid.api_proxy.endpoint_search import (
+    SEARCH_LIMIT,
+    EndpointSearchCache,
+    EndpointSearchResult,
+    search_endpoints,
+)
+
+ENDPOINTS = [
+    {
+        "id": "1",
+        "display_name": "ESGF Node ORNL",
+        "canonical_name": "esgf-node.ornl.gov",
+    },
+    {
+        "id": "2",
+        "display_name": "ESGF Node LLNL",
+        "canonical_name": "esgf-node.llnl.gov",
+    },
+    {
+        "id": "3",
+        "display_name": "Other",
+        "description": "mirrors esgf-node.ornl",
+    },
+]
+
+
+def transfer_client(endpoints=ENDPOINTS):
+    client = MagicMock()
+    client.endpoint_search.return_value = {"DATA": endpoints}
+    return client
+
+
+def test_repeated_search_is_served_from_cache():
+    client = transfer_client()
+
+    first = search_endpoints(client, "anonymous", "ESGF-node")
+    second = search_endpoints(client, "anonymous", "  esgf-node ")
+
+    assert first == second == ENDPOINTS
+    client.endpoint_search.assert_called_once_with(
+        filter_fulltext="ESGF-node", limit=SEARCH_LIMIT
+    )
+
+
+def test_searches_are_cached_per_identity():
+    client = transfer_client()
+
+    search_endpoints(client, "anonymous", "esgf")
+    search_endpoints(client, "user:1", "esgf")
+
+    assert client.endpoint_search.call_count == 2
+
+
+def test_longer_search_filters_complete_results_locally():
+    client = transfer_client()
+    search_endpoints(client, "anonymous", "esgf-node")
+
+    endpoints = search_endpoints(client, "anonymous", "esgf-node.o")
+
+    assert [endpoint["id"] for endpoint in endpoints] == ["1", "3"]
+    client.endpoint_search.assert_called_once()
+
+
+def test_local_filter_matches_the_start_of_words_only():
+    client = transfer_client()
+    search_endpoints(client, "anonymous", "node")
+
+    assert search_endpoints(client, "anonymous", "node rnl") == []
+    assert search_endpoints(client, "anonymous", "node 3") == []
+    client.endpoint_search.assert_called_once()
+
+
+def test_longer_search_goes_to_globus_after_incomplete_results():
+    client = transfer_client(ENDPOINTS * SEARCH_LIMIT)
+    search_endpoints(client, "anonymous", "esgf")
+
+    search_endpoints(client, "anonymous", "esgf-node")
+
+    assert client.endpoint_search.call_count == 2
+
+
+@override_settings(GLOBUS_ENDPOINT_SEARCH_CACHE_TTL=0)
+def test_cache_can_be_disabled():
+    client = transfer_client()
+
+    search_endpoints(client, "anonymous", "esgf")
+    search_endpoints(client, "anonymous", "esgf")
+
+    assert client.endpoint_search.call_count == 2
+
+
+def test_cache_expires_and_evicts_least_recently_used():
+    result = EndpointSearchResult(ENDPOINTS, complete=True)
+    cache = EndpointSearchCache(ttl=60, max_entries=2)
+    cache.set("anonymous", "a", result)
+    cache.set("anonymous", "b", result)
+    cache.get("anonymous", "a")
+    cache.set("anonymous", "c", result)
+
+    assert cache.get("anonymous", "b") is None
+    assert cache.get("anonymous", "a") == ENDPOINTS
+
+    with patch(
+        "metagrid.api_proxy.endpoint_search.time.monotonic",
+        return_value=float("inf"),
+    ):
+        assert cache.get("anonymous", "a") is None
+    cache.set("anonymous", "a", result)
+    cache.clear()
+    assert cache.get("anonymous", "a") is None
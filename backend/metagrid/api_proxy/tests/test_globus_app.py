@@ -0,0 +1,98 @@
+import threading
+import time
+from unittest.mock import patch
+
+import globus_sdk
+import pytest
+import responses
+from django.test import override_settings
+from globus_sdk._testing import load_response
+
+from metagrid.api_proxy.globus_app import AppTransferClient
+
+
+def join_refresh():
+    for thread in threading.enumerate():
+        if thread.name == "globus-app-token-refresh":
+            thread.join(timeout=5)
+
+
+def expiring_in(seconds):
+    return time.time() + seconds
+
+
+@responses.activate
+def test_client_is_reused_until_expiry():
+    load_response(
+        globus_sdk.ConfidentialAppAuthClient.oauth2_client_credentials_tokens
+    )
+    app_client = AppTransferClient()
+
+    client = app_client.get()
+
+    assert app_client.get() is client
+    assert isinstance(client, globus_sdk.TransferClient)
+    assert len(responses.calls) == 1
+
+
+@override_settings(GLOBUS_APP_TOKEN_REFRESH_MARGIN=600)
+def test_token_is_refreshed_in_background_before_expiry():
+    app_client = AppTransferClient()
+    with patch.object(
+        AppTransferClient,
+        "_fetch",
+        side_effect=[("old", expiring_in(300)), ("new", expiring_in(3600))],
+    ) as fetch:
+        assert app_client.get() == "old"
+        # Within the margin: the current client is still served
+        assert app_client.get() == "old"
+        join_refresh()
+
+        assert app_client.get() == "new"
+    assert fetch.call_count == 2
+
+
+def test_token_is_fetched_synchronously_once_expired():
+    app_client = AppTransferClient()
+    with patch.object(
+        AppTransferClient,
+        "_fetch",
+        side_effect=[("old", expiring_in(5)), ("new", expiring_in(3600))],
+    ):
+        assert app_client.get() == "old"
+        assert app_client.get() == "new"
+
+
+@override_settings(GLOBUS_APP_TOKEN_REFRESH_MARGIN=600)
+def test_failed_background_refresh_keeps_current_token(caplog):
+    app_client = AppTransferClient()
+    with patch.object(
+        AppTransferClient,
+        "_fetch",
+        side_effect=[
+            ("old", expiring_in(300)),
+            globus_sdk.NetworkError("", Exception()),
+            ("new", expiring_in(3600)),
+        ],
+    ) as fetch:
+        app_client.get()
+        app_client.get()
+        join_refresh()
+        assert "Failed to refresh the Globus app token" in caplog.text
+
+        # The next search serves the current token and tries again
+        assert app_client.get() == "old"
+        join_refresh()
+
+        assert app_client.get() == "new"
+    assert fetch.call_count == 3
+
+
+def test_failed_token_fetch_is_raised():
+    app_client = AppTransferClient()
+    error = globus_sdk.NetworkError("unreachable", ConnectionError())
+    with patch.object(AppTransferClient, "_fetch", side_effect=error):
+        with pytest.raises(globus_sdk.NetworkError):
+            app_client.get()
+
+    assert app_client._client is None
@@ -0,0 +1,152 @@
+from unittest.mock import patch
+
+import pytest
+import responses
+from django.test import override_settings
+from django.urls import reverse
+
+from metagrid.api_proxy import node_status
+
+pytestmark = pytest.mark.django_db
+
+STATUS_URL = "https://status.example.org/api/v1/query"
+
+
+@pytest.fixture(autouse=True)
+def status_url():
+    with override_settings(STATUS_URL=STATUS_URL):
+        yield
+
+
+@pytest.fixture
+def no_poller():
+    with patch("metagrid.api_proxy.node_status.poller") as poller:
+        yield poller
+
+
+@responses.activate
+def test_status_is_fetched_once_then_served_from_snapshot(client, no_poller):
+    responses.get(STATUS_URL, body='{"status": "success"}')
+
+    first = client.get(reverse("do-status"))
+    second = client.get(reverse("do-status"))
+
+    assert first.content == second.content == b'{"status": "success"}'
+    assert first["ETag"] == second["ETag"]
+    assert "max-age=30" in first["Cache-Control"]
+    assert len(responses.calls) == 1
+    no_poller.ensure_started.assert_called()
+
+
+@responses.activate
+def test_status_is_revalidated_with_etag(client, no_poller):
+    responses.get(STATUS_URL, body="{}")
+    etag = client.get(reverse("do-status"))["ETag"]
+
+    response = client.get(reverse("do-status"), HTTP_IF_NONE_MATCH=etag)
+
+    assert response.status_code == 304
+
+
+@responses.activate
+def test_status_upstream_error_returns_400(client, no_poller):
+    responses.get(STATUS_URL, body="down", status=503)
+
+    response = client.get(reverse("do-status"))
+
+    assert response.status_code == 400
+    assert response.content == b"down"
+    assert not response.has_header("ETag")
+
+
+@responses.activate
+def test_failed_poll_keeps_the_last_snapshot(client, no_poller, caplog):
+    responses.get(STATUS_URL, body="up")
+    node_status.fetch_snapshot()
+    responses.replace(responses.GET, STATUS_URL, body="down", status=503)
+
+    assert node_status.fetch_snapshot().text == "up"
+    with patch(
+        "metagrid.api_proxy.node_status.get_snapshot",
+        wraps=node_status.get_snapshot,
+    ) as get_snapshot:
+        response = client.get(reverse("do-status"))
+
+    assert response.content == b"up"
+    get_snapshot.assert_called_once()
+    assert "returned 503, keeping the last snapshot" in caplog.text
+
+
+@responses.activate
+def test_poll_once_refreshes_at_most_once_per_interval(no_poller):
+    responses.get(STATUS_URL, body="one")
+    node_status.poll_once()
+    responses.replace(responses.GET, STATUS_URL, body="two")
+
+    node_status.poll_once()
+    assert node_status.get_snapshot().text == "one"
+
+    node_status.clear()
+    node_status.poll_once()
+    assert node_status.get_snapshot().text == "two"
+
+
+@pytest.mark.parametrize("interval, timeout", [(30, 29), (1, 0.5)])
+def test_poll_lock_expires_before_the_next_poll(interval, timeout):
+    with override_settings(NODE_STATUS_POLL_INTERVAL=interval), patch(
+        "metagrid.api_proxy.node_status._cache"
+    ) as cache, patch("metagrid.api_proxy.node_status.fetch_snapshot"):
+        node_status.poll_once()
+
+    cache.return_value.add.assert_called_once_with(
+        node_status.POLL_LOCK_KEY, True, timeout=timeout
+    )
+
+
+@override_settings(NODE_STATUS_POLL_INTERVAL=0.01)
+def test_poller_keeps_polling_after_errors(caplog):
+    poller = node_status.Poller()
+    with patch(
+        "metagrid.api_proxy.node_status.poll_once",
+        side_effect=[ValueError(), None, None, None],
+    ) as poll_once:
+        poller.ensure_started()
+        poller.ensure_started()
+        for _ in range(500):
+            if poll_once.call_count >= 2:
+                break
+            poller.stopped.wait(0.01)
+        poller.stop()
+
+    assert poll_once.call_count >= 2
+    assert "Failed to poll the node status" in caplog.text
+
+
+@override_settings(STATUS_URL=None)
+def test_poller_is_not_started_without_status_url():
+    with patch("metagrid.api_proxy.node_status.poller") as poller:
+        node_status.ensure_poller()
+
+    poller.ensure_started.assert_not_called()
+
+
+def test_status_stream_sends_the_snapshot_and_ends(client):
+    snapshot = node_status.StatusSnapshot(200, '{"a":\n1}', "etag-1")
+    with patch(
+        "metagrid.api_proxy.node_status.get_snapshot", return_value=snapshot
+    ):
+        response = client.get(reverse("do-status-stream"))
+        body = b"".join(response.streaming_content).decode()
+
+    assert response["Content-Type"] == "text/event-stream"
+    assert response["Cache-Control"] == "no-cache"
+    assert body == (
+        "retry: 30000\n\n"
+        'id: etag-1\nevent: status\ndata: {"a":\ndata: 1}\n\n'
+    )
+
+
+def test_status_stream_skips_snapshot_client_already_has():
+    snapshot = node_status.StatusSnapshot(200, "{}", "etag-1")
+
+    assert node_status.format_event(snapshot, "etag-1") == ": keep-alive\n\n"
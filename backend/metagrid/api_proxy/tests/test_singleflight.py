@@ -0,0 +1,147 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
+import pytest
+from django.conf import settings
+from django.test import RequestFactory, override_settings
+
+from metagrid.api_proxy.cache import (
+    CachedResponse,
+    DjangoResponseCache,
+    cache_key,
+)
+from metagrid.api_proxy.singleflight import (
+    SingleFlight,
+    fetch_with_shared_lock,
+    search_flights,
+)
+from metagrid.api_proxy.views import do_search
+
+
+def wait_for_waiters(flights, key, count):
+    deadline = time.monotonic() + 5
+    while flights.waiting(key) != count and time.monotonic() < deadline:
+        time.sleep(0.01)  # pragma: no cover
+    assert flights.waiting(key) == count
+
+
+def test_concurrent_calls_share_one_execution():
+    flights = SingleFlight()
+    release = threading.Event()
+    fn = MagicMock(side_effect=lambda: release.wait() and "result")
+
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        futures = [pool.submit(flights.do, "key", fn) for _ in range(5)]
+        wait_for_waiters(flights, "key", 4)
+        release.set()
+        results = [future.result() for future in futures]
+
+    assert results == ["result"] * 5
+    assert fn.call_count == 1
+    assert flights.waiting("key") == -1
+
+
+def test_waiters_receive_the_leader_exception():
+    flights = SingleFlight()
+    release = threading.Event()
+
+    def fail():
+        release.wait()
+        raise ValueError("upstream down")
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        futures = [pool.submit(flights.do, "key", fail) for _ in range(3)]
+        wait_for_waiters(flights, "key", 2)
+        release.set()
+        for future in futures:
+            with pytest.raises(ValueError, match="upstream down"):
+                future.result()
+
+
+class TestFetchWithSharedLock:
+    response = CachedResponse(200, b"{}", "text/json")
+
+    def test_lock_holder_fetches_and_releases(self):
+        cache = DjangoResponseCache(ttl=10, alias="default")
+        fetch = MagicMock(return_value=self.response)
+
+        assert fetch_with_shared_lock(cache, "k", fetch, 1) == self.response
+        assert fetch.call_count == 1
+        assert cache.acquire_lock("k:lock", 1)
+        cache.clear()
+
+    @patch("metagrid.api_proxy.singleflight.time.sleep")
+    def test_waiter_uses_response_cached_by_lock_holder(self, sleep_mock):
+        cache = DjangoResponseCache(ttl=10, alias="default")
+        cache.acquire_lock("k:lock", 10)
+        sleep_mock.side_effect = lambda _: cache.set("k", self.response)
+        fetch = MagicMock()
+
+        assert fetch_with_shared_lock(cache, "k", fetch, 1) == self.response
+        fetch.assert_not_called()
+        cache.clear()
+
+    @patch("metagrid.api_proxy.singleflight.time.sleep")
+    def test_waiter_takes_lock_released_without_response(self, sleep_mock):
+        cache = DjangoResponseCache(ttl=10, alias="default")
+        cache.acquire_lock("k:lock", 10)
+        sleep_mock.side_effect = lambda _: cache.release_lock("k:lock")
+        fetch = MagicMock(return_value=self.response)
+
+        assert fetch_with_shared_lock(cache, "k", fetch, 1) == self.response
+        assert fetch.call_count == 1
+        cache.clear()
+
+    @patch("metagrid.api_proxy.singleflight.time.sleep")
+    def test_waiter_fetches_after_timeout(self, sleep_mock):
+        cache = DjangoResponseCache(ttl=10, alias="default")
+        cache.acquire_lock("k:lock", 10)
+        fetch = MagicMock(return_value=self.response)
+
+        with patch(
+            "metagrid.api_proxy.singleflight.time.monotonic",
+            side_effect=[0, 0.5, 2],
+        ):
+            result = fetch_with_shared_lock(cache, "k", fetch, 1)
+
+        assert result == self.response
+        assert fetch.call_count == 1
+        assert sleep_mock.call_count == 2
+        cache.clear()
+
+
+@pytest.mark.parametrize(
+    "cache_settings",
+    [
+        {"SEARCH_CACHE_BACKEND": "disabled"},
+        {
+            "SEARCH_CACHE_BACKEND": "django",
+            "SEARCH_COALESCE_ACROSS_WORKERS": True,
+        },
+    ],
+)
+def test_concurrent_identical_searches_go_upstream_once(cache_settings):
+    release = threading.Event()
+    upstream_response = MagicMock(status_code=200, content=b"{}")
+    factory = RequestFactory()
+    key = cache_key(settings.SEARCH_URL, {"project": "CMIP6"})
+
+    def slow_get(*args, **kwargs):
+        release.wait()
+        return upstream_response
+
+    def search():
+        return do_search(factory.get("/proxy/search", {"project": "CMIP6"}))
+
+    with override_settings(**cache_settings), patch(
+        "metagrid.api_proxy.upstream.get", side_effect=slow_get
+    ) as get_mock, ThreadPoolExecutor(max_workers=4) as pool:
+        futures = [pool.submit(search) for _ in range(4)]
+        wait_for_waiters(search_flights, key, 3)
+        release.set()
+        responses = [future.result() for future in futures]
+
+    assert get_mock.call_count == 1
+    assert all(response.status_code == 200 for response in responses)
@@ -0,0 +1,113 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import pytest
+import responses
+from django.test import override_settings
+
+from metagrid.api_proxy import upstream
+from metagrid.api_proxy.upstream import TimeoutHTTPAdapter
+
+
+@pytest.fixture(autouse=True)
+def reset_upstream():
+    upstream.reset()
+    yield
+    upstream.reset()
+
+
+@override_settings(
+    HTTP_POOL_MAXSIZE=4,
+    HTTP_POOL_MAXSIZE_PER_HOST={"esgf-node.llnl.gov": 16},
+)
+def test_adapters_are_mounted_per_host_with_configured_pool_size():
+    pool = upstream.UpstreamSessionPool()
+
+    search = pool.adapter_for("https://esgf-node.llnl.gov/esg-search/search")
+    wget = pool.adapter_for("https://esgf-node.llnl.gov/esg-search/wget")
+    other = pool.adapter_for("https://cera-www.dkrz.de/WDCC/meta")
+
+    assert search is wget
+    assert search.poolmanager.connection_pool_kw["maxsize"] == 16
+    assert other.poolmanager.connection_pool_kw["maxsize"] == 4
+    assert pool.session.get_adapter("https://cera-www.dkrz.de/x") is other
+
+
+@patch("requests.adapters.HTTPAdapter.send")
+def test_adapter_applies_default_timeout(send_mock):
+    adapter = TimeoutHTTPAdapter(timeout=(1.5, 7.0))
+
+    adapter.send("request", timeout=None)
+    assert send_mock.call_args.kwargs["timeout"] == (1.5, 7.0)
+
+    adapter.send("request", timeout=3)
+    assert send_mock.call_args.kwargs["timeout"] == 3
+
+
+@override_settings(HTTP_CONNECT_TIMEOUT=1.5, HTTP_READ_TIMEOUT=7.0)
+def test_adapter_timeout_comes_from_settings():
+    adapter = upstream.UpstreamSessionPool().adapter_for(
+        "https://esgf-node.llnl.gov/esg-search/search"
+    )
+    assert adapter.timeout == (1.5, 7.0)
+
+
+@responses.activate
+def test_session_is_reused_and_cookies_are_not_stored():
+    responses.post(
+        "https://auth.globus.org/v2/oauth2/token",
+        headers={"Set-Cookie": "session=secret; Path=/"},
+    )
+
+    upstream.post("https://auth.globus.org/v2/oauth2/token", data={})
+    session = upstream._pool.session
+    upstream.post("https://auth.globus.org/v2/oauth2/token", data={})
+
+    assert upstream._pool.session is session
+    assert len(session.cookies) == 0
+    assert "Cookie" not in responses.calls[1].request.headers
+
+
+def test_session_is_rebuilt_after_fork():
+    session = upstream._pool.session
+
+    with patch("metagrid.api_proxy.upstream.os.getpid", return_value=-1):
+        assert upstream._pool.session is not session
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def local_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_pool_stats_reports_connection_reuse(local_server):
+    assert upstream.pool_stats()["hosts"] == {}
+
+    for _ in range(3):
+        assert upstream.get(f"{local_server}/search").status_code == 200
+
+    stats = upstream.pool_stats()
+    host = stats["hosts"][f"{local_server}/"]
+    assert host["pool_maxsize"] == 10
+    assert host["connections_opened"] == 1
+    assert host["requests"] == 3
+    assert host["idle_connections"] == 1
@@ -1,4 +1,6 @@
+import gzip
 import re
+from unittest.mock import patch
 
 import globus_sdk
 import responses
@@ -95,9 +97,50 @@ class TestProxyViewSet(APITestCase):
     def test_search(self):
         url = reverse("do-search")
         postdata = {"project": "CMIP6", "limit": 0}
-        responses.get(settings.SEARCH_URL)
-        response = self.client.get(url, postdata)
+        responses.get(settings.SEARCH_URL, body=b"{}")
+        with patch("metagrid.cart.documents.record_in_background") as record:
+            response = self.client.get(url, postdata)
+            self.client.get(url, postdata)
         assert response.status_code == status.HTTP_200_OK
+        record.assert_called_once_with(b"{}")
+
+    @responses.activate
+    @override_settings(SEARCH_CACHE_BACKEND="disabled", PROXY_STREAMING=True)
+    def test_search_streams_upstream_bytes_when_cache_disabled(self):
+        url = reverse("do-search")
+        body = gzip.compress(b'{"response": {"docs": []}}')
+        responses.get(
+            settings.SEARCH_URL,
+            body=body,
+            content_type="application/solr+json",
+            headers={"Content-Encoding": "gzip"},
+        )
+
+        response = self.client.get(
+            url, {"project": "CMIP6"}, HTTP_ACCEPT_ENCODING="gzip"
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.streaming
+        assert b"".join(response.streaming_content) == body
+        assert response["Content-Type"] == "application/solr+json"
+        assert response["Content-Encoding"] == "gzip"
+        assert responses.calls[0].request.headers["Accept-Encoding"] == "gzip"
+
+    @responses.activate
+    @override_settings(PROXY_STREAMING=True)
+    def test_wget_streams_upstream_status(self):
+        url = reverse("do-wget")
+        responses.get(settings.WGET_URL, body="#!/bin/bash", status=404)
+
+        response = self.client.get(url, {"dataset_id": "CMIP6.abc"})
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        assert b"".join(response.streaming_content) == b"#!/bin/bash"
+        assert "Content-Encoding" not in response
+        assert (
+            responses.calls[0].request.headers["Accept-Encoding"] == "identity"
+        )
 
     # def test_status(self):
     #     url = reverse("do-status")
@@ -194,3 +237,17 @@ class TestProxyViewSet(APITestCase):
         assert response.status_code == status.HTTP_200_OK
         assert response["content-type"] == "application/json"
         assert response.json() == MetagridFrontendSettings().model_dump()
+
+    def test_frontend_config_is_revalidated_with_etag(self) -> None:
+        url = reverse("frontend_config")
+        response = self.client.get(url)
+        assert response["Cache-Control"] == "no-cache"
+        etag = response["ETag"]
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response.content == b""
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH='"stale"')
+        assert response.status_code == status.HTTP_200_OK
+        assert response["ETag"] == etag
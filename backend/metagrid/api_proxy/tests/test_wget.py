@@ -0,0 +1,187 @@
+import gzip
+import json
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+from urllib.parse import parse_qs
+
+import pytest
+import requests
+import responses
+from django.conf import settings
+from django.test import override_settings
+from django.urls import reverse
+
+from metagrid.api_proxy import wget
+
+pytestmark = pytest.mark.django_db
+
+HEAD = "#!/bin/bash\n" f'download_files="$(cat <<{wget.FILES_MARKER}\n'
+TAIL = f'{wget.FILES_MARKER}\n)"\ndownload\n'
+
+
+@pytest.fixture(autouse=True)
+def split_after_two_datasets():
+    with override_settings(WGET_MAX_DATASETS_PER_REQUEST=2):
+        yield
+
+
+def script(*names):
+    files = "".join(
+        f"'{name}.nc' 'https://node/{name}.nc' 'SHA256' ''\n" for name in names
+    )
+    return HEAD + files + TAIL
+
+
+def wget_callback(request):
+    if request.body:
+        ids = parse_qs(request.body)["dataset_id"][0].split(",")
+    else:
+        ids = parse_qs(request.url.split("?", 1)[1])["dataset_id"]
+    return (
+        200,
+        {"Content-Disposition": "attachment; filename=wget.sh"},
+        script(*ids),
+    )
+
+
+def post_wget(client, ids, **headers):
+    return client.post(
+        reverse("do-wget"),
+        json.dumps({"dataset_id": ids}),
+        content_type="application/json",
+        **headers,
+    )
+
+
+def test_split_script():
+    parts = wget.split_script(script("a", "b"))
+
+    assert parts.head == HEAD
+    assert parts.files == script("a", "b")[len(HEAD) : -len(TAIL)]
+    assert parts.tail == TAIL
+    assert wget.split_script(script()).files == ""
+    with pytest.raises(ValueError):
+        wget.split_script("#!/bin/bash\necho no files\n")
+
+
+@responses.activate
+def test_large_post_is_split_and_merged(client):
+    responses.add_callback(responses.POST, settings.WGET_URL, wget_callback)
+
+    response = post_wget(client, ["a", "b", "c", "d", "e"])
+
+    assert response.streaming
+    assert b"".join(response.streaming_content).decode() == script(
+        "a", "b", "c", "d", "e"
+    )
+    assert response["Content-Disposition"] == "attachment; filename=wget.sh"
+    assert len(responses.calls) == 3
+
+
+@responses.activate
+def test_large_get_is_split_and_merged(client):
+    responses.add_callback(responses.GET, settings.WGET_URL, wget_callback)
+
+    response = client.get(reverse("do-wget"), {"dataset_id": ["a,b", "c"]})
+
+    assert b"".join(response.streaming_content).decode() == script(
+        "a", "b", "c"
+    )
+    assert len(responses.calls) == 2
+
+
+@responses.activate
+def test_small_request_is_not_split(client):
+    responses.add_callback(responses.POST, settings.WGET_URL, wget_callback)
+
+    response = post_wget(client, ["a", "b"])
+
+    assert response.content.decode() == script("a", "b")
+    assert len(responses.calls) == 1
+
+
+@responses.activate
+def test_merged_script_is_gzipped_when_accepted(client):
+    responses.add_callback(responses.POST, settings.WGET_URL, wget_callback)
+
+    response = post_wget(client, ["a", "b", "c"], HTTP_ACCEPT_ENCODING="gzip")
+
+    assert response["Content-Encoding"] == "gzip"
+    body = gzip.decompress(b"".join(response.streaming_content))
+    assert body.decode() == script("a", "b", "c")
+
+
+@responses.activate
+def test_first_part_failure_is_returned(client):
+    responses.post(settings.WGET_URL, body="too many files", status=400)
+
+    response = post_wget(client, ["a", "b", "c"])
+
+    assert response.status_code == 400
+    assert response.content == b"too many files"
+
+
+@responses.activate
+def test_unexpected_first_part_returns_502(client):
+    responses.post(settings.WGET_URL, body="<html>maintenance</html>")
+
+    response = post_wget(client, ["a", "b", "c"])
+
+    assert response.status_code == 502
+
+
+@responses.activate
+def test_later_part_failure_aborts_stream(client):
+    def fail_second_part(request):
+        if "c" in parse_qs(request.body)["dataset_id"][0]:
+            return 500, {}, "error"
+        return wget_callback(request)
+
+    responses.add_callback(responses.POST, settings.WGET_URL, fail_second_part)
+
+    response = post_wget(client, ["a", "b", "c"])
+
+    with pytest.raises(wget.WgetChunkError):
+        b"".join(response.streaming_content)
+
+
+@pytest.fixture
+def pools():
+    """The thread pools created to fetch the parts of a script."""
+    created: list[ThreadPoolExecutor] = []
+
+    def create(**kwargs):
+        created.append(ThreadPoolExecutor(**kwargs))
+        return created[-1]
+
+    with patch("metagrid.api_proxy.views.ThreadPoolExecutor", create):
+        yield created
+
+
+def is_shut_down(pool: ThreadPoolExecutor) -> bool:
+    try:
+        pool.submit(print).cancel()
+    except RuntimeError:
+        return True
+    return False
+
+
+@responses.activate
+def test_pool_is_shut_down_when_unread_script_is_closed(client, pools):
+    responses.add_callback(responses.POST, settings.WGET_URL, wget_callback)
+
+    response = post_wget(client, ["a", "b", "c"])
+
+    assert not is_shut_down(pools[0])
+    response.close()
+    assert is_shut_down(pools[0])
+
+
+@responses.activate
+def test_pool_is_shut_down_when_first_part_fails(client, pools):
+    responses.post(settings.WGET_URL, body=requests.ConnectionError())
+
+    with pytest.raises(requests.ConnectionError):
+        post_wget(client, ["a", "b", "c"])
+
+    assert is_shut_down(pools[0])
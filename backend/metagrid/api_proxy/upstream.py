@@ -0,0 +1,163 @@
+"""Pooled, keep-alive HTTP sessions for calls to upstream services.
+
+Every proxy and Globus view reaches ESG-Search, the wget API, the node
+status API, DKRZ and Globus Auth through this module instead of calling
+``requests.get``/``requests.post`` directly. Each worker process keeps one
+``requests.Session`` with one connection pool per upstream host, so the TCP
+and TLS handshakes are paid once per connection rather than once per request.
+"""
+
+import os
+import threading
+from http.cookiejar import DefaultCookiePolicy
+from typing import Any, Optional
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+RETRY_STATUS_CODES = frozenset({502, 503, 504})
+
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+    """An HTTPAdapter that applies a default timeout to every request."""
+
+    def __init__(
+        self, *args, timeout: Optional[tuple[float, float]] = None, **kwargs
+    ):
+        self.timeout = timeout
+        super().__init__(*args, **kwargs)
+
+    def send(self, request, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        return super().send(request, **kwargs)
+
+
+class UpstreamSessionPool:
+    """A per-process ``requests.Session`` with one adapter per upstream host.
+
+    Adapters are mounted lazily the first time a host is contacted, using the
+    pool size from ``HTTP_POOL_MAXSIZE_PER_HOST`` (falling back to
+    ``HTTP_POOL_MAXSIZE``). The session is rebuilt if the process forks so
+    that gunicorn workers never share sockets inherited from the master.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid: Optional[int] = None
+        self._session: Optional[requests.Session] = None
+        self._adapters: dict[str, TimeoutHTTPAdapter] = {}
+
+    @property
+    def session(self) -> requests.Session:
+        with self._lock:
+            if self._session is None or self._pid != os.getpid():
+                self._session = self._build_session()
+                self._adapters = {}
+                self._pid = os.getpid()
+            return self._session
+
+    @staticmethod
+    def _build_session() -> requests.Session:
+        session = requests.Session()
+        # Upstream cookies must never leak from one proxied user to another
+        session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        return session
+
+    def adapter_for(self, url: str) -> TimeoutHTTPAdapter:
+        """Return the adapter serving ``url``, mounting it if necessary."""
+        session = self.session
+        parts = urlsplit(url)
+        prefix = f"{parts.scheme}://{parts.netloc}/"
+
+        with self._lock:
+            adapter = self._adapters.get(prefix)
+            if adapter is None:
+                pool_size = settings.HTTP_POOL_MAXSIZE_PER_HOST.get(
+                    parts.hostname, settings.HTTP_POOL_MAXSIZE
+                )
+                adapter = TimeoutHTTPAdapter(
+                    pool_connections=1,
+                    pool_maxsize=pool_size,
+                    max_retries=Retry(
+                        total=settings.HTTP_MAX_RETRIES,
+                        backoff_factor=settings.HTTP_RETRY_BACKOFF_FACTOR,
+                        status_forcelist=RETRY_STATUS_CODES,
+                        raise_on_status=False,
+                    ),
+                    timeout=(
+                        settings.HTTP_CONNECT_TIMEOUT,
+                        settings.HTTP_READ_TIMEOUT,
+                    ),
+                )
+                session.mount(prefix, adapter)
+                self._adapters[prefix] = adapter
+        return adapter
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        self.adapter_for(url)
+        return self.session.request(method, url, **kwargs)
+
+    def stats(self) -> dict[str, Any]:
+        """Summarize the connection pools held by this worker."""
+        hosts = {}
+        with self._lock:
+            adapters = dict(self._adapters)
+
+        for prefix, adapter in adapters.items():
+            pools = [
+                adapter.poolmanager.pools.get(key)
+                for key in adapter.poolmanager.pools.keys()
+            ]
+            pools = [pool for pool in pools if pool is not None]
+            hosts[prefix] = {
+                "pool_maxsize": adapter.poolmanager.connection_pool_kw[
+                    "maxsize"
+                ],
+                "connections_opened": sum(
+                    pool.num_connections for pool in pools
+                ),
+                "requests": sum(pool.num_requests for pool in pools),
+                "idle_connections": sum(
+                    sum(1 for conn in list(pool.pool.queue) if conn)
+                    for pool in pools
+                    if pool.pool is not None
+                ),
+            }
+        return {"pid": os.getpid(), "hosts": hosts}
+
+    def reset(self):
+        """Close every pooled connection and forget the mounted adapters."""
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+            self._session = None
+            self._adapters = {}
+            self._pid = None
+
+
+_pool = UpstreamSessionPool()
+
+
+def request(method: str, url: str, **kwargs) -> requests.Response:
+    """Send a request to an upstream host through the shared session."""
+    return _pool.request(method, url, **kwargs)
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    return request("POST", url, **kwargs)
+
+
+def pool_stats() -> dict[str, Any]:
+    return _pool.stats()
+
+
+def reset():
+    _pool.reset()
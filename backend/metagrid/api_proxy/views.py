@@ -1,20 +1,47 @@
+import functools
+import hashlib
 import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
 from urllib.parse import urlparse
 
-import globus_sdk
-import requests
 from django.conf import settings
 from django.contrib.auth import logout
-from django.http import HttpResponse, HttpResponseBadRequest, JsonResponse
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import (
+    HttpResponse,
+    HttpResponseBadRequest,
+    JsonResponse,
+    StreamingHttpResponse,
+)
+from django.http.response import HttpResponseBase
 from django.shortcuts import redirect
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+from django.views.decorators.cache import cache_control
 from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_http_methods
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import etag, require_http_methods
 from globus_portal_framework.gclients import load_transfer_client
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import RefreshToken
 
 from config.settings.site_specific import MetagridFrontendSettings
+from metagrid.api_proxy import citations, node_status, upstream, wget
+from metagrid.api_proxy.cache import (
+    CachedResponse,
+    cache_key,
+    get_search_cache,
+)
+from metagrid.api_proxy.endpoint_search import search_endpoints
+from metagrid.api_proxy.globus_app import app_transfer_client
+from metagrid.api_proxy.models import Citation
+from metagrid.api_proxy.singleflight import (
+    fetch_with_shared_lock,
+    search_flights,
+)
+from metagrid.cart import documents
 
 
 @api_view()
@@ -55,76 +82,229 @@ def do_globus_search_endpoints(request):
 
     if request.user.is_authenticated:
         tc = load_transfer_client(request.user)  # pragma: no cover
+        identity = f"user:{request.user.pk}"  # pragma: no cover
     else:
-        client = globus_sdk.ConfidentialAppAuthClient(
-            settings.SOCIAL_AUTH_GLOBUS_KEY,
-            settings.SOCIAL_AUTH_GLOBUS_SECRET,
-        )
-        token_response = client.oauth2_client_credentials_tokens()
-        globus_transfer_data = token_response.by_resource_server[
-            "transfer.api.globus.org"
-        ]
-        globus_transfer_token = globus_transfer_data["access_token"]
-        authorizer = globus_sdk.AccessTokenAuthorizer(globus_transfer_token)
-        tc = globus_sdk.TransferClient(authorizer=authorizer)
-    endpoints = tc.endpoint_search(filter_fulltext=search_text)
-    return Response(endpoints["DATA"])
+        tc = app_transfer_client.get()
+        identity = "anonymous"
+    return Response(search_endpoints(tc, identity, search_text))
 
 
 @require_http_methods(["GET", "POST"])
 @csrf_exempt
 def do_search(request):
-    return do_request(request, settings.SEARCH_URL)
+    cache = get_search_cache()
+    if cache is None and settings.PROXY_STREAMING:
+        return do_request(request, settings.SEARCH_URL, stream=True)
+    return do_request(
+        request,
+        settings.SEARCH_URL,
+        cache=cache,
+        coalesce=True,
+        record=documents.record_in_background,
+    )
 
 
 @require_http_methods(["POST"])
 @csrf_exempt
 def do_citation(request):
+    url = citation_url(request)
+    if url is None:
+        return HttpResponseBadRequest()
+
+    citation = citations.get_citation(url)
+    return HttpResponse(citation.text, status=citation.status)
+
+
+@require_http_methods(["POST"])
+@csrf_exempt
+def do_citations(request):
+    """Return the citations of many datasets at once.
+
+    The body is ``{"citurls": [...]}``; the response lists, in the same
+    order, ``{"citurl", "status", "citation"}`` for each URL, where
+    ``citation`` is the citation document or null if it could not be
+    fetched.
+    """
+    try:
+        urls = json.loads(request.body)["citurls"]
+    except (ValueError, KeyError, TypeError):
+        return HttpResponseBadRequest()
+    if (
+        not isinstance(urls, list)
+        or len(urls) > settings.CITATION_BATCH_MAX_URLS
+        or not all(map(is_citation_url, urls))
+    ):
+        return HttpResponseBadRequest()
+
+    results = []
+    for url, citation in zip(urls, citations.get_citations(urls)):
+        try:
+            document = (
+                json.loads(citation.text) if citation.status == 200 else None
+            )
+        except ValueError:
+            document = None
+        results.append(
+            {"citurl": url, "status": citation.status, "citation": document}
+        )
+    return JsonResponse({"results": results})
+
+
+def citation_url(request) -> Optional[str]:
+    """Return the DKRZ citation URL requested in the body, if it is valid."""
     jo = {}
     try:
         jo = json.loads(request.body)
     except Exception:  # pragma: no cover
-        return HttpResponseBadRequest()
+        return None
 
     if "citurl" not in jo:  # pragma: no cover
-        return HttpResponseBadRequest()
+        return None
 
     url = jo["citurl"]
 
-    parsed_url = urlparse(url)
+    if not is_citation_url(url):
+        return None
 
-    if not parsed_url.hostname == "cera-www.dkrz.de":
-        return HttpResponseBadRequest()
+    return url
 
-    try:
-        resp = requests.get(url, verify=False)
-    except Exception:  # pragma: no cover
-        return HttpResponseBadRequest()
 
-    httpresp = HttpResponse(resp.text)
-    httpresp.status_code = resp.status_code
-    return httpresp
+def is_citation_url(url) -> bool:
+    # Longer URLs could not be stored, so they are not fetched either
+    return (
+        isinstance(url, str)
+        and len(url) <= Citation.URL_MAX_LENGTH
+        and urlparse(url).hostname == "cera-www.dkrz.de"
+    )
 
 
 @require_http_methods(["GET", "POST"])
 @csrf_exempt
 def do_status(request):
-    resp = requests.get(settings.STATUS_URL)  # pragma: no cover
-    if resp.status_code == 200:  # pragma: no cover
-        return HttpResponse(resp.text)
-    else:  # pragma: no cover
-        return HttpResponseBadRequest(resp.text)
+    snapshot = node_status.get_snapshot()
+    if snapshot.status != 200:
+        # Failures are not cached by browsers, so they are not revalidated
+        return HttpResponseBadRequest(snapshot.text)
+    etag = quote_etag(snapshot.etag)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(snapshot.text)
+    response["ETag"] = etag
+    patch_cache_control(
+        response, public=True, max_age=settings.NODE_STATUS_POLL_INTERVAL
+    )
+    return response
+
+
+@require_http_methods(["GET"])
+def do_status_stream(request):
+    """Push the node status to the client as server-sent events."""
+    return event_stream_response(
+        node_status.event_stream(request.headers.get("Last-Event-ID"))
+    )
+
 
+def event_stream_response(events) -> StreamingHttpResponse:
+    response = StreamingHttpResponse(events, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # Keeps nginx from buffering the events
+    response["X-Accel-Buffering"] = "no"
+    return response
 
+
+@gzip_page
 @require_http_methods(["GET", "POST"])
 @csrf_exempt
 def do_wget(request):
-    return do_request(request, settings.WGET_URL, True)
+    upstream_request = build_upstream_request(request, True)
+    if upstream_request is not None:
+        method, params, _ = upstream_request
+        chunks = wget.split_request(method, params)
+        if chunks is not None:
+            return _wget_in_chunks(method, chunks)
+    return do_request(
+        request, settings.WGET_URL, True, stream=settings.PROXY_STREAMING
+    )
 
 
-def do_request(request, urlbase, useBody=False):
-    resp = None
+def _wget_in_chunks(method, chunks) -> HttpResponseBase:
+    """Fetch the parts of a split wget script concurrently and stream the
+    merged script as soon as its first part arrives.
+
+    A part that fails once streaming has started aborts the response, so the
+    client never receives a script missing some of its files.
+    """
+    pool = ThreadPoolExecutor(max_workers=settings.WGET_MAX_PARALLEL_REQUESTS)
+    response: Optional[HttpResponseBase] = None
+    try:
+        response = _merge_wget_chunks(pool, method, chunks)
+        return response
+    finally:
+        # A streamed script shuts the pool down once it is closed
+        if response is None or not response.streaming:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _merge_wget_chunks(pool, method, chunks) -> HttpResponseBase:
+    send = upstream.post if method == "POST" else upstream.get
+    futures = [
+        pool.submit(send, settings.WGET_URL, **kwargs) for kwargs in chunks
+    ]
+
+    def others():
+        for future in futures[1:]:
+            resp = future.result()
+            if resp.status_code != 200:
+                raise wget.WgetChunkError(
+                    f"wget returned {resp.status_code}: {resp.text}"
+                )
+            yield resp.text
+
+    first = futures[0].result()
+    if first.status_code != 200:
+        return HttpResponse(
+            first.content,
+            status=first.status_code,
+            content_type=first.headers.get("Content-Type"),
+        )
+    try:
+        parts = wget.split_script(first.text)
+    except ValueError:
+        return HttpResponse("Unexpected wget script from upstream", status=502)
+
+    response = StreamingHttpResponse(
+        ClosingContent(
+            wget.merge_scripts(parts, others()),
+            functools.partial(pool.shutdown, wait=False, cancel_futures=True),
+        ),
+        content_type=first.headers.get("Content-Type", "text/x-sh"),
+    )
+    if "Content-Disposition" in first.headers:
+        response["Content-Disposition"] = first.headers["Content-Disposition"]
+    return response
 
+
+class ClosingContent:
+    """The content of a streaming response, with a callback run when the
+    response is closed, which happens even if the client disconnects before
+    the content is read.
+    """
+
+    def __init__(self, content, close: Callable[[], Any]):
+        self.content = content
+        self.close = close
+
+    def __iter__(self):
+        return iter(self.content)
+
+    def __aiter__(self):
+        return aiter(self.content)
+
+
+def build_upstream_request(request, useBody=False):
+    """Translate a proxied request into the upstream method, parameters and
+    ``requests`` keyword arguments, or None if the method is not supported.
+    """
     if request.method == "POST":  # pragma: no cover
         if useBody:
             jo = json.loads(request.body)
@@ -137,20 +317,107 @@ def do_request(request, urlbase, useBody=False):
                 jo["query"] = query[0]
         if "dataset_id" in jo:
             jo["dataset_id"] = ",".join(jo["dataset_id"])
-        resp = requests.post(urlbase, data=jo)
+        return "POST", jo, {"data": jo}
 
     elif request.method == "GET":
-        url_params = request.GET.copy()
-        resp = requests.get(urlbase, params=url_params)
-    else:  # pragma: no cover
+        # Every value of a repeated parameter is forwarded; only the cache
+        # key is normalized
+        params = dict(request.GET.lists())
+        return "GET", params, {"params": params}
+
+    return None  # pragma: no cover
+
+
+def do_request(
+    request,
+    urlbase,
+    useBody=False,
+    cache=None,
+    coalesce=False,
+    stream=False,
+    record=None,
+):
+    upstream_request = build_upstream_request(request, useBody)
+    if upstream_request is None:  # pragma: no cover
         return HttpResponseBadRequest("Request method must be POST or GET.")
 
-    httpresp = HttpResponse(resp.text, content_type="text/json")
-    httpresp.status_code = resp.status_code
+    method, params, kwargs = upstream_request
+    send_method = upstream.post if method == "POST" else upstream.get
+    send = functools.partial(send_method, urlbase, **kwargs)
+
+    if stream:
+        return _stream_upstream(request, send)
+
+    key = cache_key(urlbase, params)
+    cached = cache.get(key) if cache is not None else None
+
+    if cached is None:
+        fetch = functools.partial(_fetch_upstream, send, cache, key, record)
+        if coalesce:
+            if cache is not None and settings.SEARCH_COALESCE_ACROSS_WORKERS:
+                fetch = functools.partial(
+                    fetch_with_shared_lock,
+                    cache,
+                    key,
+                    fetch,
+                    settings.SEARCH_COALESCE_TIMEOUT,
+                )
+            cached = search_flights.do(key, fetch)
+        else:
+            cached = fetch()
+
+    httpresp = HttpResponse(cached.content, content_type=cached.content_type)
+    httpresp.status_code = cached.status
+
+    return httpresp
+
 
+def _fetch_upstream(send, cache, key, record=None) -> CachedResponse:
+    # Another request may have filled the cache while this one was waiting
+    # for its turn to go upstream.
+    if cache is not None and (cached := cache.get(key)) is not None:
+        return cached
+
+    resp = send()
+    result = CachedResponse(resp.status_code, resp.content, "text/json")
+    if cache is not None and resp.status_code == 200:
+        cache.set(key, result)
+    if record is not None and resp.status_code == 200:
+        record(resp.content)
+    return result
+
+
+def _stream_upstream(request, send) -> StreamingHttpResponse:
+    # Let the client negotiate the encoding with upstream so the body can be
+    # relayed byte for byte, without being decompressed in the worker.
+    resp = send(
+        stream=True,
+        headers={
+            "Accept-Encoding": request.headers.get(
+                "Accept-Encoding", "identity"
+            )
+        },
+    )
+    httpresp = StreamingHttpResponse(
+        _iter_raw(resp),
+        status=resp.status_code,
+        content_type=resp.headers.get("Content-Type", "text/json"),
+    )
+    for header in ("Content-Encoding", "Content-Length"):
+        if header in resp.headers:
+            httpresp[header] = resp.headers[header]
     return httpresp
 
 
+def _iter_raw(resp):
+    try:
+        yield from resp.raw.stream(
+            settings.PROXY_STREAM_CHUNK_SIZE, decode_content=False
+        )
+    finally:
+        resp.close()
+
+
 @require_http_methods(["POST"])
 @csrf_exempt
 def get_temp_storage(request):
@@ -269,5 +536,21 @@ def set_temp_storage(request):
     return HttpResponse(json.dumps(response))
 
 
-def get_frontend_config(_) -> JsonResponse:
-    return JsonResponse(MetagridFrontendSettings().model_dump())
+@functools.cache
+def frontend_config_payload() -> tuple[bytes, str]:
+    """The serialized frontend settings and their ETag.
+
+    The settings only change with the environment, so they are validated
+    and serialized once per process rather than on every page load.
+    """
+    content = json.dumps(
+        MetagridFrontendSettings().model_dump(), cls=DjangoJSONEncoder
+    ).encode()
+    return content, hashlib.sha256(content).hexdigest()
+
+
+@cache_control(no_cache=True)
+@etag(lambda request: frontend_config_payload()[1])
+def get_frontend_config(_) -> HttpResponse:
+    content, _etag = frontend_config_payload()
+    return HttpResponse(content, content_type="application/json")
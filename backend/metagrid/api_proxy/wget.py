@@ -0,0 +1,75 @@
+"""Splitting of large wget script requests.
+
+A cart with many datasets makes ESG-Search generate one very large wget
+script in a single, slow request. When more than
+``WGET_MAX_DATASETS_PER_REQUEST`` datasets are requested, the datasets are
+split across several upstream requests, sent concurrently, and the scripts
+they return are merged into one: the first script is kept whole, and the
+files listed by the others are added to its list of files to download.
+"""
+
+from typing import Any, Iterable, Iterator, NamedTuple, Optional
+
+from django.conf import settings
+
+# Delimits the heredoc listing the files a wget script downloads
+FILES_MARKER = "EOF--dataset.file.url.chksum_type.chksum"
+
+
+class ScriptParts(NamedTuple):
+    head: str  # Up to and including the line opening the list of files
+    files: str
+    tail: str  # From the line closing the list of files
+
+
+def split_script(script: str) -> ScriptParts:
+    """Split a wget script around its list of files.
+
+    Raises:
+    - ValueError: If the script has no list of files.
+    """
+    opening = script.index(f"<<{FILES_MARKER}\n")
+    start = opening + len(FILES_MARKER) + 3
+    end = script.index(f"\n{FILES_MARKER}\n", start - 1) + 1
+    return ScriptParts(script[:start], script[start:end], script[end:])
+
+
+def merge_scripts(first: ScriptParts, others: Iterable[str]) -> Iterator[str]:
+    """Yield the first script with the files of the others added to it."""
+    yield first.head
+    yield first.files
+    for script in others:
+        yield split_script(script).files
+    yield first.tail
+
+
+def dataset_ids(params: dict[str, Any]) -> list[str]:
+    value = params.get("dataset_id", [])
+    values = value if isinstance(value, list) else [value]
+    return [
+        dataset_id
+        for joined in values
+        for dataset_id in str(joined).split(",")
+        if dataset_id
+    ]
+
+
+def split_request(
+    method: str, params: dict[str, Any]
+) -> Optional[list[dict[str, Any]]]:
+    """The keyword arguments of each upstream request for a wget request, or
+    None if it is small enough to be sent as is.
+    """
+    ids = dataset_ids(params)
+    size = settings.WGET_MAX_DATASETS_PER_REQUEST
+    if len(ids) <= size:
+        return None
+
+    chunks = [ids[start : start + size] for start in range(0, len(ids), size)]
+    if method == "POST":
+        return [{"data": params | {"dataset_id": ",".join(c)}} for c in chunks]
+    return [{"params": params | {"dataset_id": c}} for c in chunks]
+
+
+class WgetChunkError(Exception):
+    """An upstream request for part of a split wget script failed."""
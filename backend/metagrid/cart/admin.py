@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from metagrid.cart.models import Cart, Search
+from metagrid.cart.models import Cart, CartItem, DatasetDocument, Search
 
 
 @admin.register(Cart)
@@ -8,6 +8,19 @@ class CartAdmin(admin.ModelAdmin):
     pass
 
 
+@admin.register(CartItem)
+class CartItemAdmin(admin.ModelAdmin):
+    list_display = ("dataset_id", "cart")
+    raw_id_fields = ("cart", "document")
+    search_fields = ("dataset_id",)
+
+
+@admin.register(DatasetDocument)
+class DatasetDocumentAdmin(admin.ModelAdmin):
+    list_display = ("dataset_id", "data_node", "from_search", "recorded")
+    search_fields = ("dataset_id",)
+
+
 @admin.register(Search)
 class SearchAdmin(admin.ModelAdmin):
     pass
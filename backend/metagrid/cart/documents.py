@@ -0,0 +1,87 @@
+"""Record the dataset documents of search responses.
+
+A dataset added to a cart by id alone is shown with the copy of its
+document recorded here, which came from ESG-Search rather than from a
+client. Responses are recorded in a background thread once they have been
+fetched, so searches do not wait on the database. Only responses fetched
+upstream are recorded: cache hits were recorded when first fetched, and
+streamed responses are never read by the proxy. At most ``MAX_PENDING``
+responses wait to be recorded in each process; the others are dropped
+rather than held in memory, as a dataset's copy only needs to be recorded
+from one of the many searches finding it.
+"""
+
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Optional
+
+from django.db import close_old_connections
+from django.utils import timezone
+
+from metagrid.cart.models import DatasetDocument
+
+logger = logging.getLogger(__name__)
+
+# Responses waiting to be recorded, beyond which new ones are dropped
+MAX_PENDING = 8
+
+_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_pid: Optional[int] = None
+_pending = threading.BoundedSemaphore(MAX_PENDING)
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor, _executor_pid, _pending
+    with _lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="dataset-documents"
+            )
+            _executor_pid = os.getpid()
+            _pending = threading.BoundedSemaphore(MAX_PENDING)
+        return _executor
+
+
+def record_in_background(content: bytes):
+    executor = get_executor()
+    pending = _pending
+    if not pending.acquire(blocking=False):
+        logger.debug("Too many searches waiting to be recorded, dropped one")
+        return
+    executor.submit(_record_in_worker, content, pending)
+
+
+def _record_in_worker(content: bytes, pending: threading.BoundedSemaphore):
+    try:
+        record_search_response(content)
+    except Exception:
+        logger.exception("Could not record the documents of a search")
+    finally:
+        pending.release()
+        close_old_connections()
+
+
+def record_search_response(content: bytes):
+    try:
+        docs = json.loads(content)["response"]["docs"]
+    except (ValueError, KeyError, TypeError):
+        return
+    if isinstance(docs, list):
+        DatasetDocument.objects.record_search_results(
+            [doc for doc in docs if isinstance(doc, dict)]
+        )
+
+
+def prune_documents(older_than: timedelta) -> int:
+    """Delete the documents no cart holds, which were not stored or seen in
+    search results for ``older_than``.
+    """
+    deleted, _ = DatasetDocument.objects.filter(
+        recorded__lt=timezone.now() - older_than, cart_items__isnull=True
+    ).delete()
+    return deleted
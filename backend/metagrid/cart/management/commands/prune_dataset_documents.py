@@ -0,0 +1,21 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from metagrid.cart.documents import prune_documents
+
+
+class Command(BaseCommand):
+    help = "Delete the dataset documents no cart holds"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--older-than",
+            type=int,
+            default=7,
+            help="Days since the document was stored or seen in a search",
+        )
+
+    def handle(self, *args, **options):
+        deleted = prune_documents(timedelta(days=options["older_than"]))
+        self.stdout.write(f"Deleted {deleted} dataset document(s).")
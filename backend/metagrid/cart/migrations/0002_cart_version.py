@@ -0,0 +1,18 @@
+# Generated by Django 5.0.7 on 2026-10-18 09:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("cart", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="cart",
+            name="version",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
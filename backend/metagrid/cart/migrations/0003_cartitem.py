@@ -0,0 +1,99 @@
+# Generated by Django 5.0.7 on 2026-10-18 09:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def as_int(value):
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        return None
+    return number if number >= 0 else None
+
+
+def copy_items_to_rows(apps, schema_editor):
+    """Copy each cart's items to CartItem rows, keeping their order.
+
+    Items without a string "id" cannot be told apart, so they are dropped,
+    as are later copies of an item already in the cart.
+    """
+    Cart = apps.get_model("cart", "Cart")
+    CartItem = apps.get_model("cart", "CartItem")
+    for cart in Cart.objects.exclude(items=[]).iterator(chunk_size=500):
+        docs = {}
+        for doc in cart.items if isinstance(cart.items, list) else []:
+            if isinstance(doc, dict) and isinstance(doc.get("id"), str):
+                docs.setdefault(doc["id"], doc)
+        CartItem.objects.bulk_create(
+            [
+                CartItem(
+                    cart=cart,
+                    dataset_id=dataset_id,
+                    data_node=doc.get("data_node") or "",
+                    title=doc.get("title") or "",
+                    number_of_files=as_int(doc.get("number_of_files")),
+                    size=as_int(doc.get("size")),
+                    doc=doc,
+                )
+                for dataset_id, doc in docs.items()
+            ],
+            batch_size=1000,
+        )
+
+
+def copy_rows_to_items(apps, schema_editor):
+    Cart = apps.get_model("cart", "Cart")
+    CartItem = apps.get_model("cart", "CartItem")
+    items = {}
+    for cart_id, doc in CartItem.objects.order_by("id").values_list(
+        "cart_id", "doc"
+    ):
+        items.setdefault(cart_id, []).append(doc)
+    for cart_id, docs in items.items():
+        Cart.objects.filter(pk=cart_id).update(items=docs)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("cart", "0002_cart_version"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CartItem",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                ("dataset_id", models.CharField(max_length=1024)),
+                ("data_node", models.CharField(blank=True, max_length=255)),
+                ("title", models.TextField(blank=True)),
+                ("number_of_files", models.PositiveIntegerField(null=True)),
+                ("size", models.PositiveBigIntegerField(null=True)),
+                ("doc", models.JSONField(default=dict)),
+                (
+                    "cart",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="cart_items",
+                        to="cart.cart",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["cart", "id"],
+                        name="cart_cartit_cart_id_2181d6_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="cartitem",
+            constraint=models.UniqueConstraint(
+                fields=("cart", "dataset_id"), name="cart_item_unique_dataset"
+            ),
+        ),
+        migrations.RunPython(copy_items_to_rows, copy_rows_to_items),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.0.7 on 2026-10-18 09:05
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("cart", "0003_cartitem"),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name="cart",
+            name="items",
+        ),
+    ]
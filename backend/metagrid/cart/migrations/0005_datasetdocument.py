@@ -0,0 +1,108 @@
+# Generated by Django 5.0.7 on 2026-10-18 09:10
+
+import hashlib
+import json
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def digest(doc):
+    content = json.dumps(doc, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def share_documents(apps, schema_editor):
+    """Move each cart item's document to a dataset document row.
+
+    Identical copies of a document held by several carts are stored once;
+    different copies are kept apart, each shown in its own carts.
+    """
+    CartItem = apps.get_model("cart", "CartItem")
+    DatasetDocument = apps.get_model("cart", "DatasetDocument")
+    documents = {}
+    items = []
+    for item in CartItem.objects.order_by("id").iterator(chunk_size=1000):
+        key = (item.dataset_id, digest(item.doc))
+        documents.setdefault(
+            key,
+            DatasetDocument(
+                dataset_id=item.dataset_id,
+                digest=key[1],
+                data_node=item.data_node,
+                title=item.title,
+                number_of_files=item.number_of_files,
+                size=item.size,
+                doc=item.doc,
+            ),
+        )
+        items.append((item.pk, key))
+    DatasetDocument.objects.bulk_create(documents.values(), batch_size=1000)
+    CartItem.objects.bulk_update(
+        [
+            CartItem(pk=pk, document_id=documents[key].pk)
+            for pk, key in items
+        ],
+        ["document"],
+        batch_size=1000,
+    )
+
+
+def copy_documents_to_items(apps, schema_editor):
+    CartItem = apps.get_model("cart", "CartItem")
+    DatasetDocument = apps.get_model("cart", "DatasetDocument")
+    for document in DatasetDocument.objects.iterator(chunk_size=1000):
+        CartItem.objects.filter(document=document).update(
+            data_node=document.data_node,
+            title=document.title,
+            number_of_files=document.number_of_files,
+            size=document.size,
+            doc=document.doc,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("cart", "0004_remove_cart_items"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DatasetDocument",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                ("dataset_id", models.CharField(max_length=1024)),
+                ("digest", models.CharField(max_length=64)),
+                ("data_node", models.CharField(blank=True, max_length=255)),
+                ("title", models.TextField(blank=True)),
+                ("number_of_files", models.PositiveIntegerField(null=True)),
+                ("size", models.PositiveBigIntegerField(null=True)),
+                ("doc", models.JSONField(default=dict)),
+                ("from_search", models.BooleanField(default=False)),
+                (
+                    "recorded",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="datasetdocument",
+            constraint=models.UniqueConstraint(
+                fields=("dataset_id", "digest"),
+                name="dataset_document_unique_content",
+            ),
+        ),
+        migrations.AddField(
+            model_name="cartitem",
+            name="document",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="cart_items",
+                to="cart.datasetdocument",
+            ),
+        ),
+        migrations.RunPython(share_documents, copy_documents_to_items),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.0.7 on 2026-10-18 09:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("cart", "0005_datasetdocument"),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name="cartitem",
+            name="data_node",
+        ),
+        migrations.RemoveField(
+            model_name="cartitem",
+            name="doc",
+        ),
+        migrations.RemoveField(
+            model_name="cartitem",
+            name="number_of_files",
+        ),
+        migrations.RemoveField(
+            model_name="cartitem",
+            name="size",
+        ),
+        migrations.RemoveField(
+            model_name="cartitem",
+            name="title",
+        ),
+        migrations.AlterField(
+            model_name="cartitem",
+            name="document",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="cart_items",
+                to="cart.datasetdocument",
+            ),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.0.7 on 2026-10-18 09:12
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def remove_duplicate_searches(apps, schema_editor):
+    """Keep only the latest of a user's searches sharing a uuid.
+
+    Saving the same search twice used to create two rows, which the unique
+    constraint added below forbids. The row with the highest id, the last
+    one saved, is kept deliberately, as the newest copy of the search; the
+    older copies are deleted, and are not restored by reversing this
+    migration.
+    """
+    Search = apps.get_model("cart", "Search")
+    duplicates = (
+        Search.objects.values("user", "uuid")
+        .annotate(latest=Max("id"), count=Count("id"))
+        .filter(count__gt=1)
+    )
+    for duplicate in duplicates.iterator():
+        Search.objects.filter(
+            user=duplicate["user"], uuid=duplicate["uuid"]
+        ).exclude(id=duplicate["latest"]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("cart", "0006_remove_cartitem_doc"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            remove_duplicate_searches, migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name="search",
+            constraint=models.UniqueConstraint(
+                fields=("user", "uuid"), name="search_unique_user_uuid"
+            ),
+        ),
+    ]
@@ -1,18 +1,84 @@
+import hashlib
+import json
 import uuid
+from typing import Any, Optional
 
 from django.contrib.postgres.fields import ArrayField
-from django.db import models
+from django.db import connections, models, transaction
 from django.db.models import JSONField as JSONBField  # type: ignore
+from django.utils import timezone
 
 # mypy does not have support for some Django 3.x features (e.g. JSONField)
 # https://github.com/typeddjango/django-stubs/issues/439
 
 
+class CartManager(models.Manager):
+    """Applies changes to a cart's items, one transaction per change.
+
+    Each change increments the cart's version. Given the version the client
+    last saw, a change is only applied if the cart is still at that version;
+    the new version is returned, or None if the cart has moved on.
+    """
+
+    def _bump_version(
+        self, cart: "Cart", version: Optional[int]
+    ) -> Optional[int]:
+        # Also locks the cart's row, so changes to one cart are serialized
+        sql = (
+            f"UPDATE {self.model._meta.db_table}"
+            " SET version = version + 1 WHERE id = %s"
+        )
+        params = [cart.pk]
+        if version is not None:
+            sql += " AND version = %s"
+            params.append(version)
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(sql + " RETURNING version", params)
+            row = cursor.fetchone()
+        return None if row is None else row[0]
+
+    def add_items(
+        self, cart: "Cart", items: list[dict], version: Optional[int] = None
+    ) -> Optional[int]:
+        """Append the items whose id is not in the cart yet."""
+        with transaction.atomic(using=self.db):
+            version = self._bump_version(cart, version)
+            if version is not None:
+                CartItem.objects.bulk_create(
+                    cart_items(cart, items), ignore_conflicts=True
+                )
+        return version
+
+    def remove_items(
+        self, cart: "Cart", ids: list[str], version: Optional[int] = None
+    ) -> Optional[int]:
+        """Remove the items with the given ids."""
+        with transaction.atomic(using=self.db):
+            version = self._bump_version(cart, version)
+            if version is not None:
+                cart.cart_items.filter(dataset_id__in=ids).delete()
+        return version
+
+    def replace_items(
+        self, cart: "Cart", items: list[dict], version: Optional[int] = None
+    ) -> Optional[int]:
+        """Replace all of the cart's items, keeping the order given."""
+        with transaction.atomic(using=self.db):
+            version = self._bump_version(cart, version)
+            if version is not None:
+                cart.cart_items.all().delete()
+                CartItem.objects.bulk_create(cart_items(cart, items))
+        return version
+
+
 class Cart(models.Model):
     """Model definition for Cart."""
 
     user = models.OneToOneField("users.User", on_delete=models.CASCADE)
-    items = JSONBField(default=list)
+    # Incremented by every change to the items
+    version = models.PositiveIntegerField(default=0)
+
+    objects = CartManager()
 
     class Meta:
         """Meta definition for Cart."""
@@ -22,7 +88,191 @@ class Cart(models.Model):
 
     def __str__(self):
         """Unicode representation of Cart."""
-        return str(self.items)
+        return f"Cart of user {self.user_id}"
+
+    @property
+    def docs(self) -> list[dict]:
+        """The dataset documents in the cart, in the order they were added."""
+        return list(
+            self.cart_items.order_by("id").values_list(
+                "document__doc", flat=True
+            )
+        )
+
+
+class DatasetDocumentManager(models.Manager["DatasetDocument"]):
+    def store(self, docs: list[dict]) -> dict[str, int]:
+        """Save the documents added to a cart, returning their primary keys
+        by dataset id.
+
+        A client's copy of a document is kept as a row of its own, keyed by
+        its content, so it only ever shows in the carts it was added to. A
+        document that has nothing but an "id" refers to the copy recorded
+        from search responses, when there is one.
+        """
+        bare_ids = [doc["id"] for doc in docs if not doc.keys() - {"id"}]
+        documents = dict(
+            self.filter(
+                dataset_id__in=bare_ids, digest=DatasetDocument.SEARCH_DIGEST
+            ).values_list("dataset_id", "pk")
+        )
+        rows = [
+            DatasetDocument.from_doc(doc)
+            for doc in docs
+            if doc["id"] not in documents
+        ]
+        # Rows are locked in the same order by concurrent writers
+        rows.sort(key=lambda row: (row.dataset_id, row.digest))
+        self.bulk_create(rows, ignore_conflicts=True)
+        stored = self.filter(
+            dataset_id__in=[row.dataset_id for row in rows],
+            digest__in=[row.digest for row in rows],
+        )
+        keys = {(row.dataset_id, row.digest) for row in rows}
+        for dataset_id, digest, pk in stored.values_list(
+            "dataset_id", "digest", "pk"
+        ):
+            if (dataset_id, digest) in keys:
+                documents[dataset_id] = pk
+        return documents
+
+    def record_search_results(self, docs: list[dict]):
+        """Record the dataset documents of a search response.
+
+        Each dataset has one search copy, updated in place, so fields that
+        change on every search, such as ``score``, do not add rows.
+        """
+        rows = {
+            doc["id"]: DatasetDocument.from_doc(doc, from_search=True)
+            for doc in docs
+            if doc.get("type") == "Dataset" and isinstance(doc.get("id"), str)
+        }
+        # Rows are locked in the same order by concurrent writers
+        self.bulk_create(
+            [rows[dataset_id] for dataset_id in sorted(rows)],
+            update_conflicts=True,
+            unique_fields=["dataset_id", "digest"],
+            update_fields=[
+                "data_node",
+                "title",
+                "number_of_files",
+                "size",
+                "doc",
+                "recorded",
+            ],
+        )
+
+
+class DatasetDocument(models.Model):
+    """A copy of the search document of a dataset.
+
+    Rows are keyed by the dataset's ``id``, which includes its data node,
+    and a digest. A copy sent by a client is digested from its content, so
+    identical copies are stored once and shared by every cart holding them,
+    and the row is never changed once written. The copy recorded from
+    search responses has ``SEARCH_DIGEST`` instead, and is updated in
+    place. The other columns are copied from the document so datasets can
+    be summarized without reading it.
+    """
+
+    SEARCH_DIGEST = "search"
+
+    id = models.BigAutoField(primary_key=True)
+    dataset_id = models.CharField(max_length=1024)
+    digest = models.CharField(max_length=64)
+    data_node = models.CharField(max_length=255, blank=True)
+    title = models.TextField(blank=True)
+    number_of_files = models.PositiveIntegerField(null=True)
+    size = models.PositiveBigIntegerField(null=True)
+    doc = JSONBField(default=dict)
+    # Whether the document was seen in a response from ESG-Search, rather
+    # than only sent by a client
+    from_search = models.BooleanField(default=False)
+    # When the document was stored, or last seen in search results
+    recorded = models.DateTimeField(default=timezone.now)
+
+    objects = DatasetDocumentManager()
+
+    class Meta:
+        """Meta definition for DatasetDocument."""
+
+        constraints = [
+            models.UniqueConstraint(
+                fields=["dataset_id", "digest"],
+                name="dataset_document_unique_content",
+            )
+        ]
+
+    def __str__(self):
+        """Unicode representation of DatasetDocument."""
+        return self.dataset_id
+
+    @classmethod
+    def from_doc(cls, doc: dict, from_search=False) -> "DatasetDocument":
+        if from_search:
+            digest = cls.SEARCH_DIGEST
+        else:
+            content = json.dumps(doc, sort_keys=True, separators=(",", ":"))
+            digest = hashlib.sha256(content.encode()).hexdigest()
+        return cls(
+            dataset_id=doc["id"],
+            digest=digest,
+            data_node=doc.get("data_node") or "",
+            title=doc.get("title") or "",
+            number_of_files=as_int(doc.get("number_of_files")),
+            size=as_int(doc.get("size")),
+            doc=doc,
+            from_search=from_search,
+        )
+
+
+def as_int(value: Any) -> Optional[int]:
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        return None
+    return number if number >= 0 else None
+
+
+class CartItem(models.Model):
+    """A dataset in a cart, whose document is kept in ``DatasetDocument``."""
+
+    id = models.BigAutoField(primary_key=True)
+    cart = models.ForeignKey(
+        Cart, on_delete=models.CASCADE, related_name="cart_items"
+    )
+    dataset_id = models.CharField(max_length=1024)
+    document = models.ForeignKey(
+        DatasetDocument,
+        on_delete=models.PROTECT,
+        related_name="cart_items",
+    )
+
+    class Meta:
+        """Meta definition for CartItem."""
+
+        constraints = [
+            models.UniqueConstraint(
+                fields=["cart", "dataset_id"], name="cart_item_unique_dataset"
+            )
+        ]
+        # Pages of a cart are read in insertion order
+        indexes = [models.Index(fields=["cart", "id"])]
+
+    def __str__(self):
+        """Unicode representation of CartItem."""
+        return self.dataset_id
+
+
+def cart_items(cart: Cart, docs: list[dict]) -> list[CartItem]:
+    """Store the documents and build the cart's rows for them, in order."""
+    documents = DatasetDocument.objects.store(docs)
+    return [
+        CartItem(
+            cart=cart, dataset_id=doc["id"], document_id=documents[doc["id"]]
+        )
+        for doc in docs
+    ]
 
 
 class Search(models.Model):
@@ -80,6 +330,11 @@ class Search(models.Model):
 
         verbose_name = "Search"
         verbose_name_plural = "Searches"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "uuid"], name="search_unique_user_uuid"
+            )
+        ]
 
     def __str__(self):
         """Unicode representation of Search."""
@@ -1,20 +1,58 @@
 from rest_framework import serializers
 
 from metagrid.cart.models import Cart, Search
+from metagrid.projects import catalogue
 from metagrid.projects.serializers import ProjectSerializer
 
+# The most saved searches a bulk request may create, update or delete
+MAX_BULK_SEARCHES = 500
+
+
+def unique_items(items: list[dict]) -> list[dict]:
+    """Check that every item has an id, keeping the first item of each id."""
+    if not all(isinstance(item.get("id"), str) for item in items):
+        raise serializers.ValidationError('Every item needs a string "id".')
+    unique: dict[str, dict] = {}
+    for item in items:
+        unique.setdefault(item["id"], item)
+    return list(unique.values())
+
 
 class CartSerializer(serializers.ModelSerializer):
     lookup_field = "user"
     read_only_fields = ("user",)
 
+    items = serializers.ListField(child=serializers.DictField(), source="docs")
+    # On writes, the version of the cart the client last saw
+    version = serializers.IntegerField(required=False, min_value=0)
+
     class Meta:
         model = Cart
-        fields = ("user", "items")
+        fields = ("user", "items", "version")
+
+    def validate_items(self, items):
+        return unique_items(items)
+
+
+class CartItemsSerializer(serializers.Serializer):
+    """Items to add to a cart, each identified by its dataset "id"."""
+
+    items = serializers.ListField(child=serializers.DictField())
+    version = serializers.IntegerField(required=False, min_value=0)
+
+    def validate_items(self, items):
+        return unique_items(items)
+
+
+class CartItemIdsSerializer(serializers.Serializer):
+    """The ids of items to remove from a cart."""
+
+    ids = serializers.ListField(child=serializers.CharField())
+    version = serializers.IntegerField(required=False, min_value=0)
 
 
 class SearchSerializer(serializers.ModelSerializer):
-    project = ProjectSerializer(read_only=True)
+    project = serializers.SerializerMethodField()
 
     # To avoid creating a new foreign key object, create this field to
     # reference an existing project's id
@@ -23,7 +61,7 @@ class SearchSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Search
-        fields = (
+        fields: tuple[str, ...] = (
             "uuid",
             "user",
             "project",
@@ -37,3 +75,42 @@ class SearchSerializer(serializers.ModelSerializer):
             "text_inputs",
             "url",
         )
+
+    def get_project(self, search):
+        # Searches share the catalogue's copy of their serialized project
+        project = catalogue.get_catalogue().by_pk.get(search.project_id)
+        if project is None:
+            project = ProjectSerializer(search.project).data
+        return project
+
+
+class SearchSlimSerializer(SearchSerializer):
+    """A saved search that refers to its project by ``project_id`` only."""
+
+    class Meta(SearchSerializer.Meta):
+        fields = (
+            "uuid",
+            "user",
+            "project_id",
+            "version_type",
+            "result_type",
+            "min_version_date",
+            "max_version_date",
+            "filename_vars",
+            "active_facets",
+            "text_inputs",
+            "url",
+        )
+
+
+class SearchBulkSerializer(SearchSerializer):
+    """A saved search in a bulk request, which belongs to the requester."""
+
+    class Meta(SearchSerializer.Meta):
+        read_only_fields = ("user",)
+
+
+class SearchUuidsSerializer(serializers.Serializer):
+    uuids = serializers.ListField(
+        child=serializers.UUIDField(), max_length=MAX_BULK_SEARCHES
+    )
@@ -22,8 +22,6 @@ class CartFactory(factory.django.DjangoModelFactory):
     class Meta:
         model = "cart.Cart"
 
-    items = factory.Dict({"title": "dataset"}, dict_factory=JSONFactory)
-
 
 class SearchFactory(factory.django.DjangoModelFactory):
     class Meta:
@@ -0,0 +1,108 @@
+import json
+import threading
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from metagrid.cart import documents
+from metagrid.cart.models import Cart, DatasetDocument
+from metagrid.users.tests.factories import UserFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def search_response(docs) -> bytes:
+    return json.dumps({"response": {"docs": docs}}).encode()
+
+
+def test_record_search_response_records_datasets():
+    documents.record_search_response(
+        search_response(
+            [{"id": "a", "type": "Dataset"}, {"id": "b", "type": "File"}, "c"]
+        )
+    )
+
+    document = DatasetDocument.objects.get()
+    assert (document.dataset_id, document.from_search) == ("a", True)
+
+
+@pytest.mark.parametrize(
+    "content",
+    [b"not json", b"[]", b'{"response": {}}', search_response({"id": "a"})],
+)
+def test_record_search_response_ignores_other_responses(content):
+    documents.record_search_response(content)
+
+    assert not DatasetDocument.objects.exists()
+
+
+def test_record_in_background_submits_to_the_executor():
+    with patch("metagrid.cart.documents.get_executor") as get_executor:
+        documents.record_in_background(b"{}")
+
+    get_executor.return_value.submit.assert_called_once_with(
+        documents._record_in_worker, b"{}", documents._pending
+    )
+    documents._pending.release()
+
+
+def test_record_in_background_drops_work_when_the_queue_is_full():
+    pending = threading.BoundedSemaphore(1)
+    pending.acquire()
+    with patch("metagrid.cart.documents.get_executor") as get_executor, patch(
+        "metagrid.cart.documents._pending", pending
+    ):
+        documents.record_in_background(b"{}")
+
+    get_executor.return_value.submit.assert_not_called()
+
+
+def test_record_in_worker_logs_errors(caplog):
+    pending = threading.BoundedSemaphore(1)
+    pending.acquire()
+    with patch(
+        "metagrid.cart.documents.record_search_response",
+        side_effect=RuntimeError,
+    ), patch("metagrid.cart.documents.close_old_connections") as close:
+        documents._record_in_worker(b"{}", pending)
+
+    assert "Could not record the documents of a search" in caplog.text
+    assert pending.acquire(blocking=False)
+    close.assert_called_once()
+
+
+def test_get_executor_is_recreated_after_fork():
+    executor = documents.get_executor()
+    assert documents.get_executor() is executor
+
+    with patch("metagrid.cart.documents.os.getpid", return_value=-1):
+        assert documents.get_executor() is not executor
+
+
+def test_prune_dataset_documents_command():
+    cart = UserFactory().cart
+    Cart.objects.add_items(cart, [{"id": "held"}])
+    DatasetDocument.objects.bulk_create(
+        [
+            DatasetDocument.from_doc({"id": "old"}),
+            DatasetDocument.from_doc({"id": "new"}),
+        ]
+    )
+    DatasetDocument.objects.exclude(dataset_id="new").update(
+        recorded=timezone.now() - timedelta(days=30)
+    )
+    out = StringIO()
+
+    call_command("prune_dataset_documents", "--older-than=7", stdout=out)
+
+    assert "Deleted 1 dataset document(s)." in out.getvalue()
+    assert set(
+        DatasetDocument.objects.values_list("dataset_id", flat=True)
+    ) == {
+        "held",
+        "new",
+    }
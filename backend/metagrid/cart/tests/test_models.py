@@ -1,12 +1,89 @@
-from metagrid.cart.models import Cart, Search  # noqa: F401
+import pytest
+
+from metagrid.cart.models import Cart, DatasetDocument, Search  # noqa: F401
 from metagrid.cart.tests.factories import CartFactory, SearchFactory
+from metagrid.users.tests.factories import UserFactory
 
 
 class TestCart:
     def test__str__(self):
-        items = [{"title": "dataset"}]
-        cart = CartFactory.build(items=items)  # type: Cart
-        assert cart.__str__() == str(items)
+        cart = CartFactory.build(user_id=7)  # type: Cart
+        assert cart.__str__() == "Cart of user 7"
+
+
+@pytest.mark.django_db
+class TestDatasetDocument:
+    def test_from_doc_copies_the_summary_fields(self):
+        cart = UserFactory().cart
+        doc = {
+            "id": "CMIP6.a.v1|node",
+            "data_node": "node",
+            "title": "a",
+            "number_of_files": "12",
+            "size": 2**40,
+        }
+        Cart.objects.add_items(cart, [doc])
+        item = cart.cart_items.get()
+        assert str(item) == str(item.document) == "CMIP6.a.v1|node"
+        document = item.document
+        assert (document.data_node, document.title) == ("node", "a")
+        assert (document.number_of_files, document.size) == (12, 2**40)
+        assert document.doc == doc
+
+    def test_from_doc_ignores_invalid_numbers(self):
+        document = DatasetDocument.from_doc(
+            {"id": "a", "number_of_files": "many", "size": -1}
+        )
+        assert (document.number_of_files, document.size) == (None, None)
+        assert (document.data_node, document.title) == ("", "")
+
+    def test_client_copies_only_show_in_their_own_carts(self):
+        first, second = UserFactory().cart, UserFactory().cart
+        Cart.objects.add_items(first, [{"id": "a", "title": "old"}])
+        Cart.objects.add_items(second, [{"id": "a", "title": "new"}])
+        assert DatasetDocument.objects.count() == 2
+        assert first.docs == [{"id": "a", "title": "old"}]
+        assert second.docs == [{"id": "a", "title": "new"}]
+
+    def test_identical_copies_share_one_row(self):
+        first, second = UserFactory().cart, UserFactory().cart
+        Cart.objects.add_items(first, [{"id": "a", "title": "a"}])
+        Cart.objects.add_items(second, [{"id": "a", "title": "a"}])
+        assert DatasetDocument.objects.count() == 1
+
+    def test_an_id_alone_refers_to_the_search_copy(self):
+        first, second = UserFactory().cart, UserFactory().cart
+        Cart.objects.add_items(first, [{"id": "a", "title": "client"}])
+        DatasetDocument.objects.record_search_results(
+            [
+                {"id": "a", "type": "Dataset", "title": "search"},
+                {"id": "c", "type": "File"},
+                {"id": 1, "type": "Dataset"},
+            ]
+        )
+        Cart.objects.add_items(second, [{"id": "a"}, {"id": "b"}])
+        assert second.docs == [
+            {"id": "a", "type": "Dataset", "title": "search"},
+            {"id": "b"},
+        ]
+        assert first.docs == [{"id": "a", "title": "client"}]
+        assert not DatasetDocument.objects.filter(dataset_id="c").exists()
+
+    def test_recording_again_updates_the_search_copy_in_place(self):
+        cart = UserFactory().cart
+        doc = {"id": "a", "type": "Dataset", "score": 1.0}
+        Cart.objects.add_items(cart, [doc])
+        DatasetDocument.objects.record_search_results([doc])
+        search_copy = DatasetDocument.objects.get(from_search=True)
+
+        DatasetDocument.objects.record_search_results(
+            [{"id": "a", "type": "Dataset", "score": 2.0, "title": "new"}]
+        )
+        search_copy.refresh_from_db()
+        assert search_copy.doc["score"] == 2.0
+        assert search_copy.title == "new"
+        assert DatasetDocument.objects.count() == 2
+        assert cart.docs == [doc]
 
 
 class TestSearch:
@@ -1,11 +1,20 @@
+from unittest.mock import patch
+
 import pytest
+from django.db import connection
 from django.forms.models import model_to_dict
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
 
 from metagrid.cart.models import Cart, Search
+from metagrid.cart.serializers import MAX_BULK_SEARCHES
 from metagrid.cart.tests.factories import SearchFactory
+from metagrid.cart.views import SEARCH_UPDATE_FIELDS
+from metagrid.projects import catalogue
+from metagrid.projects.models import Project
+from metagrid.projects.serializers import ProjectSerializer
 from metagrid.projects.tests.factories import ProjectFactory
 from metagrid.users.tests.factories import UserFactory, raw_password
 
@@ -40,13 +49,16 @@ class TestCartDetail(APITestCase):
         # URL for cart detail
         self.url = reverse("cart-detail", kwargs={"user": self.user.pk})
 
+    def add_items(self, items):
+        Cart.objects.add_items(Cart.objects.get(user=self.user), items)
+
     def test_get_request_returns_user_cart(self):
         response = self.client.get(self.url)
         assert response.status_code == status.HTTP_200_OK
 
     def test_patch_request_updates_user_cart(self):
         # Add item to the user's cart
-        payload = {"items": [{"title": "dataset"}]}
+        payload = {"items": [{"id": "dataset", "title": "dataset"}]}
         response = self.client.patch(
             self.url,
             payload,
@@ -55,7 +67,121 @@ class TestCartDetail(APITestCase):
         assert response.status_code == status.HTTP_200_OK
 
         user_cart = Cart.objects.get(user=self.user)
-        assert user_cart.items == payload.get("items")
+        assert user_cart.docs == payload.get("items")
+        assert user_cart.version == 1
+
+    def test_patch_request_with_stale_version_conflicts(self):
+        Cart.objects.filter(user=self.user).update(version=3)
+        response = self.client.patch(
+            self.url,
+            {"items": [{"id": "a"}], "version": 2},
+            format="json",
+        )
+        assert response.status_code == status.HTTP_409_CONFLICT
+        assert response.data["version"] == 3
+        assert Cart.objects.get(user=self.user).docs == []
+
+        response = self.client.patch(
+            self.url,
+            {"items": [{"id": "a"}], "version": 3},
+            format="json",
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["version"] == 4
+
+    def test_add_appends_new_items_once(self):
+        self.add_items([{"id": "a"}])
+        response = self.client.post(
+            f"{self.url}add/",
+            {"items": [{"id": "b", "n": 1}, {"id": "a"}, {"id": "b", "n": 2}]},
+            format="json",
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == {"version": 2}
+        assert Cart.objects.get(user=self.user).docs == [
+            {"id": "a"},
+            {"id": "b", "n": 1},
+        ]
+
+    def test_add_rejects_items_without_id(self):
+        response = self.client.post(
+            f"{self.url}add/", {"items": [{"title": "a"}]}, format="json"
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_remove_drops_items_by_id(self):
+        self.add_items([{"id": "a"}, {"id": "b"}, {"id": "c"}])
+        response = self.client.post(
+            f"{self.url}remove/", {"ids": ["a", "c", "z"]}, format="json"
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert Cart.objects.get(user=self.user).docs == [{"id": "b"}]
+
+        response = self.client.post(
+            f"{self.url}remove/", {"ids": ["b"], "version": 2}, format="json"
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert Cart.objects.get(user=self.user).docs == []
+
+    def test_add_with_stale_version_conflicts(self):
+        Cart.objects.filter(user=self.user).update(version=5)
+        response = self.client.post(
+            f"{self.url}add/",
+            {"items": [{"id": "a"}], "version": 4},
+            format="json",
+        )
+        assert response.status_code == status.HTTP_409_CONFLICT
+        assert response.data["version"] == 5
+        assert Cart.objects.get(user=self.user).docs == []
+
+    def test_replacing_items_keeps_their_order(self):
+        self.add_items([{"id": "a"}, {"id": "b"}])
+        items = [{"id": "c"}, {"id": "a", "n": 1}, {"id": "c", "n": 2}]
+        response = self.client.put(
+            self.url,
+            {"user": self.user.pk, "items": items},
+            format="json",
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["items"] == items[:2]
+        assert response.data["version"] == 2
+
+    def test_patch_request_without_items_changes_nothing(self):
+        self.add_items([{"id": "a"}])
+        response = self.client.patch(self.url, {"version": 0}, format="json")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["items"] == [{"id": "a"}]
+        assert response.data["version"] == 1
+
+    def test_items_are_paged_in_insertion_order(self):
+        self.add_items([{"id": f"d{i}"} for i in range(5)])
+        response = self.client.get(f"{self.url}items/", {"limit": 2})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["results"] == [{"id": "d0"}, {"id": "d1"}]
+
+        pages = []
+        while response.data["next"]:
+            response = self.client.get(response.data["next"])
+            pages.append(response.data["results"])
+        assert pages == [[{"id": "d2"}, {"id": "d3"}], [{"id": "d4"}]]
+
+    def test_contains_tells_which_datasets_are_in_the_cart(self):
+        self.add_items([{"id": "a|node"}, {"id": "b|node"}])
+        response = self.client.get(
+            f"{self.url}contains/", {"dataset_id": ["b|node", "c|node"]}
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == {"b|node": True, "c|node": False}
+
+    def test_cannot_change_another_users_cart(self):
+        other = UserFactory()
+        response = self.client.post(
+            reverse("cart-add", kwargs={"user": other.pk}),
+            {"items": [{"id": "a"}]},
+            format="json",
+        )
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        assert Cart.objects.get(user=other).docs == []
 
 
 class TestSearchViewSet(APITestCase):
@@ -146,3 +272,111 @@ class TestSearchViewSet(APITestCase):
 
         search_exists = Search.objects.filter(pk=self.search_obj.pk).exists()
         assert not search_exists
+
+    def search_payload(self, **kwargs):
+        project = ProjectFactory()
+        payload = model_to_dict(SearchFactory.build(project=project, **kwargs))
+        payload["project_id"] = project.pk
+        del payload["user"]
+        return payload
+
+    def test_bulk_request_creates_and_updates_objects(self):
+        updated = self.search_payload(uuid=self.search_obj.uuid)
+        updated["text_inputs"] = ["updated"]
+        created = [self.search_payload(), self.search_payload()]
+
+        response = self.client.post(
+            f"{self.list_url}bulk/", [updated, *created], format="json"
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {
+            "created": [str(search["uuid"]) for search in created],
+            "updated": [str(self.search_obj.uuid)],
+        }
+        assert Search.objects.filter(user=self.user).count() == 3
+        user_search = Search.objects.get(pk=self.search_obj.pk)
+        assert user_search.text_inputs == ["updated"]
+
+    def test_bulk_request_updates_every_field_of_a_search(self):
+        # A field added to Search must be added to SEARCH_UPDATE_FIELDS too
+        fields = {field.name for field in Search._meta.concrete_fields}
+        assert set(SEARCH_UPDATE_FIELDS) == fields - {"id", "uuid", "user"}
+
+    def test_bulk_request_does_not_touch_other_users_searches(self):
+        other = SearchFactory()
+        payload = self.search_payload(uuid=other.uuid)
+        response = self.client.post(
+            f"{self.list_url}bulk/", [payload], format="json"
+        )
+        assert response.json()["created"] == [str(other.uuid)]
+        assert Search.objects.filter(uuid=other.uuid).count() == 2
+        other.refresh_from_db()
+        assert other.user != self.user
+
+    def test_bulk_request_rejects_unknown_projects(self):
+        payload = self.search_payload()
+        payload["project_id"] = 0
+        response = self.client.post(
+            f"{self.list_url}bulk/", [payload], format="json"
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert not Search.objects.filter(uuid=payload["uuid"]).exists()
+
+    def test_bulk_requests_reject_too_many_searches(self):
+        too_many = MAX_BULK_SEARCHES + 1
+        for path, payload in (
+            ("bulk/", [{}] * too_many),
+            (
+                "bulk-delete/",
+                {"uuids": [str(self.search_obj.uuid)] * too_many},
+            ),
+        ):
+            with self.subTest(path=path):
+                response = self.client.post(
+                    f"{self.list_url}{path}", payload, format="json"
+                )
+                assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert Search.objects.filter(pk=self.search_obj.pk).exists()
+
+    def test_bulk_delete_request_deletes_objects(self):
+        other = SearchFactory()
+        mine = SearchFactory(user=self.user)
+        response = self.client.post(
+            f"{self.list_url}bulk-delete/",
+            {"uuids": [self.search_obj.uuid, other.uuid]},
+            format="json",
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {"deleted": [str(self.search_obj.uuid)]}
+        remaining = Search.objects.values_list("pk", flat=True)
+        assert set(remaining) == {other.pk, mine.pk}
+
+    def list_queries(self, **params):
+        catalogue.get_catalogue()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.list_url, params)
+        assert response.status_code == status.HTTP_200_OK
+        return response, len(queries)
+
+    def test_list_request_serializes_each_project_once(self):
+        _, one_search = self.list_queries()
+        for project in ProjectFactory.create_batch(3):
+            SearchFactory.create_batch(2, user=self.user, project=project)
+        response, seven_searches = self.list_queries()
+        assert seven_searches == one_search
+
+        project = response.data["results"][-1]["project"]
+        assert project == ProjectSerializer(Project.objects.last()).data
+
+    def test_list_request_serializes_projects_missing_from_catalogue(self):
+        with patch.object(catalogue, "get_catalogue") as get_catalogue:
+            get_catalogue.return_value.by_pk = {}
+            response = self.client.get(self.list_url)
+        project = response.data["results"][0]["project"]
+        assert project == ProjectSerializer(self.search_obj.project).data
+
+    def test_slim_list_request_returns_project_ids(self):
+        response, _ = self.list_queries(slim="true")
+        result = response.data["results"][0]
+        assert "project" not in result
+        assert result["project_id"] == self.search_obj.project_id
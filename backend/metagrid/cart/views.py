@@ -1,10 +1,51 @@
+from django.db import transaction
 from django.http import JsonResponse
-from rest_framework import mixins, viewsets
+from rest_framework import mixins, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 
 from metagrid.cart.models import Cart, Search
-from metagrid.cart.serializers import CartSerializer, SearchSerializer
+from metagrid.cart.serializers import (
+    MAX_BULK_SEARCHES,
+    CartItemIdsSerializer,
+    CartItemsSerializer,
+    CartSerializer,
+    SearchBulkSerializer,
+    SearchSerializer,
+    SearchSlimSerializer,
+    SearchUuidsSerializer,
+)
+from metagrid.projects.models import Project
 from metagrid.users.permissions import IsOwner
 
+# The fields a bulk upsert overwrites on a user's existing search
+SEARCH_UPDATE_FIELDS = [
+    "project",
+    "version_type",
+    "result_type",
+    "min_version_date",
+    "max_version_date",
+    "filename_vars",
+    "active_facets",
+    "text_inputs",
+    "url",
+]
+
+# Searches upserted per INSERT statement by a bulk request
+SEARCH_BULK_BATCH_SIZE = 100
+
+
+class CartItemPagination(CursorPagination):
+    """Keyset pagination of a cart's items, by insertion order."""
+
+    ordering = "id"
+    page_size = 100
+    page_size_query_param = "limit"
+    max_page_size = 1000
+
 
 class CartViewSet(
     mixins.RetrieveModelMixin, mixins.UpdateModelMixin, viewsets.GenericViewSet
@@ -19,6 +60,89 @@ class CartViewSet(
         queryset = self.queryset.filter(user=user).prefetch_related()
         return queryset
 
+    def update(self, request, *args, **kwargs):
+        cart = self.get_object()
+        serializer = self.get_serializer(
+            cart, data=request.data, partial=kwargs.get("partial", False)
+        )
+        serializer.is_valid(raise_exception=True)
+        if "docs" in serializer.validated_data:
+            version = Cart.objects.replace_items(
+                cart,
+                serializer.validated_data["docs"],
+                serializer.validated_data.get("version"),
+            )
+            if version is None:
+                return self.version_conflict()
+            cart.version = version
+        return Response(self.get_serializer(cart).data)
+
+    @action(detail=True, methods=["get"])
+    def items(self, request, *args, **kwargs):
+        """Page through the cart's items in the order they were added."""
+        queryset = (
+            self.get_object()
+            .cart_items.select_related("document")
+            .only("id", "document__doc")
+        )
+        paginator = CartItemPagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        return paginator.get_paginated_response(
+            [item.document.doc for item in page]
+        )
+
+    @action(detail=True, methods=["get"])
+    def contains(self, request, *args, **kwargs):
+        """Tell which of the given dataset ids are in the cart."""
+        dataset_ids = request.query_params.getlist("dataset_id")
+        found = set(
+            self.get_object()
+            .cart_items.filter(dataset_id__in=dataset_ids)
+            .values_list("dataset_id", flat=True)
+        )
+        return Response(
+            {dataset_id: dataset_id in found for dataset_id in dataset_ids}
+        )
+
+    @action(detail=True, methods=["post"])
+    def add(self, request, *args, **kwargs):
+        """Add items to the cart, without sending the rest of the cart."""
+        serializer = CartItemsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        version = Cart.objects.add_items(
+            self.get_object(),
+            serializer.validated_data["items"],
+            serializer.validated_data.get("version"),
+        )
+        return self.changed(version)
+
+    @action(detail=True, methods=["post"])
+    def remove(self, request, *args, **kwargs):
+        """Remove items from the cart by id."""
+        serializer = CartItemIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        version = Cart.objects.remove_items(
+            self.get_object(),
+            serializer.validated_data["ids"],
+            serializer.validated_data.get("version"),
+        )
+        return self.changed(version)
+
+    def changed(self, version):
+        if version is None:
+            return self.version_conflict()
+        return Response({"version": version})
+
+    def version_conflict(self):
+        current = self.get_queryset().values_list("version", flat=True).get()
+        return Response(
+            {
+                "detail": "The cart was changed since the given version.",
+                "version": current,
+            },
+            status=status.HTTP_409_CONFLICT,
+        )
+
 
 class SearchViewSet(viewsets.ModelViewSet):
     queryset = Search.objects.all().order_by("id")
@@ -31,12 +155,84 @@ class SearchViewSet(viewsets.ModelViewSet):
         queryset = self.queryset.filter(user=user).prefetch_related()
         return queryset
 
+    def get_serializer_class(self):
+        if self.slim:
+            return SearchSlimSerializer
+        return super().get_serializer_class()
+
+    @property
+    def slim(self) -> bool:
+        """Whether the client asked for project ids instead of projects."""
+        return self.request.query_params.get("slim") in ("1", "true")
+
     def destroy(self, request, *args, **kwargs):
-        user = self.request.user
-        queryset = self.queryset.filter(user=user).prefetch_related()
-        to_delete = queryset.filter(uuid=kwargs["uuid"])
-        deleted_uuids = []
-        for record in to_delete:
-            deleted_uuids.append(record.uuid)
-        to_delete.delete()
+        return self.delete_searches([kwargs["uuid"]])
+
+    @action(
+        detail=False, methods=["post"], permission_classes=[IsAuthenticated]
+    )
+    def bulk(self, request, *args, **kwargs):
+        """Create or update many saved searches at once, matched by uuid."""
+        serializer = SearchBulkSerializer(
+            data=request.data, many=True, max_length=MAX_BULK_SEARCHES
+        )
+        serializer.is_valid(raise_exception=True)
+        # A later search in the request replaces an earlier one
+        searches = {
+            search.uuid: search
+            for search in (
+                Search(user=request.user, **data)
+                for data in serializer.validated_data
+            )
+        }
+        project_ids = {search.project_id for search in searches.values()}
+        unknown = project_ids - set(
+            Project.objects.filter(pk__in=project_ids).values_list(
+                "pk", flat=True
+            )
+        )
+        if unknown:
+            raise ValidationError(
+                {"project_id": f"Unknown projects: {sorted(unknown)}"}
+            )
+
+        with transaction.atomic():
+            existing = set(
+                self.get_queryset()
+                .filter(uuid__in=searches)
+                .values_list("uuid", flat=True)
+            )
+            Search.objects.bulk_create(
+                searches.values(),
+                update_conflicts=True,
+                unique_fields=["user", "uuid"],
+                update_fields=SEARCH_UPDATE_FIELDS,
+                batch_size=SEARCH_BULK_BATCH_SIZE,
+            )
+        return JsonResponse(
+            {
+                "created": [uuid for uuid in searches if uuid not in existing],
+                "updated": [uuid for uuid in searches if uuid in existing],
+            }
+        )
+
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="bulk-delete",
+        permission_classes=[IsAuthenticated],
+    )
+    def bulk_delete(self, request, *args, **kwargs):
+        """Delete many saved searches at once, by uuid."""
+        serializer = SearchUuidsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return self.delete_searches(serializer.validated_data["uuids"])
+
+    def delete_searches(self, uuids):
+        to_delete = self.get_queryset().filter(uuid__in=uuids)
+        with transaction.atomic():
+            deleted_uuids = list(
+                to_delete.select_for_update().values_list("uuid", flat=True)
+            )
+            to_delete.delete()
         return JsonResponse({"deleted": deleted_uuids})
@@ -3,6 +3,12 @@ from typing import Any, Generator
 import pytest
 from rest_framework.test import APIClient
 
+from metagrid.api_proxy import endpoint_search, node_status
+from metagrid.api_proxy.cache import _build_cache
+from metagrid.api_proxy.globus_app import app_transfer_client
+from metagrid.api_proxy.views import frontend_config_payload
+from metagrid.projects import catalogue
+
 
 @pytest.fixture(scope="function")
 def api_client() -> Generator[APIClient, Any, Any]:
@@ -11,3 +17,24 @@ def api_client() -> Generator[APIClient, Any, Any]:
     :return: APIClient
     """
     yield APIClient()
+
+
+@pytest.fixture(autouse=True)
+def clear_proxy_caches() -> None:
+    """
+    Fixture to give every test empty proxy response caches
+    """
+    _build_cache.cache_clear()
+    frontend_config_payload.cache_clear()
+    app_transfer_client.reset()
+    endpoint_search._build_cache.cache_clear()
+    node_status.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_project_catalogue() -> None:
+    """
+    Fixture to keep the project catalogue cached by one test from being
+    served in the next
+    """
+    catalogue.invalidate()
@@ -6,6 +6,8 @@ from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
 
+from metagrid.users.tests.factories import UserFactory
+
 
 @pytest.mark.django_db
 def test_liveness_returns_200(api_client: APIClient):
@@ -27,3 +29,21 @@ def test_readiness_returns_500_on_error(api_client: APIClient, monkeypatch):
 
     response = api_client.post(reverse("readiness"), {})
     assert response.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
+
+
+@pytest.mark.django_db
+def test_http_pool_stats_returns_worker_pools(api_client: APIClient):
+    api_client.force_authenticate(UserFactory(is_staff=True))
+    response = api_client.get(reverse("http_pool_stats"))
+    assert response.status_code == status.HTTP_200_OK
+    assert "hosts" in response.json()
+
+
+@pytest.mark.django_db
+def test_http_pool_stats_is_restricted_to_staff(api_client: APIClient):
+    response = api_client.get(reverse("http_pool_stats"))
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    api_client.force_authenticate(UserFactory())
+    response = api_client.get(reverse("http_pool_stats"))
+    assert response.status_code == status.HTTP_403_FORBIDDEN
@@ -1,7 +1,12 @@
 from django.db import connection
 from django.http import HttpResponse, HttpResponseServerError
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
 from rest_framework.views import csrf_exempt
 
+from metagrid.api_proxy import upstream
+
 
 @csrf_exempt
 def liveness(request) -> HttpResponse:
@@ -17,3 +22,9 @@ def readiness(request) -> HttpResponse:
         return HttpResponse({"db": row})
     except Exception as e:
         return HttpResponseServerError(e)
+
+
+@api_view()
+@permission_classes([IsAdminUser])
+def http_pool_stats(request) -> Response:
+    return Response(upstream.pool_stats())
@@ -1,5 +1,13 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class ProjectsConfig(AppConfig):
     name = "metagrid.projects"
+
+    def ready(self):
+        from metagrid.projects import signals
+
+        post_migrate.connect(
+            signals.bump_catalogue_version_after_migrate, sender=self
+        )
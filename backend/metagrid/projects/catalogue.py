@@ -0,0 +1,108 @@
+"""An in-memory copy of the serialized project catalogue.
+
+Projects, facets and facet groups only change when the project data
+migration runs or an admin edits them, so each worker serializes the whole
+catalogue once and serves ``/api/v1/projects/`` from memory. Every write to
+the catalogue bumps the version stored in ``CatalogueVersion``; workers
+compare it with the version of their copy at most every
+``PROJECT_CATALOGUE_CHECK_INTERVAL`` seconds, and immediately after a write
+made in their own process.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from typing import Any, NamedTuple, Optional
+
+from django.conf import settings
+from django.db.models import F, Prefetch, QuerySet
+
+from metagrid.projects.models import CatalogueVersion, Project, ProjectFacet
+from metagrid.projects.serializers import ProjectSerializer
+
+CATALOGUE_VERSION_PK = 1
+
+
+class Catalogue(NamedTuple):
+    version: int
+    projects: list[dict[str, Any]]
+    by_name: dict[str, dict[str, Any]]
+    by_pk: dict[int, dict[str, Any]]
+    etag: str
+
+
+_lock = threading.Lock()
+_catalogue: Optional[Catalogue] = None
+_checked_at = float("-inf")
+
+
+def current_version() -> int:
+    row = CatalogueVersion.objects.filter(pk=CATALOGUE_VERSION_PK).first()
+    return 0 if row is None else row.version
+
+
+def bump_version():
+    """Record a write to the catalogue and drop this worker's copy."""
+    updated = CatalogueVersion.objects.filter(pk=CATALOGUE_VERSION_PK).update(
+        version=F("version") + 1
+    )
+    if not updated:
+        CatalogueVersion.objects.get_or_create(
+            pk=CATALOGUE_VERSION_PK, defaults={"version": 1}
+        )
+    invalidate()
+
+
+def invalidate():
+    global _catalogue
+    with _lock:
+        _catalogue = None
+
+
+def project_queryset() -> QuerySet[Project]:
+    """All projects in display order, with their facets and groups."""
+    return Project.objects.order_by("display_order", "pk").prefetch_related(
+        Prefetch(
+            "facets",
+            queryset=ProjectFacet.objects.select_related(
+                "facet", "group"
+            ).order_by("id"),
+        )
+    )
+
+
+def build_catalogue(version: int) -> Catalogue:
+    projects = ProjectSerializer(project_queryset(), many=True).data
+    # Round trip through JSON so the cached projects are plain values
+    content = json.dumps(projects)
+    projects = json.loads(content)
+    return Catalogue(
+        version=version,
+        projects=projects,
+        by_name={project["name"]: project for project in projects},
+        by_pk={project["pk"]: project for project in projects},
+        etag=hashlib.sha256(content.encode()).hexdigest(),
+    )
+
+
+def get_catalogue() -> Catalogue:
+    """Return this worker's copy of the catalogue, rebuilding it if stale."""
+    global _catalogue, _checked_at
+
+    now = time.monotonic()
+    catalogue = _catalogue
+    if (
+        catalogue is not None
+        and now - _checked_at < settings.PROJECT_CATALOGUE_CHECK_INTERVAL
+    ):
+        return catalogue
+
+    with _lock:
+        # The version is read before the data, so a write that lands while
+        # the catalogue is being built is picked up by the next check.
+        version = current_version()
+        if _catalogue is None or _catalogue.version != version:
+            _catalogue = build_catalogue(version)
+        _checked_at = now
+        return _catalogue
@@ -0,0 +1,32 @@
+# Generated by Django 5.0.7 on 2026-10-18 08:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("projects", "0002_import_projects_data"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CatalogueVersion",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("version", models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                "verbose_name": "CatalogueVersion",
+                "verbose_name_plural": "CatalogueVersions",
+            },
+        ),
+    ]
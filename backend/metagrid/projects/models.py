@@ -49,10 +49,25 @@ class Project(models.Model):
         """Return absolute url for Project."""
         return self.name
 
+    def project_facets(self) -> List["ProjectFacet"]:
+        """Returns the project's facets ordered by id, with each facet and
+        group loaded.
+
+        The facets prefetched by ProjectsViewSet are used when present, so
+        serializing a list of projects does not query once per project.
+        """
+        if "facets" in getattr(self, "_prefetched_objects_cache", {}):
+            return list(self.facets.all())  # type: ignore
+        return list(
+            self.facets.select_related("facet", "group").order_by("id")  # type: ignore
+        )
+
     @property
     def facets_url(self) -> Union[None, str]:
         """Generates a URL query string for the ESGF Search API."""
-        facets = self.facets.order_by("id").values_list("facet__name", flat=True)  # type: ignore
+        facets = [
+            project_facet.facet.name for project_facet in self.project_facets()
+        ]
 
         if not facets:
             logger.warning(f"No facets found for project: {self.name}")
@@ -150,3 +165,24 @@ class FacetGroup(models.Model):
     def __str__(self):
         """Unicode representation of FacetGroup."""
         return self.name
+
+
+class CatalogueVersion(models.Model):
+    """Model definition for CatalogueVersion.
+
+    A single row whose version is bumped on every write to the project
+    catalogue (projects, facets and facet groups), so that each worker can
+    tell when its cached copy of the catalogue is out of date.
+    """
+
+    version = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        """Meta definition for CatalogueVersion."""
+
+        verbose_name = "CatalogueVersion"
+        verbose_name_plural = "CatalogueVersions"
+
+    def __str__(self) -> str:
+        """Unicode representation of CatalogueVersion."""
+        return str(self.version)
@@ -12,13 +12,11 @@ class ProjectSerializer(serializers.ModelSerializer):
     def get_facets_by_group(self, project):
         facets_by_group = defaultdict(list)
 
-        for result in project.facets.values(
-            "group__name", "facet__name"
-        ).order_by(
-            "group__pk",
+        for project_facet in sorted(
+            project.project_facets(), key=lambda pf: pf.group_id
         ):
-            facets_by_group[result["group__name"]].append(
-                result["facet__name"]
+            facets_by_group[project_facet.group.name].append(
+                project_facet.facet.name
             )
         return facets_by_group
 
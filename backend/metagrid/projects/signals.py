@@ -0,0 +1,30 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from metagrid.projects import catalogue
+from metagrid.projects.models import Facet, FacetGroup, Project, ProjectFacet
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_save, sender=ProjectFacet)
+@receiver(post_save, sender=Facet)
+@receiver(post_save, sender=FacetGroup)
+@receiver(post_delete, sender=Project)
+@receiver(post_delete, sender=ProjectFacet)
+@receiver(post_delete, sender=Facet)
+@receiver(post_delete, sender=FacetGroup)
+def bump_catalogue_version(sender, **kwargs):
+    catalogue.bump_version()
+
+
+def bump_catalogue_version_after_migrate(sender, apps, **kwargs):
+    """The project data migration writes through historical models, which
+    send no save or delete signals, so every migration of the app counts as
+    a write to the catalogue.
+    """
+    try:
+        apps.get_model("projects", "CatalogueVersion")
+    except LookupError:
+        # Migrated back to before the version table existed
+        return
+    catalogue.bump_version()
@@ -1,6 +1,7 @@
 import pytest
 
 from metagrid.projects.models import (  # noqa: F401
+    CatalogueVersion,
     Facet,
     FacetGroup,
     Project,
@@ -106,3 +107,8 @@ class TestFacetGroupModel:
 
     def test__str__(self):
         assert self.facet_group.__str__() == self.facet_group.name
+
+
+class TestCatalogueVersionModel:
+    def test__str__(self):
+        assert str(CatalogueVersion(version=3)) == "3"
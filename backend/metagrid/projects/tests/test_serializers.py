@@ -2,7 +2,11 @@ import pytest
 from django.forms.models import model_to_dict
 
 from metagrid.projects.serializers import ProjectSerializer
-from metagrid.projects.tests.factories import ProjectFactory
+from metagrid.projects.tests.factories import (
+    FacetGroupFactory,
+    ProjectFacetFactory,
+    ProjectFactory,
+)
 
 pytestmark = pytest.mark.django_db
 
@@ -15,3 +19,27 @@ class TestProjectSerializer:
     def test_serializer_success(self):
         serializer = ProjectSerializer(data=self.project_data)
         assert serializer.is_valid
+
+    def test_facets_by_group_orders_groups_and_keeps_facet_order(self):
+        project = ProjectFactory(facets=None)
+        second, first = FacetGroupFactory(name="b"), FacetGroupFactory(
+            name="a"
+        )
+        for group, facet in [
+            (second, "source_id"),
+            (first, "experiment_id"),
+            (second, "variant_label"),
+        ]:
+            ProjectFacetFactory(
+                project=project, group=group, facet__name=facet
+            )
+
+        data = ProjectSerializer(project).data
+
+        assert list(data["facets_by_group"].items()) == [
+            ("b", ["source_id", "variant_label"]),
+            ("a", ["experiment_id"]),
+        ]
+        assert "source_id%2C+experiment_id%2C+variant_label" in (
+            data["facets_url"]
+        )
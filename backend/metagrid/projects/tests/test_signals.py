@@ -0,0 +1,33 @@
+import pytest
+from django.apps import apps
+from django.apps.registry import Apps
+
+from metagrid.projects.catalogue import current_version
+from metagrid.projects.models import CatalogueVersion
+from metagrid.projects.signals import bump_catalogue_version_after_migrate
+
+pytestmark = pytest.mark.django_db
+
+
+def test_migrations_bump_the_catalogue_version():
+    version = current_version()
+
+    bump_catalogue_version_after_migrate(sender=None, apps=apps)
+
+    assert current_version() == version + 1
+
+
+def test_migrating_back_before_the_version_table_is_ignored():
+    version = current_version()
+
+    bump_catalogue_version_after_migrate(sender=None, apps=Apps())
+
+    assert current_version() == version
+
+
+def test_first_write_creates_the_version_row():
+    CatalogueVersion.objects.all().delete()
+
+    bump_catalogue_version_after_migrate(sender=None, apps=apps)
+
+    assert current_version() == 1
@@ -1,14 +1,31 @@
 import pytest
+from django.db.models import F
+from django.test import override_settings
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
 
+from metagrid.projects.models import CatalogueVersion, Project
 from metagrid.projects.tests import factories
 
 pytestmark = pytest.mark.django_db
 
 
 class TestProjectsViewSet(APITestCase):
+    def create_projects(self, count):
+        groups = [
+            factories.FacetGroupFactory(name=name) for name in ("a", "b")
+        ]
+        projects = factories.ProjectFactory.create_batch(count)
+        for project in projects:
+            for i in range(4):
+                factories.ProjectFacetFactory(
+                    project=project,
+                    group=groups[i % 2],
+                    facet__name=f"facet_{i}",
+                )
+        return projects
+
     def test_list(self):
         list_url = reverse("project-list")
 
@@ -26,3 +43,89 @@ class TestProjectsViewSet(APITestCase):
 
         response = self.client.get(detail_url)
         assert response.json().get("name") == post.name
+
+    def test_list_queries_do_not_grow_with_projects(self):
+        list_url = reverse("project-list")
+        self.create_projects(20)
+
+        # The catalogue version, the projects and their facets and groups,
+        # plus the savepoint around the request
+        with self.assertNumQueries(5):
+            response = self.client.get(list_url)
+
+        results = response.data["results"]
+        assert len(results) == 10
+        assert response.data["count"] == Project.objects.count()
+        assert all(project["facets_url"] for project in results)
+
+    def test_detail_queries(self):
+        (project,) = self.create_projects(1)
+        detail_url = reverse("project-detail", kwargs={"name": project.name})
+
+        with self.assertNumQueries(5):
+            response = self.client.get(detail_url)
+
+        assert sum(map(len, response.data["facets_by_group"].values())) == 5
+
+    def test_catalogue_is_served_from_memory(self):
+        (project,) = self.create_projects(1)
+        self.client.get(reverse("project-list"))
+
+        # Only the savepoints around the requests
+        with self.assertNumQueries(4):
+            self.client.get(reverse("project-list"), {"page": 1})
+            self.client.get(
+                reverse("project-detail", kwargs={"name": project.name})
+            )
+
+    def test_catalogue_is_rebuilt_after_writes(self):
+        (project,) = self.create_projects(1)
+        detail_url = reverse("project-detail", kwargs={"name": project.name})
+        etag = self.client.get(detail_url)["ETag"]
+
+        project.full_name = "Renamed"
+        project.save()
+        response = self.client.get(detail_url)
+
+        assert response.data["full_name"] == "Renamed"
+        assert response["ETag"] != etag
+
+        project.delete()
+        assert self.client.get(detail_url).status_code == 404
+
+    @override_settings(PROJECT_CATALOGUE_CHECK_INTERVAL=0)
+    def test_catalogue_is_rebuilt_after_writes_by_other_processes(self):
+        self.create_projects(1)
+        list_url = reverse("project-list")
+        count = self.client.get(list_url).data["count"]
+
+        # Like the project data migration, write without sending signals
+        Project.objects.bulk_create([Project(name="Other")])
+        assert self.client.get(list_url).data["count"] == count
+
+        CatalogueVersion.objects.update(version=F("version") + 1)
+
+        assert self.client.get(list_url).data["count"] == count + 1
+
+    def test_responses_are_cacheable_and_revalidated_with_etag(self):
+        (project,) = self.create_projects(1)
+        for url in (
+            reverse("project-list"),
+            reverse("project-detail", kwargs={"name": project.name}),
+        ):
+            response = self.client.get(url)
+            assert response["Cache-Control"] == "public, max-age=300"
+
+            response = self.client.get(
+                url, HTTP_IF_NONE_MATCH=response["ETag"]
+            )
+            assert response.status_code == status.HTTP_304_NOT_MODIFIED
+            assert response["Cache-Control"] == "public, max-age=300"
+
+    def test_unknown_project_is_not_cached(self):
+        response = self.client.get(
+            reverse("project-detail", kwargs={"name": "unknown"})
+        )
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        assert not response.has_header("Cache-Control")
@@ -1,14 +1,55 @@
+from django.conf import settings
+from django.http import Http404
+from django.utils.cache import patch_cache_control
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import etag
 from rest_framework import viewsets
 from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+
+from metagrid.projects import catalogue
 
-from .models import Project
 from .serializers import ProjectSerializer
 
 
+def catalogue_etag(request, *args, **kwargs) -> str:
+    return catalogue.get_catalogue().etag
+
+
 class ProjectsViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = (
-        Project.objects.all().order_by("display_order").prefetch_related()
-    )
+    """Serves projects from the in-memory catalogue rather than the database.
+
+    The queryset is what the catalogue is built from.
+    """
+
+    queryset = catalogue.project_queryset()
     serializer_class = ProjectSerializer
     permission_classes = [AllowAny]
     lookup_field = "name"
+
+    @method_decorator(etag(catalogue_etag))
+    def list(self, request, *args, **kwargs):
+        projects = catalogue.get_catalogue().projects
+        page = self.paginate_queryset(projects)
+        if page is not None:
+            return self.get_paginated_response(page)
+        return Response(projects)  # pragma: no cover
+
+    @method_decorator(etag(catalogue_etag))
+    def retrieve(self, request, *args, **kwargs):
+        project = catalogue.get_catalogue().by_name.get(kwargs["name"])
+        if project is None:
+            raise Http404
+        return Response(project)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        if response.status_code in (200, 304):
+            patch_cache_control(
+                response,
+                public=True,
+                max_age=settings.PROJECT_CATALOGUE_MAX_AGE,
+            )
+        return response
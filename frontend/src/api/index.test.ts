@@ -21,6 +21,7 @@ import {
   processCitation,
   saveSessionValue,
   saveSessionValues,
+  startGlobusTransfer,
   startSearchGlobusEndpoints,
   updateUserCart,
 } from '.';
@@ -29,6 +30,7 @@ import {
   activeSearchQueryFixture,
   ESGFSearchAPIFixture,
   globusEndpointFixture,
+  globusTransferJobFixture,
   parsedNodeStatusFixture,
   projectsFixture,
   rawCitationFixture,
@@ -531,6 +533,69 @@ describe('test fetching wget script', () => {
   });
 });
 
+describe('test starting a Globus transfer', () => {
+  it('polls the transfer job until it has finished', async () => {
+    server.use(
+      rest.post(apiRoutes.globusTransfer.path, (_req, res, ctx) =>
+        res(ctx.status(202), ctx.json(globusTransferJobFixture({ status: 'queued', tasks: [] }))),
+      ),
+    );
+
+    const result = await startGlobusTransfer({ dataset_id: ['id'] }, 0);
+    expect(result).toEqual({ status: 200, successes: [{ task_id: '1234567' }], failures: [] });
+  });
+  it('returns the failures of a partial transfer', async () => {
+    server.use(
+      rest.post(apiRoutes.globusTransfer.path, (_req, res, ctx) =>
+        res(
+          ctx.status(202),
+          ctx.json(
+            globusTransferJobFixture({
+              status: 'partial',
+              tasks: [
+                { task_id: '1234567', error: null },
+                { task_id: null, error: 'failed' },
+              ],
+              failures: ['failed'],
+            }),
+          ),
+        ),
+      ),
+    );
+
+    const result = await startGlobusTransfer({ dataset_id: ['id'] });
+    expect(result).toEqual({
+      status: 207,
+      successes: [{ task_id: '1234567' }],
+      failures: ['failed'],
+    });
+  });
+  it('throws the error of a failed job', async () => {
+    server.use(
+      rest.post(apiRoutes.globusTransfer.path, (_req, res, ctx) =>
+        res(
+          ctx.status(202),
+          ctx.json(globusTransferJobFixture({ status: 'failed', error: 'oops' })),
+        ),
+      ),
+    );
+
+    await expect(startGlobusTransfer({ dataset_id: ['id'] })).rejects.toThrow('oops');
+  });
+  it('catches and throws an error based on HTTP status code', async () => {
+    server.use(
+      rest.post(apiRoutes.globusTransfer.path, (_req, res, ctx) =>
+        res(ctx.status(202), ctx.json(globusTransferJobFixture({ status: 'resolving' }))),
+      ),
+      rest.get(apiRoutes.globusTransferJob.path, (_req, res, ctx) => res(ctx.status(404))),
+    );
+
+    await expect(startGlobusTransfer({ dataset_id: ['id'] }, 0)).rejects.toThrow(
+      apiRoutes.globusTransfer.handleErrorMsg(404),
+    );
+  });
+});
+
 describe('test opening download url', () => {
   let windowSpy: jest.SpyInstance;
   // eslint-disable-next-line @typescript-eslint/no-explicit-any
@@ -42,6 +42,26 @@ export interface SubmissionResult {
   failures: string[];
 }
 
+export type TransferJobStatus =
+  | 'queued'
+  | 'resolving'
+  | 'submitting'
+  | 'succeeded'
+  | 'partial'
+  | 'failed';
+
+export interface TransferJob {
+  id: string;
+  status: TransferJobStatus;
+  files_found: number;
+  tasks: { task_id: string | null; error: string | null }[];
+  failures: string[];
+  error: string;
+}
+
+// Milliseconds between two polls of a running transfer job
+export const TRANSFER_JOB_POLL_INTERVAL = 2000;
+
 const getCookie = (name: string): null | string => {
   let cookieValue = null;
   if (document && document.cookie && document.cookie !== '') {
@@ -630,6 +650,50 @@ export const fetchWgetScript = async (ids: string[], filenameVars?: string[]): P
     });
 };
 
+const transferJobIsRunning = (job: TransferJob): boolean =>
+  ['queued', 'resolving', 'submitting'].includes(job.status);
+
+/**
+ * Queues a Globus transfer, then polls its job until it has finished.
+ *
+ * The files of a transfer are resolved and submitted in the background, so
+ * the result of the job is returned in the shape of a submission result.
+ */
+export const startGlobusTransfer = async (
+  body: Record<string, unknown>,
+  pollInterval = TRANSFER_JOB_POLL_INTERVAL,
+): Promise<SubmissionResult> => {
+  let job: TransferJob;
+  try {
+    let resp = await axios.post<TransferJob>(apiRoutes.globusTransfer.path, JSON.stringify(body));
+    while (transferJobIsRunning(resp.data)) {
+      // eslint-disable-next-line no-await-in-loop
+      await new Promise((resolve) => {
+        setTimeout(resolve, pollInterval);
+      });
+      const jobPath = apiRoutes.globusTransferJob.path.replace(':id', resp.data.id);
+      // eslint-disable-next-line no-await-in-loop
+      resp = await axios.get<TransferJob>(jobPath);
+    }
+    job = resp.data;
+  } catch (error) {
+    throw new Error(
+      errorMsgBasedOnHTTPStatusCode(error as ResponseError, apiRoutes.globusTransfer),
+    );
+  }
+
+  if (job.status === 'failed' && job.error) {
+    throw new Error(job.error);
+  }
+  return {
+    status: job.status === 'succeeded' ? 200 : 207,
+    successes: job.tasks
+      .filter((task) => task.task_id !== null)
+      .map((task) => ({ task_id: task.task_id })),
+    failures: job.failures,
+  };
+};
+
 export const loadSessionValue = async <T>(key: string): Promise<T | null> => {
   return axios
     .post(apiRoutes.tempStorageGet.path, { dataKey: key })
@@ -30,6 +30,7 @@ type ApiRoutes = {
   keycloakAuth: ApiRoute;
   globusSearchEndpoints: ApiRoute;
   globusTransfer: ApiRoute;
+  globusTransferJob: ApiRoute;
   userInfo: ApiRoute;
   userCart: ApiRoute;
   userSearches: ApiRoute;
@@ -63,7 +64,11 @@ const apiRoutes: ApiRoutes = {
     handleErrorMsg: (HTTPCode) => mapHTTPErrorCodes('Keycloak', HTTPCode),
   },
   globusTransfer: {
-    path: `${window.location.origin}/globus/transfer`,
+    path: `${window.location.origin}/globus/transfer-jobs`,
+    handleErrorMsg: (HTTPCode) => mapHTTPErrorCodes('Globus transfer', HTTPCode),
+  },
+  globusTransferJob: {
+    path: `${window.location.origin}/globus/transfer-jobs/:id`,
     handleErrorMsg: (HTTPCode) => mapHTTPErrorCodes('Globus transfer', HTTPCode),
   },
   userInfo: {
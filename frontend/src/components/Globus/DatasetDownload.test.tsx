@@ -18,6 +18,7 @@ import { GlobusEndpoint, GlobusTaskItem, GlobusTokenResponse } from './types';
 import {
   globusEndpointFixture,
   globusAccessTokenFixture,
+  globusTransferJobFixture,
   globusTransferTokenFixture,
   globusAuthScopeFixure,
 } from '../../test/mock/fixtures';
@@ -572,8 +573,14 @@ describe('DatasetDownload form tests', () => {
     server.use(
       rest.post(apiRoutes.globusTransfer.path, (_req, res, ctx) =>
         res(
-          ctx.status(207),
-          ctx.json({ status: 207, successes: [], failures: ['transfer failed'] })
+          ctx.status(202),
+          ctx.json(
+            globusTransferJobFixture({
+              status: 'failed',
+              tasks: [{ task_id: null, error: 'transfer failed' }],
+              failures: ['transfer failed'],
+            })
+          )
         )
       )
     );
@@ -589,10 +596,13 @@ describe('DatasetDownload form tests', () => {
     expect(globusTransferPopup).toBeTruthy();
   });
 
-  it('displays an error when Globus Transfer returns unhandled status code', async () => {
+  it('displays an error when the Globus Transfer job fails before submitting', async () => {
     server.use(
       rest.post(apiRoutes.globusTransfer.path, (_req, res, ctx) =>
-        res(ctx.status(207), ctx.json({ status: 500, successes: [], failures: [] }))
+        res(
+          ctx.status(202),
+          ctx.json(globusTransferJobFixture({ status: 'failed', tasks: [], error: 'no files' }))
+        )
       )
     );
 
@@ -603,14 +613,14 @@ describe('DatasetDownload form tests', () => {
     expect(globusTransferBtn).toBeTruthy();
     await user.click(globusTransferBtn);
 
-    const globusTransferPopup = await screen.findByTestId('unhandled-status-globus-failures-msg');
+    const globusTransferPopup = await screen.findByTestId('globus-transfer-backend-error-msg');
     expect(globusTransferPopup).toBeTruthy();
   });
 
   it('shows a warning message when Globus transfer response has no data in successes or failures', async () => {
     server.use(
       rest.post(apiRoutes.globusTransfer.path, (_req, res, ctx) =>
-        res(ctx.status(200), ctx.json({ status: 200, successes: [], failures: [] }))
+        res(ctx.status(202), ctx.json(globusTransferJobFixture({ tasks: [] })))
       )
     );
 
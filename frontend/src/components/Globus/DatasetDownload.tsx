@@ -19,12 +19,11 @@ import {
 import React, { useEffect } from 'react';
 import createPKCE from 'js-pkce';
 import { useAtom } from 'jotai';
-import axios from 'axios';
 import {
   fetchWgetScript,
   ResponseError,
+  startGlobusTransfer,
   startSearchGlobusEndpoints,
-  SubmissionResult,
 } from '../../api';
 import { RawSearchResults } from '../Search/types';
 import {
@@ -36,7 +35,6 @@ import {
 } from './types';
 import { getCurrentAppPage, showError, showNotice } from '../../common/utils';
 import { RawTourState, ReactJoyrideContext } from '../../contexts/ReactJoyrideContext';
-import apiRoutes from '../../api/routes';
 import DataBundlePersister from '../../common/DataBundlePersister';
 import { AppPage } from '../../common/types';
 import {
@@ -297,20 +295,13 @@ const DatasetDownloadForm: React.FC<React.PropsWithChildren<unknown>> = () => {
 
     const ids = itemSelections?.map((item) => (item ? item.id : '')) ?? [];
 
-    axios
-      .post<SubmissionResult>(
-        apiRoutes.globusTransfer.path,
-        JSON.stringify({
-          access_token: globusTransferToken.access_token,
-          refresh_token: accessToken,
-          endpointId: endpoint.id,
-          path: endpoint.path || '',
-          dataset_id: ids,
-        }),
-      )
-      .then((resp) => {
-        return resp.data;
-      })
+    startGlobusTransfer({
+      access_token: globusTransferToken.access_token,
+      refresh_token: accessToken,
+      endpointId: endpoint.id,
+      path: endpoint.path || '',
+      dataset_id: ids,
+    })
       .then(async (resp) => {
         setItemSelections([]);
         const newTasks = resp.successes.map((submission) => {
@@ -20,7 +20,7 @@ import {
   RawSearchResults,
 } from '../../components/Search/types';
 import { RawUserAuth, RawUserInfo } from '../../contexts/types';
-import { SubmissionResult } from '../../api';
+import { TransferJob } from '../../api';
 
 export const rawProjectFixture = (props: Partial<RawProject> = {}): RawProject => {
   const defaults: RawProject = {
@@ -199,8 +199,16 @@ export const userAuthFixture = (props: Partial<RawUserAuth> = {}): RawUserAuth =
   return { ...defaults, ...props };
 };
 
-export const globusTransferResponseFixture = (): SubmissionResult => {
-  return { status: 200, successes: [{ taskid: '1234567' }], failures: [] };
+export const globusTransferJobFixture = (props: Partial<TransferJob> = {}): TransferJob => {
+  const defaults: TransferJob = {
+    id: '6c2b6b1e-9c57-4c4a-8f4b-4f2d9b3c1a00',
+    status: 'succeeded',
+    files_found: 1,
+    tasks: [{ task_id: '1234567', error: null }],
+    failures: [],
+    error: '',
+  };
+  return { ...defaults, ...props };
 };
 
 export const userInfoFixture = (props: Partial<RawUserInfo> = {}): RawUserInfo => {
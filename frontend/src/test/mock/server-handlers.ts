@@ -9,7 +9,7 @@ import apiRoutes from '../../api/routes';
 import {
   ESGFSearchAPIFixture,
   globusEndpointFixture,
-  globusTransferResponseFixture,
+  globusTransferJobFixture,
   projectsFixture,
   rawCitationFixture,
   rawNodeStatusFixture,
@@ -78,7 +78,10 @@ const handlers = [
     }
   }),
   rest.post(apiRoutes.globusTransfer.path, async (_req, res, ctx) =>
-    res(ctx.status(200), ctx.json(globusTransferResponseFixture())),
+    res(ctx.status(202), ctx.json(globusTransferJobFixture())),
+  ),
+  rest.get(apiRoutes.globusTransferJob.path, async (_req, res, ctx) =>
+    res(ctx.status(200), ctx.json(globusTransferJobFixture())),
   ),
   rest.get(apiRoutes.userInfo.path, async (_req, res, ctx) =>
     res(ctx.status(200), ctx.json(userInfoFixture())),